@@ -1,216 +1,389 @@
+"""
+La aplicación se arma en crear_app(): configuración, hilos de fondo
+(registro, auditoría, avisos de la base) y blueprints. Importar un
+submódulo (p. ej. app.reportes o app.dao desde un proceso de reportes)
+no la crea; `from app import app` la crea la primera vez y después
+devuelve siempre la misma.
+"""
+import os
+import threading
 from datetime import timedelta
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_wtf.csrf import CSRFProtect
 
-app = Flask(__name__)
-
 # creamos el token
 csrf = CSRFProtect()
-csrf.init_app(app)
 
-# inicializar el secret key
-app.secret_key = b'_5#y2L"F6Q7z\n\xec]/'
 
-# Establecer duración de la sesión, 15 minutos
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=15)
+def crear_app():
+    app = Flask(__name__)
+    csrf.init_app(app)
+
+    # inicializar el secret key
+    app.secret_key = b'_5#y2L"F6Q7z\n\xec]/'
+
+    # Establecer duración de la sesión, 15 minutos
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=15)
+
+    # Segundos que cada worker confía en el estado y grupo leídos de un usuario
+    # con sesión; desactivarlo avisa al momento (ver app/seguridad/sesiones.py)
+    app.config['SESION_VALIDEZ_SEGUNDOS'] = 30
+
+    # Registro en JSON, escrito fuera del hilo de la solicitud (ver app/registro)
+    app.config['LOG_NIVEL'] = 'INFO'
+    # Los DAO registran cada paso de las altas: se guarda uno de cada diez.
+    # Bajo un ataque cada intento rechazado deja una línea: una de cada cien.
+    app.config['LOG_MUESTREO'] = {'app.dao': 0.1, 'app.seguridad.limite_ingresos': 0.01}
+
+    # Auditoría: segundos entre escrituras por lotes (ver app/registro/auditoria.py)
+    app.config['AUDITORIA_INTERVALO'] = 1
+
+    # Zona de las fechas y horas locales de la agenda (turnos); las funciones
+    # de disponibilidad.sql la reciben como parámetro
+    app.config['ZONA_HORARIA'] = 'America/Asuncion'
+
+    # Contraseñas: método de hash (ver flask calibrar-claves); CLAVE_HILOS y
+    # CLAVE_MAX_COLA acotan los hashes simultáneos y en espera (ver app/seguridad/claves.py)
+    app.config['CLAVE_METODO'] = 'pbkdf2:sha256:1000000'
+
+    # Intentos de ingreso: fichas por nick e IP y bloqueo por usuario (ver app/seguridad/limite_ingresos.py)
+    app.config['LOGIN_LIMITES'] = {'nick': (5, 60), 'ip': (20, 15)}
+    app.config['LOGIN_MAX_INTENTOS'] = 5
+    app.config['LOGIN_BLOQUEO_MINUTOS'] = 15
+
+    # Menú lateral armado con paginas y permisos (ver app/seguridad/menu.py).
+    # Apagado se muestra el menú fijo: se enciende cuando las páginas de todos
+    # los módulos y los permisos de cada grupo ya estén cargados
+    app.config['MENU_POR_PERMISOS'] = os.environ.get('MENU_POR_PERMISOS', '0') == '1'
+
+    # Proxies inversos delante de la aplicación (nginx, balanceador). Con 0 se
+    # ignoran las cabeceras X-Forwarded-*; con N se toma la IP del cliente que
+    # agregó el N-ésimo proxy, la que usa el límite de ingresos por IP
+    app.config['PROXIES_CONFIABLES'] = int(os.environ.get('PROXIES_CONFIABLES', 0))
+    if app.config['PROXIES_CONFIABLES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIABLES'],
+                                x_proto=app.config['PROXIES_CONFIABLES'])
+
+    from app.registro.registro_json import configurar_registro
+    configurar_registro(app)
+
+    # Auditoría de las escrituras a la API, escrita por lotes fuera de la solicitud
+    from app.registro.auditoria import auditoria
+    auditoria.configurar(app)
+
+    from app.seguridad.claves import servicio_claves
+    servicio_claves.configurar(app)
+
+    from app.seguridad.limite_ingresos import limite_ingresos
+    limite_ingresos.configurar(app)
+
+    # Atributos de cargos en memoria, recargados con cada cambio en la tabla
+    from app.dao.referenciales.cargo.cache_cargos import cache_cargos
+    cache_cargos.iniciar()
+
+    # Usuario de la sesión activo y con su grupo actual; antes que los permisos, que usan el grupo
+    from app.seguridad.sesiones import cache_sesiones
+    cache_sesiones.configurar(app)
+
+    # Permisos por grupo compilados en memoria; controla cada solicitud (ver app/seguridad/permisos.py)
+    from app.seguridad.permisos import motor_permisos
+    motor_permisos.configurar(app)
+
+    # Menú lateral por grupo, renderizado una vez por versión de permisos
+    from app.seguridad.menu import menu_grupos
+    menu_grupos.configurar(app)
+
+    # Especialistas por especialidad en memoria, descartados con cada aviso de cambio
+    from app.dao.gestionar_personas.especialista.EspecialistaDao import EspecialistaDao
+    EspecialistaDao.iniciar()
+
+    # Índice de disponibilidad: cada aviso aplica los días que encolaron las reservas
+    from app.dao.gestionar_turnos.disponibilidad.DisponibilidadDao import DisponibilidadDao
+    DisponibilidadDao.iniciar(app)
+
+    # Un hilo por worker escucha los avisos de la base para todas las cachés anteriores
+    from app.conexion.avisos import avisos
+    avisos.iniciar()
+
+    # importar modulo de seguridad
+    from app.rutas.seguridad.login_routes import logmod
+    app.register_blueprint(logmod)
+
+    # importar referenciales
+    from app.rutas.referenciales.ciudad.ciudad_routes import ciumod
+
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(ciumod, url_prefix=f'{modulo0}/ciudad')
+
+
+
+    # APIS v1
+    from app.rutas.referenciales.ciudad.ciudad_api import ciuapi
+
+
+    apiversion1 = '/api/v1'
+    app.register_blueprint(ciuapi, url_prefix=apiversion1)
+
+
+
+
+
+    # importar referenciales
+    from app.rutas.referenciales.especialidad.especialidad_routes import espmod
+
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(espmod, url_prefix=f'{modulo0}/especialidad')
+
+
+    # APIS v1
+    from app.rutas.referenciales.especialidad.especialidad_api import espapi
+
+    apiversion1 = '/api/v1'
+    app.register_blueprint(espapi, url_prefix=apiversion1)
+
+
+
+
+
+    # importar referenciales
+    from app.rutas.referenciales.genero.genero_routes import genmod
+
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(genmod, url_prefix=f'{modulo0}/genero')
+
+
+    # APIS v1
+    from app.rutas.referenciales.genero.genero_api import genapi
+
+    apiversion1 = '/api/v1'
+    app.register_blueprint(genapi, url_prefix=apiversion1)
+
+
+
+
+    # importar referenciales
+    from app.rutas.referenciales.estado_civil.estado_civil_routes import ecivmod
 
-# importar modulo de seguridad
-from app.rutas.seguridad.login_routes import logmod
-app.register_blueprint(logmod)
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(ecivmod, url_prefix=f'{modulo0}/estado-civil')
 
-# importar referenciales
-from app.rutas.referenciales.ciudad.ciudad_routes import ciumod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(ciumod, url_prefix=f'{modulo0}/ciudad')
+    # APIS v1
+    from app.rutas.referenciales.estado_civil.estado_civil_api import ecapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(ecapi, url_prefix=apiversion1)
 
 
-# APIS v1
-from app.rutas.referenciales.ciudad.ciudad_api import ciuapi
 
+    # importar referenciales
+    from app.rutas.referenciales.nivel_instruccion.nivel_instruccion_routes import nivmod
 
-apiversion1 = '/api/v1'
-app.register_blueprint(ciuapi, url_prefix=apiversion1)
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(nivmod, url_prefix=f'{modulo0}/nivel-instruccion')
 
 
+    # APIS v1
+    from app.rutas.referenciales.nivel_instruccion.nivel_instruccion_api import nivapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(nivapi, url_prefix=apiversion1)
 
 
-# importar referenciales
-from app.rutas.referenciales.especialidad.especialidad_routes import espmod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(espmod, url_prefix=f'{modulo0}/especialidad')
+    # importar referenciales
+    from app.rutas.referenciales.ocupacion.profesion_routes import profmod
 
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(profmod, url_prefix=f'{modulo0}/profesion')
 
-# APIS v1
-from app.rutas.referenciales.especialidad.especialidad_api import espapi
+    # APIS v1
+    from app.rutas.referenciales.ocupacion.profesion_api import profapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(espapi, url_prefix=apiversion1)
+    apiversion1 = '/api/v1'
+    app.register_blueprint(profapi, url_prefix=apiversion1)
 
 
 
+    # importar referenciales
+    from app.rutas.referenciales.cargo.cargo_routes import cargomod
 
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(cargomod, url_prefix=f'{modulo0}/cargo')
 
-# importar referenciales
-from app.rutas.referenciales.genero.genero_routes import genmod
+    # APIS v1
+    from app.rutas.referenciales.cargo.cargo_api import cargoapi
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(genmod, url_prefix=f'{modulo0}/genero')
+    apiversion1 = '/api/v1'
+    app.register_blueprint(cargoapi, url_prefix=apiversion1)
 
 
-# APIS v1
-from app.rutas.referenciales.genero.genero_api import genapi
+    # importar referenciales
+    from app.rutas.referenciales.grupo.grupo_routes import grupomod
 
-apiversion1 = '/api/v1'
-app.register_blueprint(genapi, url_prefix=apiversion1)
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(grupomod, url_prefix=f'{modulo0}/grupo')
 
+    # APIS v1
+    from app.rutas.referenciales.grupo.grupo_api import grupoapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(grupoapi, url_prefix=apiversion1)
 
 
-# importar referenciales
-from app.rutas.referenciales.estado_civil.estado_civil_routes import ecivmod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(ecivmod, url_prefix=f'{modulo0}/estado-civil')
+    # importar referenciales
+    from app.rutas.referenciales.modulo.modulo_routes import modmod
 
+    # registrar referenciales
+    modulo0 = '/referenciales'
+    app.register_blueprint(modmod, url_prefix=f'{modulo0}/modulo')
 
-# APIS v1
-from app.rutas.referenciales.estado_civil.estado_civil_api import ecapi
+    # APIS v1
+    from app.rutas.referenciales.modulo.modulo_api import modapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(ecapi, url_prefix=apiversion1)
+    apiversion1 = '/api/v1'
+    app.register_blueprint(modapi, url_prefix=apiversion1)
 
 
 
-# importar referenciales
-from app.rutas.referenciales.nivel_instruccion.nivel_instruccion_routes import nivmod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(nivmod, url_prefix=f'{modulo0}/nivel-instruccion')
+    # importar referenciales
+    from app.rutas.gestionar_personas.paciente.paciente_routes import pacientemod
 
+    # registrar referenciales
+    modulo1 = '/modulos'
+    app.register_blueprint(pacientemod, url_prefix=f'{modulo1}/paciente')
 
-# APIS v1
-from app.rutas.referenciales.nivel_instruccion.nivel_instruccion_api import nivapi
+    # APIS v1
+    from app.rutas.gestionar_personas.paciente.paciente_api import pacienteapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(nivapi, url_prefix=apiversion1)
+    apiversion1 = '/api/v1'
+    app.register_blueprint(pacienteapi, url_prefix=apiversion1)
 
 
+    # Después de registrar el blueprint
+    for rule in app.url_map.iter_rules():
+        if 'pacientes' in str(rule):
+            print(f"{rule.rule} --> {rule.methods} --> {rule.endpoint}")
 
-# importar referenciales
-from app.rutas.referenciales.ocupacion.profesion_routes import profmod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(profmod, url_prefix=f'{modulo0}/profesion')
 
-# APIS v1
-from app.rutas.referenciales.ocupacion.profesion_api import profapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(profapi, url_prefix=apiversion1)
 
+            # importar referenciales
+    from app.rutas.gestionar_personas.funcionario.funcionario_routes import funcionariomod
 
+    # registrar referenciales
+    modulo1 = '/modulos'
+    app.register_blueprint(funcionariomod, url_prefix=f'{modulo1}/funcionario')
 
-# importar referenciales
-from app.rutas.referenciales.cargo.cargo_routes import cargomod
+    # APIS v1
+    from app.rutas.gestionar_personas.funcionario.funcionario_api import funcionarioapi
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(cargomod, url_prefix=f'{modulo0}/cargo')
+    apiversion1 = '/api/v1'
+    app.register_blueprint(funcionarioapi, url_prefix=apiversion1)
 
-# APIS v1
-from app.rutas.referenciales.cargo.cargo_api import cargoapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(cargoapi, url_prefix=apiversion1)
 
+    # Registrar módulo de usuarios
+    from app.rutas.seguridad.usuario.usuario_routes import usumod
 
-# importar referenciales
-from app.rutas.referenciales.grupo.grupo_routes import grupomod
+    modulo1 = '/modulos'
+    app.register_blueprint(usumod, url_prefix=f'{modulo1}/usuario')
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(grupomod, url_prefix=f'{modulo0}/grupo')
+    # API de usuarios
+    from app.rutas.seguridad.usuario.usuario_api import usuarioapi
 
-# APIS v1
-from app.rutas.referenciales.grupo.grupo_api import grupoapi
+    apiversion1 = '/api/v1'
+    app.register_blueprint(usuarioapi, url_prefix=apiversion1)
 
-apiversion1 = '/api/v1'
-app.register_blueprint(grupoapi, url_prefix=apiversion1)
 
+    # API de permisos por grupo
+    from app.rutas.seguridad.permiso.permiso_api import permisoapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(permisoapi, url_prefix=apiversion1)
 
-# importar referenciales
-from app.rutas.referenciales.modulo.modulo_routes import modmod
 
-# registrar referenciales
-modulo0 = '/referenciales'
-app.register_blueprint(modmod, url_prefix=f'{modulo0}/modulo')
+    # API de cambios (sincronización incremental)
+    from app.rutas.gestionar_personas.cambio.cambio_api import cambioapi
 
-# APIS v1
-from app.rutas.referenciales.modulo.modulo_api import modapi
+    apiversion1 = '/api/v1'
+    app.register_blueprint(cambioapi, url_prefix=apiversion1)
 
-apiversion1 = '/api/v1'
-app.register_blueprint(modapi, url_prefix=apiversion1)
 
+    # API de estadísticas
+    from app.rutas.gestionar_personas.estadistica.estadistica_api import estadisticaapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(estadisticaapi, url_prefix=apiversion1)
 
 
-# importar referenciales
-from app.rutas.gestionar_personas.paciente.paciente_routes import pacientemod
+    # API de personas duplicadas
+    from app.rutas.gestionar_personas.duplicado.duplicado_api import duplicadoapi
 
-# registrar referenciales
-modulo1 = '/modulos'
-app.register_blueprint(pacientemod, url_prefix=f'{modulo1}/paciente')
+    apiversion1 = '/api/v1'
+    app.register_blueprint(duplicadoapi, url_prefix=apiversion1)
 
-# APIS v1
-from app.rutas.gestionar_personas.paciente.paciente_api import pacienteapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(pacienteapi, url_prefix=apiversion1)
+    # API de horarios y turnos de especialistas
+    from app.rutas.gestionar_turnos.horario.horario_api import horarioapi
+    from app.rutas.gestionar_turnos.turno.turno_api import turnoapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(horarioapi, url_prefix=apiversion1)
+    app.register_blueprint(turnoapi, url_prefix=apiversion1)
 
-# Después de registrar el blueprint
-for rule in app.url_map.iter_rules():
-    if 'pacientes' in str(rule):
-        print(f"{rule.rule} --> {rule.methods} --> {rule.endpoint}")
 
+    # API de disponibilidad de turnos por especialidad
+    from app.rutas.gestionar_turnos.disponibilidad.disponibilidad_api import disponibilidadapi
 
+    apiversion1 = '/api/v1'
+    app.register_blueprint(disponibilidadapi, url_prefix=apiversion1)
 
 
+    # API de especialistas por especialidad
+    from app.rutas.gestionar_personas.especialista.especialista_api import especialistaapi
 
-        # importar referenciales
-from app.rutas.gestionar_personas.funcionario.funcionario_routes import funcionariomod
+    apiversion1 = '/api/v1'
+    app.register_blueprint(especialistaapi, url_prefix=apiversion1)
 
-# registrar referenciales
-modulo1 = '/modulos'
-app.register_blueprint(funcionariomod, url_prefix=f'{modulo1}/funcionario')
 
-# APIS v1
-from app.rutas.gestionar_personas.funcionario.funcionario_api import funcionarioapi
+    # Proceso de detección de duplicados (flask detectar-duplicados)
+    from app.procesos.duplicados_personas import detectar_duplicados_comando
+    app.cli.add_command(detectar_duplicados_comando)
 
-apiversion1 = '/api/v1'
-app.register_blueprint(funcionarioapi, url_prefix=apiversion1)
+    # Mantenimiento diario del índice de disponibilidad (flask refrescar-disponibilidad)
+    from app.procesos.disponibilidad_turnos import refrescar_disponibilidad_comando
+    app.cli.add_command(refrescar_disponibilidad_comando)
 
+    # Iteraciones de PBKDF2 para este servidor (flask calibrar-claves)
+    from app.procesos.calibrar_claves import calibrar_claves_comando
+    app.cli.add_command(calibrar_claves_comando)
 
+    return app
 
-# Registrar módulo de usuarios
-from app.rutas.seguridad.usuario.usuario_routes import usumod
 
-modulo1 = '/modulos'
-app.register_blueprint(usumod, url_prefix=f'{modulo1}/usuario')
+_app = None
+_lock = threading.Lock()
 
-# API de usuarios
-from app.rutas.seguridad.usuario.usuario_api import usuarioapi
 
-apiversion1 = '/api/v1'
-app.register_blueprint(usuarioapi, url_prefix=apiversion1)
\ No newline at end of file
+def __getattr__(nombre):
+    """`from app import app`: crea la aplicación en el primer acceso"""
+    global _app
+    if nombre != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    with _lock:
+        if _app is None:
+            _app = crear_app()
+    return _app
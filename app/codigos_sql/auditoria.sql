@@ -0,0 +1,26 @@
+-- ============================================
+-- AUDITORÍA DE CAMBIOS
+-- ============================================
+-- Una fila por solicitud de escritura (POST/PUT/PATCH/DELETE) de la API que
+-- terminó bien: quién, sobre qué entidad y con qué campos. La aplicación las
+-- junta en memoria y las inserta por lotes desde un hilo aparte
+-- (app/registro/auditoria.py): una fila puede llegar uno o dos segundos
+-- después de la solicitud.
+-- Sin claves foráneas: no frenan los lotes y la historia sobrevive a los borrados.
+
+CREATE TABLE IF NOT EXISTS auditoria(
+    id_auditoria BIGSERIAL PRIMARY KEY
+    , aud_fecha TIMESTAMPTZ NOT NULL
+    , id_usuario INTEGER
+    , aud_entidad VARCHAR(60) NOT NULL
+    , aud_id_entidad VARCHAR(60)
+    , aud_metodo VARCHAR(10) NOT NULL
+    , aud_endpoint VARCHAR(120) NOT NULL
+    , aud_campos JSONB
+    , aud_ip VARCHAR(45)
+    , aud_id_solicitud VARCHAR(64)
+);
+
+-- Historia de un registro y actividad de un usuario
+CREATE INDEX IF NOT EXISTS idx_auditoria_entidad ON auditoria(aud_entidad, aud_id_entidad, aud_fecha);
+CREATE INDEX IF NOT EXISTS idx_auditoria_usuario ON auditoria(id_usuario, aud_fecha);
@@ -0,0 +1,89 @@
+-- ============================================
+-- REGISTRO DE CAMBIOS (sincronización incremental, /api/v1/cambios)
+-- ============================================
+-- Cada INSERT/UPDATE/DELETE en personas, pacientes, pacientes_menores y
+-- funcionarios deja una fila en cambios. El token de los clientes es
+-- (cam_transaccion, cam_id): solo se entregan cambios de transacciones ya
+-- terminadas, así un cambio que confirma tarde nunca queda detrás del token.
+
+CREATE TABLE IF NOT EXISTS cambios(
+    cam_id BIGSERIAL PRIMARY KEY
+    , cam_transaccion BIGINT NOT NULL DEFAULT txid_current()
+    , cam_tabla VARCHAR(30) NOT NULL
+    , cam_registro INTEGER NOT NULL
+    , cam_operacion CHAR(1) NOT NULL CHECK (cam_operacion IN ('I', 'U', 'D'))
+    , cam_fecha TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_cambios_transaccion ON cambios(cam_transaccion, cam_id);
+
+-- Fecha de última modificación mantenida por trigger
+ALTER TABLE personas ADD COLUMN IF NOT EXISTS per_actualizado TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE pacientes ADD COLUMN IF NOT EXISTS pac_actualizado TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE funcionarios ADD COLUMN IF NOT EXISTS fun_actualizado TIMESTAMPTZ NOT NULL DEFAULT now();
+
+
+-- TG_ARGV[0]: columna de fecha de actualización
+CREATE OR REPLACE FUNCTION fn_marcar_actualizado() RETURNS trigger AS $$
+BEGIN
+    NEW := jsonb_populate_record(NEW, jsonb_build_object(TG_ARGV[0], now()));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- TG_ARGV[0]: tabla publicada en el feed
+-- TG_ARGV[1]: columna con el ID publicado
+-- TG_ARGV[2]: operación fija (opcional; p. ej. 'U' para tablas hijas)
+CREATE OR REPLACE FUNCTION fn_registrar_cambio() RETURNS trigger AS $$
+DECLARE
+    fila JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := to_jsonb(OLD);
+    ELSE
+        fila := to_jsonb(NEW);
+    END IF;
+
+    INSERT INTO cambios(cam_tabla, cam_registro, cam_operacion)
+    VALUES (TG_ARGV[0], (fila ->> TG_ARGV[1])::INTEGER,
+            COALESCE(TG_ARGV[2], LEFT(TG_OP, 1)));
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DROP TRIGGER IF EXISTS trg_personas_actualizado ON personas;
+CREATE TRIGGER trg_personas_actualizado BEFORE UPDATE ON personas
+    FOR EACH ROW EXECUTE PROCEDURE fn_marcar_actualizado('per_actualizado');
+
+DROP TRIGGER IF EXISTS trg_pacientes_actualizado ON pacientes;
+CREATE TRIGGER trg_pacientes_actualizado BEFORE UPDATE ON pacientes
+    FOR EACH ROW EXECUTE PROCEDURE fn_marcar_actualizado('pac_actualizado');
+
+DROP TRIGGER IF EXISTS trg_funcionarios_actualizado ON funcionarios;
+CREATE TRIGGER trg_funcionarios_actualizado BEFORE UPDATE ON funcionarios
+    FOR EACH ROW EXECUTE PROCEDURE fn_marcar_actualizado('fun_actualizado');
+
+
+DROP TRIGGER IF EXISTS trg_personas_cambios ON personas;
+CREATE TRIGGER trg_personas_cambios AFTER INSERT OR UPDATE OR DELETE ON personas
+    FOR EACH ROW EXECUTE PROCEDURE fn_registrar_cambio('personas', 'id_persona');
+
+DROP TRIGGER IF EXISTS trg_pacientes_cambios ON pacientes;
+CREATE TRIGGER trg_pacientes_cambios AFTER INSERT OR UPDATE OR DELETE ON pacientes
+    FOR EACH ROW EXECUTE PROCEDURE fn_registrar_cambio('pacientes', 'id_paciente');
+
+-- Los datos de menor son parte de la ficha: se publican como cambio del paciente
+DROP TRIGGER IF EXISTS trg_pacientes_menores_cambios ON pacientes_menores;
+CREATE TRIGGER trg_pacientes_menores_cambios AFTER INSERT OR UPDATE OR DELETE ON pacientes_menores
+    FOR EACH ROW EXECUTE PROCEDURE fn_registrar_cambio('pacientes', 'id_paciente', 'U');
+
+DROP TRIGGER IF EXISTS trg_funcionarios_cambios ON funcionarios;
+CREATE TRIGGER trg_funcionarios_cambios AFTER INSERT OR UPDATE OR DELETE ON funcionarios
+    FOR EACH ROW EXECUTE PROCEDURE fn_registrar_cambio('funcionarios', 'id_funcionario');
+
+
+-- Limpieza periódica sugerida (los clientes con token más viejo recargan todo)
+-- DELETE FROM cambios WHERE cam_fecha < now() - INTERVAL '30 days';
@@ -0,0 +1,36 @@
+-- ============================================
+-- ATRIBUTOS DE CARGOS
+-- ============================================
+-- Qué datos exige cada cargo al dar de alta o editar un funcionario. La
+-- aplicación los tiene en memoria (app/dao/referenciales/cargo/cache_cargos.py)
+-- y los vuelve a leer cuando llega una notificación por el canal
+-- cargos_cambios, así un cargo nuevo de especialista no requiere desplegar.
+
+ALTER TABLE cargos ADD COLUMN IF NOT EXISTS car_requiere_especialista BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE cargos ADD COLUMN IF NOT EXISTS car_requiere_matricula BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- La matrícula se guarda en especialistas: solo la exige un cargo de especialista
+ALTER TABLE cargos DROP CONSTRAINT IF EXISTS cargos_matricula_especialista;
+ALTER TABLE cargos ADD CONSTRAINT cargos_matricula_especialista
+    CHECK (car_requiere_especialista OR NOT car_requiere_matricula);
+
+-- Un cargo de especialista puede no exigir matrícula
+ALTER TABLE especialistas ALTER COLUMN esp_matricula DROP NOT NULL;
+
+-- Hasta ahora fijo en el código (FuncionarioDao.CARGOS_ESPECIALISTAS = [3])
+UPDATE cargos SET car_requiere_especialista = TRUE, car_requiere_matricula = TRUE
+WHERE id_cargo = 3;
+
+
+-- Avisa a todos los workers; el payload no se usa, se relee la tabla entera
+CREATE OR REPLACE FUNCTION fn_notificar_cargos() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cargos_cambios', TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_cargos_notificar ON cargos;
+CREATE TRIGGER tg_cargos_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cargos
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_cargos();
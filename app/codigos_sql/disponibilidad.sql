@@ -0,0 +1,204 @@
+-- ============================================
+-- ÍNDICE DE DISPONIBILIDAD DE ESPECIALISTAS (/api/v1/disponibilidad)
+-- ============================================
+-- Una fila por especialista y día con un BIT(288): un bit por cada 5 minutos
+-- del día local (bit 0 = 00:00). El bit está en 1 si en ese minuto empieza un
+-- turno de la plantilla que sigue libre. Requiere turnos.sql.
+--
+-- Mantenimiento:
+--   * reservar / cancelar / reprogramar / cambio de plantilla: los triggers
+--     solo agregan una fila a disponibilidad_pendientes y avisan por el canal
+--     disponibilidad_cambios. La reserva no toca la fila del día, que es
+--     compartida por todas las reservas del especialista: dos reservas del
+--     mismo día en horarios distintos no se esperan.
+--   * cada worker escucha el canal y aplica la cola (fn_aplicar_disponibilidad,
+--     ver DisponibilidadDao) recalculando los días afectados. El índice queda
+--     atrás de una reserva lo que tarda el aviso; reservar controla contra
+--     turnos, así que un bit libre desactualizado solo termina en "ocupado".
+--   * diario: flask refrescar-disponibilidad (extiende el horizonte y borra
+--     los días pasados)
+--
+-- La zona de las horas locales la pasa la aplicación (app.config['ZONA_HORARIA']).
+-- Después de aplicar este archivo: flask --app app refrescar-disponibilidad
+
+-- Versiones anteriores: bit por reserva dentro de la transacción y zona fija
+DROP FUNCTION IF EXISTS fn_marcar_disponibilidad(INTEGER, TSTZRANGE, BOOLEAN);
+DROP FUNCTION IF EXISTS fn_refrescar_disponibilidad(INTEGER, DATE, DATE);
+DROP FUNCTION IF EXISTS fn_avanzar_disponibilidad();
+DROP FUNCTION IF EXISTS fn_zona_agenda();
+
+-- Días hacia adelante que se mantienen calculados
+CREATE OR REPLACE FUNCTION fn_horizonte_disponibilidad() RETURNS INTEGER AS $$
+    SELECT 90
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Las franjas y duraciones deben caer en la grilla de 5 minutos
+ALTER TABLE horarios_especialistas DROP CONSTRAINT IF EXISTS horarios_grilla_cinco_minutos;
+ALTER TABLE horarios_especialistas ADD CONSTRAINT horarios_grilla_cinco_minutos
+    CHECK (extract(minute FROM hor_inicio)::int % 5 = 0 AND extract(second FROM hor_inicio) = 0
+           AND extract(minute FROM hor_fin)::int % 5 = 0 AND extract(second FROM hor_fin) = 0
+           AND hor_duracion_minutos % 5 = 0);
+
+CREATE TABLE IF NOT EXISTS disponibilidad_especialistas(
+    id_especialista INTEGER NOT NULL
+    , dis_fecha DATE NOT NULL
+    , dis_libres BIT(288) NOT NULL
+    , PRIMARY KEY(id_especialista, dis_fecha)
+    , FOREIGN KEY(id_especialista) REFERENCES especialistas(id_especialista)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+
+-- Cambios por aplicar al índice. Sin claves únicas: agregar una fila nunca
+-- espera a otra transacción. pen_periodo NULL: todo el horizonte (plantilla)
+CREATE TABLE IF NOT EXISTS disponibilidad_pendientes(
+    id_pendiente BIGSERIAL PRIMARY KEY
+    , id_especialista INTEGER NOT NULL
+    , pen_periodo TSTZRANGE
+    , FOREIGN KEY(id_especialista) REFERENCES especialistas(id_especialista)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+
+-- Recalcula los días [desde, hasta] de un especialista desde la plantilla y los turnos
+CREATE OR REPLACE FUNCTION fn_refrescar_disponibilidad(p_especialista INTEGER, p_desde DATE, p_hasta DATE,
+                                                       p_zona TEXT)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO disponibilidad_especialistas(id_especialista, dis_fecha, dis_libres)
+    SELECT p_especialista, dias.dia,
+           (SELECT string_agg(CASE WHEN libres.unidad IS NULL THEN '0' ELSE '1' END, '' ORDER BY u.unidad)
+            FROM generate_series(0, 287) AS u(unidad)
+            LEFT JOIN (
+                SELECT DISTINCT (extract(epoch FROM inicio::time)::int / 300) AS unidad
+                FROM horarios_especialistas h
+                CROSS JOIN LATERAL generate_series(
+                    dias.dia + h.hor_inicio,
+                    dias.dia + h.hor_fin - make_interval(mins => h.hor_duracion_minutos),
+                    make_interval(mins => h.hor_duracion_minutos)) AS inicio
+                WHERE h.id_especialista = p_especialista
+                  AND h.hor_dia_semana = extract(isodow FROM dias.dia)
+                  AND NOT EXISTS (
+                    SELECT 1 FROM turnos t
+                    WHERE t.id_especialista = p_especialista
+                      AND t.tur_estado = 'reservado'
+                      AND t.tur_periodo && tstzrange(
+                          inicio AT TIME ZONE p_zona,
+                          (inicio + make_interval(mins => h.hor_duracion_minutos)) AT TIME ZONE p_zona)
+                  )
+            ) libres ON libres.unidad = u.unidad)::BIT(288)
+    FROM generate_series(p_desde, p_hasta, INTERVAL '1 day') AS d
+    CROSS JOIN LATERAL (SELECT d::date AS dia) AS dias
+    ON CONFLICT (id_especialista, dis_fecha) DO UPDATE SET dis_libres = EXCLUDED.dis_libres;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Encola los días que cambian; la reserva no espera a nadie por el índice
+CREATE OR REPLACE FUNCTION fn_disponibilidad_desde_turnos() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND OLD.tur_estado = 'reservado' THEN
+        INSERT INTO disponibilidad_pendientes(id_especialista, pen_periodo)
+        VALUES (OLD.id_especialista, OLD.tur_periodo);
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.tur_estado = 'reservado' THEN
+        INSERT INTO disponibilidad_pendientes(id_especialista, pen_periodo)
+        VALUES (NEW.id_especialista, NEW.tur_periodo);
+    END IF;
+    -- Los avisos iguales de una transacción llegan una sola vez, al confirmar
+    PERFORM pg_notify('disponibilidad_cambios', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_disponibilidad_turnos ON turnos;
+CREATE TRIGGER trg_disponibilidad_turnos AFTER INSERT OR DELETE OR UPDATE OF tur_estado, tur_periodo ON turnos
+    FOR EACH ROW EXECUTE PROCEDURE fn_disponibilidad_desde_turnos();
+
+
+-- Cambio de plantilla: encola el horizonte de cada especialista afectado
+-- (por sentencia: reemplazar la plantilla entera encola una vez por operación)
+CREATE OR REPLACE FUNCTION fn_disponibilidad_desde_horarios() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO disponibilidad_pendientes(id_especialista) SELECT DISTINCT id_especialista FROM nuevos;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO disponibilidad_pendientes(id_especialista)
+        SELECT id_especialista FROM nuevos UNION SELECT id_especialista FROM viejos;
+    ELSE
+        INSERT INTO disponibilidad_pendientes(id_especialista) SELECT DISTINCT id_especialista FROM viejos;
+    END IF;
+    PERFORM pg_notify('disponibilidad_cambios', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_disponibilidad_horarios_ins ON horarios_especialistas;
+CREATE TRIGGER trg_disponibilidad_horarios_ins AFTER INSERT ON horarios_especialistas
+    REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_disponibilidad_desde_horarios();
+
+DROP TRIGGER IF EXISTS trg_disponibilidad_horarios_upd ON horarios_especialistas;
+CREATE TRIGGER trg_disponibilidad_horarios_upd AFTER UPDATE ON horarios_especialistas
+    REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_disponibilidad_desde_horarios();
+
+DROP TRIGGER IF EXISTS trg_disponibilidad_horarios_del ON horarios_especialistas;
+CREATE TRIGGER trg_disponibilidad_horarios_del AFTER DELETE ON horarios_especialistas
+    REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_disponibilidad_desde_horarios();
+
+
+-- Aplica la cola: recalcula cada día encolado que está en el horizonte (los
+-- demás no tienen fila) y el horizonte entero de los cambios de plantilla.
+-- Retorna los cambios aplicados.
+CREATE OR REPLACE FUNCTION fn_aplicar_disponibilidad(p_zona TEXT) RETURNS INTEGER AS $$
+DECLARE
+    hoy DATE := (now() AT TIME ZONE p_zona)::date;
+    cambio RECORD;
+    cantidad INTEGER := 0;
+BEGIN
+    -- Un worker a la vez. Cada sentencia lee lo confirmado hasta ese momento:
+    -- el que esperaba recalcula después y con las reservas más recientes, así
+    -- un recálculo viejo nunca pisa a uno nuevo
+    PERFORM pg_advisory_xact_lock(hashtext('disponibilidad_pendientes'));
+
+    FOR cambio IN
+        WITH aplicados AS (
+            DELETE FROM disponibilidad_pendientes RETURNING id_especialista, pen_periodo
+        )
+        SELECT DISTINCT id_especialista, (lower(pen_periodo) AT TIME ZONE p_zona)::date AS dia
+        FROM aplicados
+    LOOP
+        IF cambio.dia IS NULL THEN
+            PERFORM fn_refrescar_disponibilidad(cambio.id_especialista, hoy,
+                                                hoy + fn_horizonte_disponibilidad(), p_zona);
+        ELSIF EXISTS (SELECT 1 FROM disponibilidad_especialistas
+                      WHERE id_especialista = cambio.id_especialista AND dis_fecha = cambio.dia) THEN
+            PERFORM fn_refrescar_disponibilidad(cambio.id_especialista, cambio.dia, cambio.dia, p_zona);
+        END IF;
+        cantidad := cantidad + 1;
+    END LOOP;
+    RETURN cantidad;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Avanza el horizonte de todos los especialistas con plantilla y borra los
+-- días pasados. Recalcula todo, así que también vacía la cola.
+CREATE OR REPLACE FUNCTION fn_avanzar_disponibilidad(p_zona TEXT) RETURNS INTEGER AS $$
+DECLARE
+    hoy DATE := (now() AT TIME ZONE p_zona)::date;
+    especialista INTEGER;
+    cantidad INTEGER := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('disponibilidad_pendientes'));
+    DELETE FROM disponibilidad_pendientes;
+    DELETE FROM disponibilidad_especialistas WHERE dis_fecha < hoy;
+    FOR especialista IN SELECT DISTINCT id_especialista FROM horarios_especialistas LOOP
+        PERFORM fn_refrescar_disponibilidad(especialista, hoy, hoy + fn_horizonte_disponibilidad(), p_zona);
+        cantidad := cantidad + 1;
+    END LOOP;
+    RETURN cantidad;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,40 @@
+-- ============================================
+-- AVISOS DE CAMBIOS EN ESPECIALISTAS
+-- ============================================
+-- Cada worker guarda en memoria los especialistas activos de cada
+-- especialidad (EspecialistaDao). Cualquier cambio en lo que muestra esa
+-- lista avisa por el canal especialistas_cambios y todos los workers la
+-- descartan. El payload no se usa.
+
+CREATE OR REPLACE FUNCTION fn_notificar_especialistas() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('especialistas_cambios', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_especialista_especialidades_notificar ON especialista_especialidades;
+CREATE TRIGGER tg_especialista_especialidades_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON especialista_especialidades
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_especialistas();
+
+DROP TRIGGER IF EXISTS tg_especialistas_notificar ON especialistas;
+CREATE TRIGGER tg_especialistas_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON especialistas
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_especialistas();
+
+-- fun_estado decide si el especialista aparece
+DROP TRIGGER IF EXISTS tg_funcionarios_notificar_especialistas ON funcionarios;
+CREATE TRIGGER tg_funcionarios_notificar_especialistas
+AFTER UPDATE OF fun_estado ON funcionarios
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_especialistas();
+
+-- Nombre y apellido; el resto de personas (pacientes) no avisa. Los avisos
+-- iguales de una misma transacción llegan una sola vez.
+DROP TRIGGER IF EXISTS tg_personas_notificar_especialistas ON personas;
+CREATE TRIGGER tg_personas_notificar_especialistas
+AFTER UPDATE ON personas
+FOR EACH ROW
+WHEN (OLD.per_nombre IS DISTINCT FROM NEW.per_nombre
+      OR OLD.per_apellido IS DISTINCT FROM NEW.per_apellido)
+EXECUTE PROCEDURE fn_notificar_especialistas();
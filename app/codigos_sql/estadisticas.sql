@@ -0,0 +1,9 @@
+-- ============================================
+-- ÍNDICES PARA /api/v1/estadisticas/pacientes
+-- ============================================
+
+-- Serie de inscripciones por rango de fechas
+CREATE INDEX IF NOT EXISTS idx_personas_fecha_inscripcion ON personas(per_fecha_inscripcion);
+
+-- Unión pacientes -> personas en el resumen (solo lectura del índice)
+CREATE INDEX IF NOT EXISTS idx_pacientes_persona ON pacientes(id_persona);
@@ -0,0 +1,27 @@
+-- ============================================
+-- ÍNDICES PARA EL LISTADO DE FUNCIONARIOS
+-- ============================================
+-- Las especialidades de cada especialista se leen con un array_agg por fila
+-- (LEFT JOIN LATERAL) en lugar de agrupar todo el join: cada lectura es un
+-- recorrido corto del índice por id_especialista.
+
+-- Especialidades de un especialista (sirve solo con el índice). Cada
+-- especialidad una sola vez: dos ediciones simultáneas que agregan la misma
+-- no la duplican (los INSERT usan ON CONFLICT DO NOTHING)
+DELETE FROM especialista_especialidades a
+USING especialista_especialidades b
+WHERE a.id_especialista = b.id_especialista AND a.id_especialidad = b.id_especialidad
+  AND a.ctid > b.ctid;
+ALTER TABLE especialista_especialidades DROP CONSTRAINT IF EXISTS especialista_especialidades_unica;
+ALTER TABLE especialista_especialidades ADD CONSTRAINT especialista_especialidades_unica
+    UNIQUE (id_especialista, id_especialidad);
+DROP INDEX IF EXISTS idx_especialista_especialidades_especialista;
+
+-- Filtro por especialidad: especialistas que la tienen
+CREATE INDEX IF NOT EXISTS idx_especialista_especialidades_especialidad
+    ON especialista_especialidades(id_especialidad, id_especialista);
+
+-- Especialista de un funcionario
+CREATE INDEX IF NOT EXISTS idx_especialistas_funcionario ON especialistas(id_funcionario);
+
+ANALYZE especialista_especialidades;
@@ -0,0 +1,34 @@
+-- ============================================
+-- LÍMITE DE INTENTOS DE INGRESO
+-- ============================================
+-- Cubetas de fichas compartidas por todos los workers, por nick y por IP
+-- (ver app/seguridad/limite_ingresos.py). Cada intento toma una ficha; sin
+-- fichas se rechaza antes de buscar al usuario y de calcular ningún hash.
+-- UNLOGGED: no pasa por el WAL; si la base se cae se pierden y vuelven llenas.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS ingresos_fichas(
+    fic_clave VARCHAR(200) PRIMARY KEY
+    , fic_fichas DOUBLE PRECISION NOT NULL
+    , fic_actualizado TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+-- Recarga según el tiempo transcurrido (una ficha cada p_segundos, hasta
+-- p_capacidad) y toma una. Un intento rechazado también descuenta, hasta
+-- -1: quien insiste sin pausa sigue esperando. TRUE si había ficha.
+CREATE OR REPLACE FUNCTION fn_tomar_ficha(p_clave VARCHAR, p_capacidad INTEGER, p_segundos DOUBLE PRECISION)
+RETURNS BOOLEAN AS $$
+    INSERT INTO ingresos_fichas AS f(fic_clave, fic_fichas, fic_actualizado)
+    VALUES (p_clave, p_capacidad - 1, clock_timestamp())
+    ON CONFLICT (fic_clave) DO UPDATE
+    SET fic_fichas = GREATEST(LEAST(p_capacidad::double precision,
+            f.fic_fichas + extract(epoch FROM clock_timestamp() - f.fic_actualizado) / p_segundos) - 1, -1),
+        fic_actualizado = clock_timestamp()
+    RETURNING fic_fichas >= 0;
+$$ LANGUAGE sql;
+
+
+-- Bloqueo por intentos fallidos: al llegar a LOGIN_MAX_INTENTOS el usuario
+-- queda bloqueado LOGIN_BLOQUEO_MINUTOS; cada fallo posterior lo renueva
+-- hasta un ingreso correcto o hasta que se reseteen los intentos.
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS usu_bloqueado_hasta TIMESTAMPTZ;
+UPDATE usuarios SET usu_nro_intentos = 0 WHERE usu_nro_intentos IS NULL;
@@ -0,0 +1,186 @@
+-- ============================================
+-- MODELO DE LECTURA DE PACIENTES (pacientes_vista)
+-- ============================================
+-- Una fila por paciente con las descripciones de catálogo ya resueltas.
+-- Listado, ficha y búsqueda leen solo esta tabla. Los triggers la mantienen
+-- al día en la misma transacción que modifica las tablas base: pacientes,
+-- personas y pacientes_menores se refrescan por sentencia (tablas de
+-- transición) y los catálogos actualizan la descripción en su lugar.
+-- es_menor y edad no se guardan: dependen de la fecha actual.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Fuente única de las columnas de la vista (se usa al refrescar)
+CREATE OR REPLACE VIEW pacientes_vista_fuente AS
+SELECT
+    pac.id_paciente,
+    pac.id_persona,
+    pac.pac_historia_clinica AS historia_clinica,
+    pac.pac_observaciones AS observaciones,
+    p.per_nombre AS nombre,
+    p.per_apellido AS apellido,
+    p.per_cedula AS cedula,
+    p.per_fecha_nacimiento AS fecha_nacimiento,
+    p.per_telefono AS telefono,
+    p.per_correo AS correo,
+    p.per_domicilio AS domicilio,
+    p.per_fecha_inscripcion AS fecha_registro,
+    p.id_genero,
+    g.des_genero AS genero,
+    p.id_estado_civil,
+    ec.des_estado_civil AS estado_civil,
+    p.id_ciudad,
+    c.des_ciudad AS ciudad,
+    p.id_ciudad_nacimiento,
+    cn.des_ciudad AS ciudad_nacimiento,
+    p.id_nivel_instruccion,
+    ni.des_nivel_instruccion AS nivel_instruccion,
+    p.id_profesion,
+    pr.des_profesion AS profesion,
+    pm.pam_nom_madre AS nom_madre,
+    pm.pam_tel_madre AS tel_madre,
+    pm.pam_nom_padre AS nom_padre,
+    pm.pam_tel_padre AS tel_padre,
+    pm.pam_educacion AS educacion,
+    pm.pam_colegio AS colegio,
+    pm.pam_tel_colegio AS tel_colegio,
+    lower(concat_ws(' ', p.per_nombre, p.per_apellido, p.per_cedula, pac.pac_historia_clinica)) AS busqueda
+FROM pacientes pac
+JOIN personas p ON pac.id_persona = p.id_persona
+LEFT JOIN generos g ON p.id_genero = g.id_genero
+LEFT JOIN estados_civiles ec ON p.id_estado_civil = ec.id_estado_civil
+LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad
+LEFT JOIN ciudades cn ON p.id_ciudad_nacimiento = cn.id_ciudad
+LEFT JOIN niveles_instruccion ni ON p.id_nivel_instruccion = ni.id_nivel_instruccion
+LEFT JOIN profesiones pr ON p.id_profesion = pr.id_profesion
+LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente;
+
+CREATE TABLE IF NOT EXISTS pacientes_vista AS
+SELECT * FROM pacientes_vista_fuente WITH NO DATA;
+
+ALTER TABLE pacientes_vista DROP CONSTRAINT IF EXISTS pacientes_vista_pkey;
+ALTER TABLE pacientes_vista ADD CONSTRAINT pacientes_vista_pkey PRIMARY KEY (id_paciente);
+
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_persona ON pacientes_vista(id_persona);
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_ciudad ON pacientes_vista(id_ciudad);
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_genero ON pacientes_vista(id_genero);
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_nacimiento ON pacientes_vista(fecha_nacimiento);
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_registro ON pacientes_vista(fecha_registro);
+CREATE INDEX IF NOT EXISTS idx_pacientes_vista_busqueda ON pacientes_vista USING gin (busqueda gin_trgm_ops);
+
+
+-- Recalcula las filas de los pacientes indicados (borra las que ya no existen)
+CREATE OR REPLACE FUNCTION fn_refrescar_pacientes_vista(ids INTEGER[]) RETURNS void AS $$
+BEGIN
+    DELETE FROM pacientes_vista WHERE id_paciente = ANY(ids);
+    INSERT INTO pacientes_vista
+    SELECT * FROM pacientes_vista_fuente WHERE id_paciente = ANY(ids);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Triggers por sentencia: un solo refresco aunque la carga por lotes toque miles de filas
+CREATE OR REPLACE FUNCTION fn_vista_desde_pacientes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM fn_refrescar_pacientes_vista(ARRAY(SELECT id_paciente FROM nuevos));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM fn_refrescar_pacientes_vista(ARRAY(SELECT id_paciente FROM nuevos
+                                                   UNION SELECT id_paciente FROM viejos));
+    ELSE
+        PERFORM fn_refrescar_pacientes_vista(ARRAY(SELECT id_paciente FROM viejos));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_vista_desde_personas() RETURNS trigger AS $$
+BEGIN
+    PERFORM fn_refrescar_pacientes_vista(ARRAY(
+        SELECT pac.id_paciente FROM pacientes pac JOIN nuevos n ON pac.id_persona = n.id_persona));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DROP TRIGGER IF EXISTS trg_vista_pacientes_ins ON pacientes;
+CREATE TRIGGER trg_vista_pacientes_ins AFTER INSERT ON pacientes
+    REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+DROP TRIGGER IF EXISTS trg_vista_pacientes_upd ON pacientes;
+CREATE TRIGGER trg_vista_pacientes_upd AFTER UPDATE ON pacientes
+    REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+DROP TRIGGER IF EXISTS trg_vista_pacientes_del ON pacientes;
+CREATE TRIGGER trg_vista_pacientes_del AFTER DELETE ON pacientes
+    REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+-- Los datos de menor usan la misma función: también tienen id_paciente
+DROP TRIGGER IF EXISTS trg_vista_menores_ins ON pacientes_menores;
+CREATE TRIGGER trg_vista_menores_ins AFTER INSERT ON pacientes_menores
+    REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+DROP TRIGGER IF EXISTS trg_vista_menores_upd ON pacientes_menores;
+CREATE TRIGGER trg_vista_menores_upd AFTER UPDATE ON pacientes_menores
+    REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+DROP TRIGGER IF EXISTS trg_vista_menores_del ON pacientes_menores;
+CREATE TRIGGER trg_vista_menores_del AFTER DELETE ON pacientes_menores
+    REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_pacientes();
+
+-- Una persona nueva todavía no es paciente y se borra después del paciente:
+-- solo importa la modificación
+DROP TRIGGER IF EXISTS trg_vista_personas_upd ON personas;
+CREATE TRIGGER trg_vista_personas_upd AFTER UPDATE ON personas
+    REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE PROCEDURE fn_vista_desde_personas();
+
+
+-- Catálogos: actualiza la descripción en las filas que la usan
+-- TG_ARGV: columna id del catálogo, columna descripción del catálogo,
+--          columna id en la vista, columna descripción en la vista
+CREATE OR REPLACE FUNCTION fn_vista_desde_catalogo() RETURNS trigger AS $$
+DECLARE
+    nuevo JSONB := to_jsonb(NEW);
+BEGIN
+    EXECUTE format('UPDATE pacientes_vista SET %I = $1 WHERE %I = $2', TG_ARGV[3], TG_ARGV[2])
+    USING nuevo ->> TG_ARGV[1], (nuevo ->> TG_ARGV[0])::INTEGER;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_vista_generos ON generos;
+CREATE TRIGGER trg_vista_generos AFTER UPDATE OF des_genero ON generos
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_genero', 'des_genero', 'id_genero', 'genero');
+
+DROP TRIGGER IF EXISTS trg_vista_estados_civiles ON estados_civiles;
+CREATE TRIGGER trg_vista_estados_civiles AFTER UPDATE OF des_estado_civil ON estados_civiles
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_estado_civil', 'des_estado_civil', 'id_estado_civil', 'estado_civil');
+
+DROP TRIGGER IF EXISTS trg_vista_ciudades ON ciudades;
+CREATE TRIGGER trg_vista_ciudades AFTER UPDATE OF des_ciudad ON ciudades
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_ciudad', 'des_ciudad', 'id_ciudad', 'ciudad');
+
+DROP TRIGGER IF EXISTS trg_vista_ciudades_nacimiento ON ciudades;
+CREATE TRIGGER trg_vista_ciudades_nacimiento AFTER UPDATE OF des_ciudad ON ciudades
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_ciudad', 'des_ciudad', 'id_ciudad_nacimiento', 'ciudad_nacimiento');
+
+DROP TRIGGER IF EXISTS trg_vista_niveles_instruccion ON niveles_instruccion;
+CREATE TRIGGER trg_vista_niveles_instruccion AFTER UPDATE OF des_nivel_instruccion ON niveles_instruccion
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_nivel_instruccion', 'des_nivel_instruccion', 'id_nivel_instruccion', 'nivel_instruccion');
+
+DROP TRIGGER IF EXISTS trg_vista_profesiones ON profesiones;
+CREATE TRIGGER trg_vista_profesiones AFTER UPDATE OF des_profesion ON profesiones
+    FOR EACH ROW EXECUTE PROCEDURE fn_vista_desde_catalogo('id_profesion', 'des_profesion', 'id_profesion', 'profesion');
+
+
+-- Carga inicial (o reconstrucción completa)
+TRUNCATE pacientes_vista;
+INSERT INTO pacientes_vista SELECT * FROM pacientes_vista_fuente;
+ANALYZE pacientes_vista;
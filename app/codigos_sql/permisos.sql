@@ -0,0 +1,139 @@
+-- ============================================
+-- PERMISOS POR GRUPO Y PÁGINA
+-- ============================================
+-- Las tablas de sesiones_usuarios.sql con los nombres de columnas actuales
+-- (id_pagina, id_modulo, id_grupo). La aplicación compila la matriz en
+-- memoria (app/seguridad/permisos.py) y la descarta cuando llega un aviso
+-- por el canal permisos_cambios.
+
+CREATE TABLE IF NOT EXISTS paginas(
+    id_pagina SERIAL PRIMARY KEY
+    , pag_nombre VARCHAR(60) UNIQUE NOT NULL
+    , pag_direcc TEXT NOT NULL
+    , pag_estado BOOLEAN NOT NULL DEFAULT TRUE
+    , id_modulo INTEGER NOT NULL
+    , FOREIGN KEY(id_modulo) REFERENCES modulos(id_modulo)
+    ON DELETE RESTRICT ON UPDATE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS permisos(
+    id_pagina INTEGER
+    , id_grupo INTEGER
+    , leer BOOLEAN NOT NULL DEFAULT FALSE
+    , insertar BOOLEAN NOT NULL DEFAULT FALSE
+    , editar BOOLEAN NOT NULL DEFAULT FALSE
+    , borrar BOOLEAN NOT NULL DEFAULT FALSE
+    , PRIMARY KEY(id_pagina, id_grupo)
+    , FOREIGN KEY(id_pagina) REFERENCES paginas(id_pagina)
+    ON DELETE CASCADE ON UPDATE CASCADE
+    , FOREIGN KEY(id_grupo) REFERENCES grupos(id_grupo)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Carga de los permisos de un grupo
+CREATE INDEX IF NOT EXISTS idx_permisos_grupo ON permisos(id_grupo);
+
+-- Blueprints de Flask que protege cada página, p. ej. '{ciudad,ciuapi}'.
+-- Las solicitudes a un blueprint que no figura en ninguna página no se controlan.
+ALTER TABLE paginas ADD COLUMN IF NOT EXISTS pag_blueprints VARCHAR(60)[] NOT NULL DEFAULT '{}';
+
+
+-- Versión de la matriz: sube con cada cambio en páginas, permisos o módulos.
+-- Las cachés que dependen de los permisos (menú, sesiones) la usan como clave.
+CREATE TABLE IF NOT EXISTS permisos_version(
+    id_version SMALLINT PRIMARY KEY DEFAULT 1
+    , ver_numero BIGINT NOT NULL DEFAULT 1
+    , CHECK (id_version = 1)
+);
+
+INSERT INTO permisos_version(id_version) VALUES (1) ON CONFLICT DO NOTHING;
+
+-- Avisa a todos los workers con la versión nueva como payload
+CREATE OR REPLACE FUNCTION fn_notificar_permisos() RETURNS trigger AS $$
+DECLARE
+    numero BIGINT;
+BEGIN
+    UPDATE permisos_version SET ver_numero = ver_numero + 1
+    RETURNING ver_numero INTO numero;
+    PERFORM pg_notify('permisos_cambios', numero::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_permisos_notificar ON permisos;
+CREATE TRIGGER tg_permisos_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON permisos
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_permisos();
+
+DROP TRIGGER IF EXISTS tg_paginas_notificar ON paginas;
+CREATE TRIGGER tg_paginas_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON paginas
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_permisos();
+
+DROP TRIGGER IF EXISTS tg_modulos_notificar ON modulos;
+CREATE TRIGGER tg_modulos_notificar
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON modulos
+FOR EACH STATEMENT EXECUTE PROCEDURE fn_notificar_permisos();
+
+
+-- Páginas que no van en el menú lateral: solo protegen una API
+ALTER TABLE paginas ADD COLUMN IF NOT EXISTS pag_menu BOOLEAN NOT NULL DEFAULT TRUE;
+
+
+-- Páginas de los módulos que ya existen, con la dirección de su pantalla y
+-- los blueprints (pantalla y API) que protegen. Las que solo tienen API
+-- (permisos, turnos) no van en el menú.
+INSERT INTO modulos(des_modulo, est_modulo)
+SELECT v.modulo, TRUE
+FROM (VALUES ('REFERENCIALES'), ('GESTIONAR PERSONAS'), ('GESTIONAR TURNOS'), ('SEGURIDAD')) AS v(modulo)
+WHERE NOT EXISTS (SELECT 1 FROM modulos WHERE des_modulo = v.modulo);
+
+-- Una versión anterior de este archivo cargaba 'usuarios' con una dirección que no existe
+UPDATE paginas SET pag_nombre = 'Usuario', pag_direcc = '/modulos/usuario/usuario-index',
+                   pag_blueprints = '{usuario,usuarioapi}'
+WHERE pag_nombre = 'usuarios' AND pag_direcc = '/usuarios';
+UPDATE paginas SET pag_direcc = '#', pag_menu = FALSE
+WHERE pag_nombre = 'permisos' AND pag_direcc = '/permisos';
+
+INSERT INTO paginas(pag_nombre, pag_direcc, id_modulo, pag_blueprints, pag_menu)
+SELECT v.nombre, v.direcc, m.id_modulo, v.blueprints::VARCHAR(60)[], v.menu
+FROM (VALUES
+    ('REFERENCIALES', 'Ciudad', '/referenciales/ciudad/ciudad-index', '{ciudad,ciuapi}', TRUE),
+    ('REFERENCIALES', 'Especialidad', '/referenciales/especialidad/especialidad-index', '{especialidad,espapi}', TRUE),
+    ('REFERENCIALES', 'Género', '/referenciales/genero/genero-index', '{genero,genapi}', TRUE),
+    ('REFERENCIALES', 'Estado Civil', '/referenciales/estado-civil/estado-civil-index', '{estado_civil,ecapi}', TRUE),
+    ('REFERENCIALES', 'Nivel de Instrucción', '/referenciales/nivel-instruccion/nivel-instruccion-index',
+        '{nivel_instruccion,nivapi}', TRUE),
+    ('REFERENCIALES', 'Profesión', '/referenciales/profesion/profesion-index', '{profesion,profapi}', TRUE),
+    ('REFERENCIALES', 'Cargo', '/referenciales/cargo/cargo-index', '{cargo,cargoapi}', TRUE),
+    ('REFERENCIALES', 'Grupo', '/referenciales/grupo/grupo-index', '{grupo,grupoapi}', TRUE),
+    ('REFERENCIALES', 'Módulo', '/referenciales/modulo/modulo-index', '{modulo,modapi}', TRUE),
+    ('GESTIONAR PERSONAS', 'Paciente', '/modulos/paciente/paciente-index', '{paciente,pacienteapi}', TRUE),
+    ('GESTIONAR PERSONAS', 'Funcionario', '/modulos/funcionario/funcionario-index',
+        '{funcionario,funcionarioapi}', TRUE),
+    ('GESTIONAR TURNOS', 'turnos', '#', '{turnoapi,horarioapi,disponibilidadapi}', FALSE),
+    ('SEGURIDAD', 'Usuario', '/modulos/usuario/usuario-index', '{usuario,usuarioapi}', TRUE),
+    ('SEGURIDAD', 'permisos', '#', '{permisoapi}', FALSE)
+) AS v(modulo, nombre, direcc, blueprints, menu)
+JOIN modulos m ON m.des_modulo = v.modulo
+ON CONFLICT (pag_nombre) DO NOTHING;
+
+-- Permisos iniciales, sin pisar los que ya se hayan cargado. Todos los grupos
+-- conservan lo que podían hacer antes, salvo borrar pacientes y funcionarios
+-- (incluye las eliminaciones y archivos masivos) y la seguridad (usuarios y
+-- permisos), que quedan para el grupo del usuario 1, el administrador inicial,
+-- que los puede asignar a los demás.
+INSERT INTO permisos(id_pagina, id_grupo, leer, insertar, editar, borrar)
+SELECT pa.id_pagina, u.id_grupo, TRUE, TRUE, TRUE, TRUE
+FROM paginas pa
+JOIN usuarios u ON u.id_usuario = 1
+WHERE pa.pag_nombre IN ('Paciente', 'Funcionario', 'Usuario', 'permisos')
+ON CONFLICT (id_pagina, id_grupo) DO NOTHING;
+
+INSERT INTO permisos(id_pagina, id_grupo, leer, insertar, editar, borrar)
+SELECT pa.id_pagina, g.id_grupo, TRUE, TRUE, TRUE, pa.pag_nombre NOT IN ('Paciente', 'Funcionario')
+FROM paginas pa
+CROSS JOIN grupos g
+WHERE pa.pag_nombre IN ('Ciudad', 'Especialidad', 'Género', 'Estado Civil', 'Nivel de Instrucción',
+                        'Profesión', 'Cargo', 'Grupo', 'Módulo', 'Paciente', 'Funcionario', 'turnos')
+ON CONFLICT (id_pagina, id_grupo) DO NOTHING;
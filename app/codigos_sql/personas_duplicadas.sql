@@ -0,0 +1,44 @@
+-- ============================================
+-- DETECCIÓN DE PERSONAS DUPLICADAS
+-- ============================================
+-- El proceso (flask detectar-duplicados) escribe aquí los pares candidatos;
+-- un usuario los revisa y los marca como confirmados o descartados.
+-- id_persona_a < id_persona_b: cada par aparece una sola vez.
+
+CREATE TABLE IF NOT EXISTS personas_duplicadas(
+    id_duplicado SERIAL PRIMARY KEY
+    , id_persona_a INTEGER NOT NULL
+    , id_persona_b INTEGER NOT NULL
+    , dup_motivo VARCHAR(20) NOT NULL
+    , dup_puntaje NUMERIC(4, 3) NOT NULL
+    , dup_estado VARCHAR(12) NOT NULL DEFAULT 'pendiente'
+    , dup_fecha TIMESTAMPTZ NOT NULL DEFAULT now()
+    , dup_revision_fecha TIMESTAMPTZ
+    , dup_revision_usuario INTEGER
+    , UNIQUE(id_persona_a, id_persona_b)
+    , CHECK (id_persona_a < id_persona_b)
+    , CHECK (dup_motivo IN ('cedula', 'apellido_fecha'))
+    , CHECK (dup_estado IN ('pendiente', 'confirmado', 'descartado'))
+    , FOREIGN KEY(id_persona_a) REFERENCES personas(id_persona)
+    ON DELETE CASCADE ON UPDATE CASCADE
+    , FOREIGN KEY(id_persona_b) REFERENCES personas(id_persona)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_personas_duplicadas_estado ON personas_duplicadas(dup_estado, dup_puntaje DESC);
+
+-- Una fila por ejecución; la última marca desde dónde sigue la incremental
+CREATE TABLE IF NOT EXISTS personas_duplicadas_ejecuciones(
+    id_ejecucion SERIAL PRIMARY KEY
+    , eje_inicio TIMESTAMPTZ NOT NULL
+    , eje_fin TIMESTAMPTZ NOT NULL DEFAULT now()
+    , eje_ultimo_id INTEGER NOT NULL
+    , eje_completa BOOLEAN NOT NULL
+    , eje_personas INTEGER NOT NULL
+    , eje_pares INTEGER NOT NULL
+    , eje_candidatos INTEGER NOT NULL
+);
+
+-- Búsqueda de vecinos de las personas nuevas en la ejecución incremental
+CREATE INDEX IF NOT EXISTS idx_personas_fecha_nacimiento ON personas(per_fecha_nacimiento);
+CREATE INDEX IF NOT EXISTS idx_personas_cedula_digitos ON personas((ltrim(regexp_replace(per_cedula, '\D', '', 'g'), '0')));
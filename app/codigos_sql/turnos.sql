@@ -0,0 +1,53 @@
+-- ============================================
+-- AGENDA DE ESPECIALISTAS (TURNOS)
+-- ============================================
+-- horarios_especialistas: plantilla semanal de atención de cada especialista
+-- (día ISO 1=lunes .. 7=domingo, franja y duración del turno). Los turnos
+-- disponibles no se guardan: se generan a partir de la plantilla y se les
+-- restan los turnos reservados.
+-- turnos: cada reserva guarda su período como tstzrange. La restricción de
+-- exclusión impide que dos turnos reservados del mismo especialista (o del
+-- mismo paciente) se superpongan, sin bloquear filas de antemano.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE TABLE IF NOT EXISTS horarios_especialistas(
+    id_horario SERIAL PRIMARY KEY
+    , id_especialista INTEGER NOT NULL
+    , hor_dia_semana SMALLINT NOT NULL CHECK (hor_dia_semana BETWEEN 1 AND 7)
+    , hor_inicio TIME NOT NULL
+    , hor_fin TIME NOT NULL
+    , hor_duracion_minutos SMALLINT NOT NULL CHECK (hor_duracion_minutos BETWEEN 5 AND 480)
+    , CHECK (hor_fin > hor_inicio)
+    , FOREIGN KEY(id_especialista) REFERENCES especialistas(id_especialista)
+    ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_horarios_especialista ON horarios_especialistas(id_especialista, hor_dia_semana);
+
+CREATE TABLE IF NOT EXISTS turnos(
+    id_turno SERIAL PRIMARY KEY
+    , id_especialista INTEGER NOT NULL
+    , id_paciente INTEGER NOT NULL
+    , tur_periodo TSTZRANGE NOT NULL
+    , tur_estado VARCHAR(12) NOT NULL DEFAULT 'reservado'
+    , tur_observacion TEXT
+    , tur_reprogramado_de INTEGER
+    , tur_fecha TIMESTAMPTZ NOT NULL DEFAULT now()
+    , tur_cancelacion_fecha TIMESTAMPTZ
+    , creacion_usuario INTEGER
+    , CHECK (tur_estado IN ('reservado', 'cancelado', 'reprogramado'))
+    , CHECK (NOT isempty(tur_periodo) AND NOT lower_inf(tur_periodo) AND NOT upper_inf(tur_periodo))
+    , FOREIGN KEY(id_especialista) REFERENCES especialistas(id_especialista)
+    ON DELETE RESTRICT ON UPDATE CASCADE
+    , FOREIGN KEY(id_paciente) REFERENCES pacientes(id_paciente)
+    ON DELETE RESTRICT ON UPDATE CASCADE
+    , FOREIGN KEY(tur_reprogramado_de) REFERENCES turnos(id_turno)
+    , CONSTRAINT turnos_especialista_sin_superposicion
+      EXCLUDE USING gist (id_especialista WITH =, tur_periodo WITH &&) WHERE (tur_estado = 'reservado')
+    , CONSTRAINT turnos_paciente_sin_superposicion
+      EXCLUDE USING gist (id_paciente WITH =, tur_periodo WITH &&) WHERE (tur_estado = 'reservado')
+);
+
+-- Agenda de un paciente
+CREATE INDEX IF NOT EXISTS idx_turnos_paciente ON turnos(id_paciente, lower(tur_periodo));
@@ -0,0 +1,33 @@
+-- ============================================
+-- AVISOS DE CAMBIOS EN USUARIOS
+-- ============================================
+-- Cada worker guarda por unos segundos el estado y el grupo de los usuarios
+-- con sesión (app/seguridad/sesiones.py). Al desactivar, borrar o cambiar
+-- de grupo a un usuario se avisa por el canal usuarios_cambios con su id,
+-- y la próxima solicitud de esa sesión ya ve el cambio.
+-- Los contadores de intentos de ingreso no avisan: no afectan a la sesión.
+
+CREATE OR REPLACE FUNCTION fn_notificar_usuarios() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('usuarios_cambios', OLD.id_usuario::text);
+    ELSE
+        PERFORM pg_notify('usuarios_cambios', NEW.id_usuario::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tg_usuarios_notificar ON usuarios;
+CREATE TRIGGER tg_usuarios_notificar
+AFTER UPDATE ON usuarios
+FOR EACH ROW
+WHEN (OLD.usu_estado IS DISTINCT FROM NEW.usu_estado
+      OR OLD.id_grupo IS DISTINCT FROM NEW.id_grupo
+      OR OLD.usu_nick IS DISTINCT FROM NEW.usu_nick)
+EXECUTE PROCEDURE fn_notificar_usuarios();
+
+DROP TRIGGER IF EXISTS tg_usuarios_notificar_borrado ON usuarios;
+CREATE TRIGGER tg_usuarios_notificar_borrado
+AFTER DELETE ON usuarios
+FOR EACH ROW EXECUTE PROCEDURE fn_notificar_usuarios();
@@ -0,0 +1,81 @@
+"""
+Avisos de PostgreSQL (LISTEN/NOTIFY) para las cachés en memoria.
+
+Un solo hilo y una sola conexión por worker escuchan todos los canales.
+Cada caché se suscribe con suscribir(canal, funcion): la función recibe
+la lista de payloads que llegaron juntos, o None al (re)conectar, cuando
+pudo haberse perdido algún aviso y hay que releer todo.
+"""
+import logging
+import select
+import threading
+import time
+from app.conexion.Conexion import Conexion
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre reintentos cuando se pierde la conexión de escucha
+ESPERA_RECONEXION = 30
+
+
+class EscuchaAvisos:
+
+    def __init__(self):
+        # canal -> [funciones]
+        self.suscriptores = {}
+        self.lock = threading.Lock()
+        self.hilo = None
+
+    def suscribir(self, canal, funcion):
+        """Registra `funcion` para el canal. Suscribirse antes de iniciar()."""
+        with self.lock:
+            self.suscriptores.setdefault(canal, []).append(funcion)
+
+    def avisar(self, canal, payloads):
+        for funcion in self.suscriptores.get(canal, []):
+            try:
+                funcion(payloads)
+            except Exception as e:
+                logger.error("Error al procesar avisos de %s: %s", canal, e)
+
+    def escuchar(self):
+        """Bucle del hilo: LISTEN de cada canal y reparto de avisos; reconecta si se corta"""
+        while True:
+            con = None
+            try:
+                con = Conexion().getConexion()
+                con.autocommit = True
+                cur = con.cursor()
+                for canal in self.suscriptores:
+                    cur.execute(f"LISTEN {canal}")
+                for canal in self.suscriptores:
+                    self.avisar(canal, None)
+
+                while True:
+                    if select.select([con], [], [], ESPERA_RECONEXION) == ([], [], []):
+                        continue
+                    con.poll()
+                    # Varios avisos juntos se resuelven con una sola llamada por canal
+                    recibidos = {}
+                    for aviso in con.notifies:
+                        recibidos.setdefault(aviso.channel, []).append(aviso.payload)
+                    con.notifies.clear()
+                    for canal, payloads in recibidos.items():
+                        self.avisar(canal, payloads)
+
+            except Exception as e:
+                logger.warning("Escucha de avisos interrumpida: %s", e)
+            finally:
+                if con is not None:
+                    con.close()
+            time.sleep(ESPERA_RECONEXION)
+
+    def iniciar(self):
+        """Arranca el hilo de escucha (una vez por proceso)"""
+        with self.lock:
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self.escuchar, name='avisos', daemon=True)
+                self.hilo.start()
+
+
+avisos = EscuchaAvisos()
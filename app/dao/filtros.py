@@ -0,0 +1,31 @@
+"""
+Validación de los filtros que llegan en el cuerpo de una petición (ver
+construir_filtro_* de los DAO). Un criterio mal escrito no se ignora:
+quedaría un filtro vacío que selecciona todas las filas.
+"""
+
+VERDADEROS = ('true', '1')
+FALSOS = ('false', '0')
+
+
+def validar_claves(filtro, claves):
+    """ValueError si el filtro trae un criterio que no está en `claves`"""
+    desconocidas = sorted(str(c) for c in filtro if c not in claves)
+    if desconocidas:
+        raise ValueError(f"Criterios desconocidos: {', '.join(desconocidas)}")
+
+
+def presente(valor):
+    """Un criterio con None o texto vacío se considera no enviado; 0 y False sí cuentan"""
+    return valor is not None and valor != ''
+
+
+def booleano(valor):
+    """True/False, 'true'/'false' o 1/0; cualquier otro valor es ValueError"""
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, int) and valor in (0, 1):
+        return bool(valor)
+    if isinstance(valor, str) and valor.strip().lower() in VERDADEROS + FALSOS:
+        return valor.strip().lower() in VERDADEROS
+    raise ValueError(f"Valor booleano no válido: {valor!r}")
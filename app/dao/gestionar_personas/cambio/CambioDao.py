@@ -0,0 +1,109 @@
+from flask import current_app as app
+from app.conexion.Conexion import Conexion
+
+class CambioDao:
+    """
+    Lectura del registro de cambios (tabla cambios, ver codigos_sql/cambios.sql).
+
+    El token es "transaccion.cam_id" del último cambio entregado. Solo se
+    entregan cambios de transacciones anteriores a la más vieja en curso,
+    así ninguno que confirme más tarde puede quedar detrás del token.
+    """
+
+    # Tablas publicadas en el feed
+    TABLAS = ('personas', 'pacientes', 'funcionarios')
+
+    CAMBIOS_SQL = """
+        WITH corte AS (
+            SELECT txid_snapshot_xmin(txid_current_snapshot()) AS transaccion
+        )
+        SELECT corte.transaccion, c.cam_transaccion, c.cam_id, c.cam_tabla,
+               c.cam_registro, c.cam_operacion
+        FROM corte
+        LEFT JOIN LATERAL (
+            SELECT cam_transaccion, cam_id, cam_tabla, cam_registro, cam_operacion
+            FROM cambios
+            WHERE (cam_transaccion, cam_id) > (%s, %s)
+              AND cam_transaccion < corte.transaccion
+              AND cam_tabla = ANY(%s)
+            ORDER BY cam_transaccion, cam_id
+            LIMIT %s
+        ) c ON TRUE
+    """
+
+    def leer_token(self, token):
+        """Convierte "transaccion.cam_id" en tupla. Lanza ValueError si no es válido."""
+        transaccion, cam_id = token.split('.')
+        return int(transaccion), int(cam_id)
+
+    def getTokenActual(self):
+        """
+        Token para empezar a seguir los cambios. Se debe pedir ANTES de la
+        carga completa: todo lo que confirme después entra en los cambios
+        desde el token, aunque algo ya venga en la carga (se vuelve a leer
+        sin problema). Pedido después de la carga se pierden los cambios de
+        transacciones que confirmaron entre la lectura y el token.
+        """
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+            return f"{cur.fetchone()[0]}.0"
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener token de cambios: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def getCambios(self, token, tablas=None, limite=1000):
+        """
+        Cambios posteriores a `token`, compactados por registro:
+        {'cambios': {tabla: {'modificados': [...], 'eliminados': [...]}},
+         'token': siguiente token, 'hay_mas': bool}.
+        Un registro aparece una sola vez, con su último estado en el bloque.
+        """
+        transaccion, cam_id = self.leer_token(token)
+        tablas = list(tablas or self.TABLAS)
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            # Se pide uno más del límite para saber si quedan cambios
+            cur.execute(self.CAMBIOS_SQL, (transaccion, cam_id, tablas, limite + 1))
+            filas = cur.fetchall()
+
+            corte = filas[0][0]
+            filas = [f for f in filas if f[2] is not None]
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+
+            # Último estado por registro: la eliminación gana; el resto se relee
+            eliminados = {}
+            for _, _, _, tabla, registro, operacion in filas:
+                eliminados[(tabla, registro)] = operacion == 'D'
+
+            cambios = {tabla: {'modificados': [], 'eliminados': []} for tabla in tablas}
+            for (tabla, registro), eliminado in eliminados.items():
+                cambios[tabla]['eliminados' if eliminado else 'modificados'].append(registro)
+
+            if hay_mas:
+                siguiente = f"{filas[-1][1]}.{filas[-1][2]}"
+            else:
+                # Ya se entregó todo lo anterior al corte
+                siguiente = max((transaccion, cam_id), (corte, 0))
+                siguiente = f"{siguiente[0]}.{siguiente[1]}"
+
+            return {'cambios': cambios, 'token': siguiente, 'hay_mas': hay_mas}
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener cambios: {str(e)}", exc_info=True)
+            return None
+        finally:
+            cur.close()
+            con.close()
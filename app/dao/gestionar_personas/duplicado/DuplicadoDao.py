@@ -0,0 +1,187 @@
+from flask import current_app as app
+from psycopg2.extras import execute_values
+from app.conexion.Conexion import Conexion
+
+class DuplicadoDao:
+    """Acceso a personas_duplicadas (ver codigos_sql/personas_duplicadas.sql)"""
+
+    ESTADOS = ('pendiente', 'confirmado', 'descartado')
+
+    PERSONAS_SQL = """
+        SELECT id_persona, per_nombre, per_apellido, per_cedula, per_fecha_nacimiento
+        FROM personas
+    """
+
+    # Cédula sin separadores ni ceros a la izquierda (igual al índice de la tabla)
+    CEDULA_NORMALIZADA_SQL = "ltrim(regexp_replace(per_cedula, '\\D', '', 'g'), '0')"
+
+    def iterarPersonas(self, condicion=None, params=None, tamano_bloque=20000):
+        """
+        Recorre personas con un cursor del lado del servidor. `condicion` es un
+        WHERE opcional. Devuelve filas (id, nombre, apellido, cédula, nacimiento).
+        """
+        personaSQL = self.PERSONAS_SQL
+        if condicion:
+            personaSQL += " WHERE " + condicion
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor(name='iterar_personas')
+        cur.itersize = tamano_bloque
+
+        try:
+            cur.execute(personaSQL, params)
+            for fila in cur:
+                yield fila
+        finally:
+            cur.close()
+            con.close()
+
+    def iterarPersonasNuevas(self, ultimo_id, desde):
+        """Personas creadas después de `ultimo_id` o modificadas desde `desde`"""
+        return self.iterarPersonas("id_persona > %s OR per_actualizado > %s", (ultimo_id, desde))
+
+    def iterarVecinas(self, fechas, cedulas):
+        """Personas que comparten fecha de nacimiento o cédula normalizada con las indicadas"""
+        condicion = f"per_fecha_nacimiento = ANY(%s) OR {self.CEDULA_NORMALIZADA_SQL} = ANY(%s)"
+        return self.iterarPersonas(condicion, (list(fechas), list(cedulas)))
+
+    def getUltimaEjecucion(self):
+        """Devuelve (último id revisado, inicio) de la última ejecución o None"""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("""
+                SELECT eje_ultimo_id, eje_inicio
+                FROM personas_duplicadas_ejecuciones
+                ORDER BY id_ejecucion DESC
+                LIMIT 1
+            """)
+            return cur.fetchone()
+        finally:
+            cur.close()
+            con.close()
+
+    def getMaxIdPersona(self):
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("SELECT COALESCE(MAX(id_persona), 0) FROM personas")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+            con.close()
+
+    def guardarCandidatos(self, candidatos, inicio, ultimo_id, completa, personas, pares):
+        """
+        Inserta los pares (id_a, id_b, motivo, puntaje) y registra la ejecución en
+        una transacción. Un par ya revisado conserva su estado; uno pendiente
+        actualiza motivo y puntaje. Retorna la cantidad de pares escritos.
+        """
+        candidatoSQL = """
+            INSERT INTO personas_duplicadas(id_persona_a, id_persona_b, dup_motivo, dup_puntaje)
+            VALUES %s
+            ON CONFLICT (id_persona_a, id_persona_b) DO UPDATE
+            SET dup_motivo = EXCLUDED.dup_motivo, dup_puntaje = EXCLUDED.dup_puntaje,
+                dup_fecha = now()
+            WHERE personas_duplicadas.dup_estado = 'pendiente'
+        """
+
+        ejecucionSQL = """
+            INSERT INTO personas_duplicadas_ejecuciones(eje_inicio, eje_ultimo_id, eje_completa,
+                                                        eje_personas, eje_pares, eje_candidatos)
+            VALUES(%s, %s, %s, %s, %s, %s)
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            if candidatos:
+                execute_values(cur, candidatoSQL, candidatos, page_size=5000)
+            cur.execute(ejecucionSQL, (inicio, ultimo_id, completa, personas, pares, len(candidatos)))
+            con.commit()
+            return len(candidatos)
+
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+            con.close()
+
+    def getDuplicados(self, estado='pendiente', limite=100, desplazamiento=0):
+        """Pares candidatos con los datos de ambas personas, de mayor a menor puntaje"""
+        duplicadoSQL = """
+            SELECT d.id_duplicado, d.dup_motivo, d.dup_puntaje, d.dup_estado, d.dup_fecha,
+                   a.id_persona, a.per_nombre, a.per_apellido, a.per_cedula, a.per_fecha_nacimiento,
+                   b.id_persona, b.per_nombre, b.per_apellido, b.per_cedula, b.per_fecha_nacimiento
+            FROM personas_duplicadas d
+            JOIN personas a ON d.id_persona_a = a.id_persona
+            JOIN personas b ON d.id_persona_b = b.id_persona
+            WHERE d.dup_estado = %s
+            ORDER BY d.dup_puntaje DESC, d.id_duplicado
+            LIMIT %s OFFSET %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        def persona(f):
+            return {
+                'id_persona': f[0],
+                'nombre': f[1],
+                'apellido': f[2],
+                'cedula': f[3],
+                'fecha_nacimiento': f[4].strftime('%d/%m/%Y') if f[4] else None,
+            }
+
+        try:
+            cur.execute(duplicadoSQL, (estado, limite, desplazamiento))
+            return [{
+                'id_duplicado': d[0],
+                'motivo': d[1],
+                'puntaje': float(d[2]),
+                'estado': d[3],
+                'fecha': d[4].isoformat(),
+                'persona_a': persona(d[5:10]),
+                'persona_b': persona(d[10:15]),
+            } for d in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener personas duplicadas: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def updateEstadoDuplicado(self, id_duplicado, estado, id_usuario=None):
+        """Marca un par como revisado. Retorna True, False si no existe o None si falla."""
+        duplicadoSQL = """
+            UPDATE personas_duplicadas
+            SET dup_estado = %s, dup_revision_fecha = now(), dup_revision_usuario = %s
+            WHERE id_duplicado = %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(duplicadoSQL, (estado, id_usuario, id_duplicado))
+            con.commit()
+            return cur.rowcount > 0
+
+        except Exception as e:
+            app.logger.error(f"Error al actualizar par duplicado: {str(e)}")
+            con.rollback()
+            return None
+        finally:
+            cur.close()
+            con.close()
@@ -0,0 +1,89 @@
+import threading
+import time
+from flask import current_app as app
+from app.conexion.Conexion import Conexion
+from app.conexion.avisos import avisos
+
+class EspecialistaDao:
+    """
+    Directorio de especialistas activos por especialidad. Cada especialidad
+    se consulta por el índice de especialista_especialidades(id_especialidad,
+    id_especialista) y queda en memoria del proceso hasta que FuncionarioDao
+    escribe (invalidar) o llega un aviso del canal especialistas_cambios
+    (ver codigos_sql/especialistas_avisos.sql), que cubre las escrituras de
+    otros workers y de fuera de la aplicación.
+    """
+
+    CANAL = 'especialistas_cambios'
+
+    # Segundos que se reutiliza la lista de una especialidad; los avisos la
+    # descartan antes, el vencimiento solo acota un error en los triggers
+    DURACION_CACHE = 3600
+
+    # id_especialidad -> (vence, lista de especialistas)
+    _cache = {}
+    _lock = threading.Lock()
+    # Aumenta con cada invalidación: una consulta que empezó antes no se guarda
+    _generacion = 0
+
+    ESPECIALISTAS_SQL = """
+        SELECT e.id_especialista, f.id_funcionario, p.per_nombre, p.per_apellido,
+               e.esp_matricula, e.esp_color_agenda
+        FROM especialista_especialidades ee
+        JOIN especialistas e ON ee.id_especialista = e.id_especialista
+        JOIN funcionarios f ON e.id_funcionario = f.id_funcionario AND f.fun_estado = TRUE
+        JOIN personas p ON f.id_persona = p.id_persona
+        WHERE ee.id_especialidad = %s
+        ORDER BY p.per_apellido, p.per_nombre
+    """
+
+    @classmethod
+    def invalidar(cls, payloads=None):
+        """Descarta todas las especialidades en memoria (después de confirmar una escritura o con un aviso)"""
+        with cls._lock:
+            cls._cache.clear()
+            cls._generacion += 1
+
+    @classmethod
+    def iniciar(cls):
+        """Se suscribe a los avisos de cambios (antes de avisos.iniciar())"""
+        avisos.suscribir(cls.CANAL, cls.invalidar)
+
+    def getEspecialistasPorEspecialidad(self, id_especialidad):
+        """Especialistas activos con la especialidad, por apellido. None si falla."""
+        ahora = time.monotonic()
+        with self._lock:
+            guardado = self._cache.get(id_especialidad)
+            if guardado and guardado[0] > ahora:
+                return guardado[1]
+            generacion = self._generacion
+
+        especialistas = self._consultar(id_especialidad)
+        if especialistas is not None:
+            with self._lock:
+                if generacion == self._generacion:
+                    self._cache[id_especialidad] = (ahora + self.DURACION_CACHE, especialistas)
+        return especialistas
+
+    def _consultar(self, id_especialidad):
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(self.ESPECIALISTAS_SQL, (id_especialidad,))
+            return [{
+                'id_especialista': r[0],
+                'id_funcionario': r[1],
+                'nombre': r[2],
+                'apellido': r[3],
+                'matricula': r[4],
+                'color_agenda': r[5],
+            } for r in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener especialistas de la especialidad {id_especialidad}: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
@@ -0,0 +1,217 @@
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from flask import current_app as app
+from app.conexion.Conexion import Conexion
+
+class EstadisticaPacienteDao:
+    """
+    Estadísticas de pacientes para el tablero. La base agrega en una sola
+    pasada (GROUPING SETS) y numpy/pandas arman histogramas y series sobre
+    esos pocos miles de filas agregadas; los resultados se reutilizan
+    durante DURACION_CACHE segundos.
+    """
+
+    # Segundos que se reutiliza un resultado
+    DURACION_CACHE = 60
+
+    # Límite inferior de cada rango del histograma de edades
+    RANGOS_EDAD = [0, 1, 6, 12, 18, 30, 45, 60, 75]
+
+    # Periodo -> (unidad de date_trunc, frecuencia de pandas, periodos por defecto)
+    PERIODOS = {
+        'dia': ('day', 'D', 30),
+        'semana': ('week', 'W-MON', 12),
+        'mes': ('month', 'MS', 12),
+    }
+    UNIDADES_OFFSET = {'dia': 'days', 'semana': 'weeks', 'mes': 'months'}
+
+    # Máximo de puntos de una serie de inscripciones
+    MAX_PUNTOS_SERIE = 1000
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    # Una sola pasada sobre pacientes: edad, ciudad, género, profesión y total.
+    # GROUPING() identifica el conjunto de cada fila (bit a 1 = columna agrupada fuera).
+    RESUMEN_SQL = """
+        WITH agregados AS (
+            SELECT GROUPING(e.edad, p.id_ciudad, p.id_genero, p.id_profesion) AS conjunto,
+                   e.edad, p.id_ciudad, p.id_genero, p.id_profesion, COUNT(*) AS cantidad
+            FROM pacientes pac
+            JOIN personas p ON pac.id_persona = p.id_persona
+            CROSS JOIN LATERAL (
+                SELECT DATE_PART('year', AGE(p.per_fecha_nacimiento))::int AS edad
+            ) e
+            GROUP BY GROUPING SETS ((e.edad), (p.id_ciudad), (p.id_genero), (p.id_profesion), ())
+        )
+        SELECT a.conjunto, a.edad, a.id_ciudad, c.des_ciudad, a.id_genero, g.des_genero,
+               a.id_profesion, pr.des_profesion, a.cantidad
+        FROM agregados a
+        LEFT JOIN ciudades c ON a.id_ciudad = c.id_ciudad
+        LEFT JOIN generos g ON a.id_genero = g.id_genero
+        LEFT JOIN profesiones pr ON a.id_profesion = pr.id_profesion
+    """
+
+    # Valor de GROUPING() para cada conjunto de RESUMEN_SQL
+    CONJUNTO_EDAD = 0b0111
+    CONJUNTO_CIUDAD = 0b1011
+    CONJUNTO_GENERO = 0b1101
+    CONJUNTO_PROFESION = 0b1110
+    CONJUNTO_TOTAL = 0b1111
+
+    INSCRIPCIONES_SQL = """
+        SELECT date_trunc(%s, p.per_fecha_inscripcion)::date AS periodo, COUNT(*) AS cantidad
+        FROM pacientes pac
+        JOIN personas p ON pac.id_persona = p.id_persona
+        WHERE p.per_fecha_inscripcion >= %s AND p.per_fecha_inscripcion < %s
+        GROUP BY 1
+        ORDER BY 1
+    """
+
+    def _cacheado(self, clave, calcular):
+        """Devuelve el resultado vigente para `clave` o lo calcula; los errores no se guardan"""
+        ahora = time.monotonic()
+        with self._lock:
+            guardado = self._cache.get(clave)
+            if guardado and guardado[0] > ahora:
+                return guardado[1]
+
+        resultado = calcular()
+        if resultado is not None:
+            with self._lock:
+                for vencida in [k for k, (vence, _) in self._cache.items() if vence <= ahora]:
+                    del self._cache[vencida]
+                self._cache[clave] = (ahora + self.DURACION_CACHE, resultado)
+        return resultado
+
+    def _consultar(self, sql, params=None):
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+            con.close()
+
+    def _distribucion(self, df, conjunto, columna_id, columna_descripcion):
+        """Filas de un conjunto como [{'id', 'descripcion', 'cantidad'}], de mayor a menor"""
+        parte = df.loc[df['conjunto'] == conjunto, [columna_id, columna_descripcion, 'cantidad']]
+        parte = parte.sort_values('cantidad', ascending=False)
+        parte.columns = ['id', 'descripcion', 'cantidad']
+        parte['descripcion'] = parte['descripcion'].fillna('Sin dato')
+        return parte.astype(object).where(parte.notna(), None).to_dict('records')
+
+    def _calcular_resumen(self):
+        columnas = ['conjunto', 'edad', 'id_ciudad', 'des_ciudad', 'id_genero', 'des_genero',
+                    'id_profesion', 'des_profesion', 'cantidad']
+        df = pd.DataFrame(self._consultar(self.RESUMEN_SQL), columns=columnas, dtype=object)
+        df['conjunto'] = df['conjunto'].astype(np.int64)
+        df['cantidad'] = df['cantidad'].astype(np.int64)
+
+        total = int(df.loc[df['conjunto'] == self.CONJUNTO_TOTAL, 'cantidad'].sum())
+
+        # Histograma de edades ponderado por la cantidad de cada edad
+        edades = df.loc[df['conjunto'] == self.CONJUNTO_EDAD, ['edad', 'cantidad']]
+        con_edad = edades[edades['edad'].notna()]
+        valores = np.clip(con_edad['edad'].to_numpy(dtype=np.int64), 0, None)
+        cantidades = con_edad['cantidad'].to_numpy()
+        limites = np.array(self.RANGOS_EDAD + [np.iinfo(np.int64).max])
+        histograma, _ = np.histogram(valores, bins=limites, weights=cantidades)
+
+        rangos = []
+        for inicio, fin, cantidad in zip(limites[:-1], limites[1:], histograma):
+            if fin == limites[-1]:
+                rango = f"{inicio}+"
+            elif fin - inicio == 1:
+                rango = str(inicio)
+            else:
+                rango = f"{inicio}-{fin - 1}"
+            rangos.append({'rango': rango, 'cantidad': int(cantidad)})
+
+        menores = int(cantidades[valores < 18].sum())
+        con_fecha = int(cantidades.sum())
+
+        return {
+            'total': total,
+            'menores': menores,
+            'adultos': con_fecha - menores,
+            'sin_fecha_nacimiento': total - con_fecha,
+            'edades': rangos,
+            'ciudades': self._distribucion(df, self.CONJUNTO_CIUDAD, 'id_ciudad', 'des_ciudad'),
+            'generos': self._distribucion(df, self.CONJUNTO_GENERO, 'id_genero', 'des_genero'),
+            'profesiones': self._distribucion(df, self.CONJUNTO_PROFESION, 'id_profesion', 'des_profesion'),
+        }
+
+    def getResumen(self):
+        """
+        Total, menores/adultos, histograma de edades y distribución por ciudad,
+        género y profesión. Retorna None si falla la consulta.
+        """
+        try:
+            return self._cacheado(('resumen',), self._calcular_resumen)
+
+        except Exception as e:
+            app.logger.error(f"Error al calcular estadísticas de pacientes: {str(e)}", exc_info=True)
+            return None
+
+    def rango_inscripciones(self, periodo, desde=None, hasta=None):
+        """
+        Normaliza el rango de una serie: alinea `desde` al inicio del periodo y
+        completa los valores por defecto. Lanza ValueError si el periodo no existe
+        o el rango es inválido o demasiado largo.
+        """
+        if periodo not in self.PERIODOS:
+            raise ValueError(f"Periodo desconocido. Válidos: {', '.join(self.PERIODOS)}")
+        _, frecuencia, por_defecto = self.PERIODOS[periodo]
+
+        hasta = hasta or date.today()
+        if not desde:
+            desde = (pd.Timestamp(hasta) - pd.DateOffset(**{self.UNIDADES_OFFSET[periodo]: por_defecto - 1})).date()
+
+        if periodo == 'semana':
+            desde = desde - timedelta(days=desde.weekday())
+        elif periodo == 'mes':
+            desde = desde.replace(day=1)
+
+        if desde > hasta:
+            raise ValueError("La fecha desde no puede ser posterior a hasta")
+        if len(pd.date_range(desde, hasta, freq=frecuencia)) > self.MAX_PUNTOS_SERIE:
+            raise ValueError(f"El rango supera {self.MAX_PUNTOS_SERIE} periodos")
+
+        return desde, hasta
+
+    def _calcular_inscripciones(self, periodo, desde, hasta):
+        unidad, frecuencia, _ = self.PERIODOS[periodo]
+        filas = self._consultar(self.INSCRIPCIONES_SQL, (unidad, desde, hasta + timedelta(days=1)))
+
+        # Serie completa: los periodos sin inscripciones valen 0
+        serie = pd.Series({pd.Timestamp(f): c for f, c in filas}, dtype=np.int64)
+        serie = serie.reindex(pd.date_range(desde, hasta, freq=frecuencia), fill_value=0)
+
+        return {
+            'periodo': periodo,
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'total': int(serie.sum()),
+            'serie': [{'fecha': f.date().isoformat(), 'cantidad': int(c)} for f, c in serie.items()],
+        }
+
+    def getInscripciones(self, periodo, desde, hasta):
+        """
+        Pacientes inscriptos por día, semana o mes (per_fecha_inscripcion) entre
+        `desde` y `hasta` ya normalizados con rango_inscripciones.
+        Retorna None si falla la consulta.
+        """
+        try:
+            return self._cacheado(('inscripciones', periodo, desde, hasta),
+                                  lambda: self._calcular_inscripciones(periodo, desde, hasta))
+
+        except Exception as e:
+            app.logger.error(f"Error al calcular inscripciones de pacientes: {str(e)}", exc_info=True)
+            return None
@@ -1,56 +1,90 @@
+import logging
 from flask import current_app as app
+from psycopg2 import errors
 from app.conexion.Conexion import Conexion
+from app.dao.filtros import validar_claves, presente, booleano
+from app.dao.gestionar_personas.especialista.EspecialistaDao import EspecialistaDao
+from app.dao.referenciales.cargo.cache_cargos import cache_cargos
 from datetime import date
 
+logger = logging.getLogger(__name__)
+
 class FuncionarioDao:
-    
-    # IDs de cargos que requieren datos de especialista
-    CARGOS_ESPECIALISTAS = [3]  
+
+    # Funcionarios eliminados/archivados por transacción
+    TAMANO_LOTE_ELIMINACION = 500
     
     def es_cargo_especialista(self, id_cargo):
-        """Verifica si un cargo requiere datos de especialista"""
-        return id_cargo in self.CARGOS_ESPECIALISTAS
+        """Verifica si un cargo requiere datos de especialista (cargos.car_requiere_especialista)"""
+        return cache_cargos.requiere_especialista(id_cargo)
 
-    def getFuncionarios(self):
-        """Obtiene todos los funcionarios con sus datos completos"""
-        funcionarioSQL = """
-            SELECT
-                f.id_funcionario,
-                p.per_nombre,
-                p.per_apellido,
-                p.per_cedula,
-                p.per_fecha_nacimiento,
-                DATE_PART('year', AGE(p.per_fecha_nacimiento)) AS edad,
-                p.per_telefono,
-                g.des_genero AS genero,
-                c.des_ciudad AS ciudad,
-                car.des_cargo AS cargo,
-                f.fun_estado,
-                e.esp_matricula,
-                STRING_AGG(DISTINCT esp.des_especialidad, ', ') AS especialidades,
-                CASE WHEN e.id_especialista IS NOT NULL THEN TRUE ELSE FALSE END AS es_especialista,
-                p.per_fecha_inscripcion
-            FROM funcionarios f
-            JOIN personas p ON f.id_persona = p.id_persona
-            JOIN cargos car ON f.id_cargo = car.id_cargo
-            LEFT JOIN generos g ON p.id_genero = g.id_genero AND g.est_genero = TRUE
-            LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad
-            LEFT JOIN especialistas e ON f.id_funcionario = e.id_funcionario
-            LEFT JOIN especialista_especialidades ee ON e.id_especialista = ee.id_especialista
-            LEFT JOIN especialidades esp ON ee.id_especialidad = esp.id_especialidad AND esp.est_especialidad = TRUE
-            GROUP BY f.id_funcionario, p.per_nombre, p.per_apellido, p.per_cedula, 
-                     p.per_fecha_nacimiento, p.per_telefono, g.des_genero, c.des_ciudad, 
-                     car.des_cargo, f.fun_estado, e.esp_matricula, e.id_especialista, 
-                     p.per_fecha_inscripcion
-            ORDER BY f.id_funcionario DESC
+    def requiere_matricula(self, id_cargo):
+        """Verifica si un cargo exige matrícula (cargos.car_requiere_matricula)"""
+        return cache_cargos.requiere_matricula(id_cargo)
+
+    # Especialidades activas de un especialista en una sola fila. Va como
+    # LEFT JOIN LATERAL después de especialistas e: cada funcionario lee su
+    # propio índice en lugar de agrupar el join completo.
+    ESPECIALIDADES_LATERAL_SQL = """
+        LEFT JOIN LATERAL (
+            SELECT array_agg(DISTINCT es.des_especialidad) AS especialidades
+            FROM especialista_especialidades ee
+            JOIN especialidades es ON ee.id_especialidad = es.id_especialidad AND es.est_especialidad = TRUE
+            WHERE ee.id_especialista = e.id_especialista
+        ) lat ON TRUE
+    """
+
+    FUNCIONARIO_LISTA_SQL = """
+        SELECT
+            f.id_funcionario,
+            p.per_nombre,
+            p.per_apellido,
+            p.per_cedula,
+            p.per_fecha_nacimiento,
+            DATE_PART('year', AGE(p.per_fecha_nacimiento)) AS edad,
+            p.per_telefono,
+            g.des_genero AS genero,
+            c.des_ciudad AS ciudad,
+            car.des_cargo AS cargo,
+            f.fun_estado,
+            e.esp_matricula,
+            lat.especialidades,
+            e.id_especialista IS NOT NULL AS es_especialista,
+            p.per_fecha_inscripcion
+        FROM funcionarios f
+        JOIN personas p ON f.id_persona = p.id_persona
+        JOIN cargos car ON f.id_cargo = car.id_cargo
+        LEFT JOIN generos g ON p.id_genero = g.id_genero AND g.est_genero = TRUE
+        LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad
+        LEFT JOIN especialistas e ON f.id_funcionario = e.id_funcionario
+    """ + ESPECIALIDADES_LATERAL_SQL
+
+    @staticmethod
+    def unir_especialidades(especialidades):
+        """Arreglo de array_agg -> 'A, B' (None si no tiene)"""
+        return ', '.join(especialidades) if especialidades else None
+
+    def getFuncionarios(self, filtro=None, limite=None, desplazamiento=0):
+        """
+        Obtiene los funcionarios con sus datos completos, del más nuevo al más
+        viejo. `filtro` como en construir_filtro_funcionarios; `limite` y
+        `desplazamiento` paginan (sin límite devuelve todos).
         """
+        condiciones, params = self.construir_filtro_funcionarios(filtro)
+        funcionarioSQL = self.FUNCIONARIO_LISTA_SQL
+        if condiciones:
+            funcionarioSQL += " WHERE " + " AND ".join(condiciones)
+        funcionarioSQL += " ORDER BY f.id_funcionario DESC"
+        if limite:
+            funcionarioSQL += " LIMIT %s OFFSET %s"
+            params += [limite, desplazamiento or 0]
         
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
         
         try:
-            cur.execute(funcionarioSQL)
+            cur.execute(funcionarioSQL, params)
             funcionarios = cur.fetchall()
             
             return [{
@@ -66,7 +100,7 @@ class FuncionarioDao:
                 'cargo': f[9],
                 'activo': f[10],
                 'matricula': f[11],
-                'especialidades': f[12],
+                'especialidades': self.unir_especialidades(f[12]),
                 'es_especialista': f[13],
                 'fecha_registro': f[14].strftime('%d/%m/%Y') if f[14] else None
             } for f in funcionarios]
@@ -102,7 +136,7 @@ class FuncionarioDao:
                 p.per_fecha_inscripcion,
                 e.esp_matricula,
                 e.esp_color_agenda,
-                STRING_AGG(esp.des_especialidad, ', ') AS especialidades
+                lat.especialidades
             FROM funcionarios f
             JOIN personas p ON f.id_persona = p.id_persona
             JOIN cargos car ON f.id_cargo = car.id_cargo
@@ -113,14 +147,8 @@ class FuncionarioDao:
             LEFT JOIN niveles_instruccion ni ON p.id_nivel_instruccion = ni.id_nivel_instruccion AND ni.est_nivel_instruccion = TRUE
             LEFT JOIN profesiones pr ON p.id_profesion = pr.id_profesion AND pr.est_profesion = TRUE
             LEFT JOIN especialistas e ON f.id_funcionario = e.id_funcionario
-            LEFT JOIN especialista_especialidades ee ON e.id_especialista = ee.id_especialista
-            LEFT JOIN especialidades esp ON ee.id_especialidad = esp.id_especialidad AND esp.est_especialidad = TRUE
+        """ + self.ESPECIALIDADES_LATERAL_SQL + """
             WHERE f.id_funcionario = %s
-            GROUP BY f.id_funcionario, f.fun_estado, p.per_nombre, p.per_apellido, p.per_cedula,
-                     p.per_fecha_nacimiento, p.per_telefono, p.per_correo, p.per_domicilio,
-                     g.des_genero, ec.des_estado_civil, c.des_ciudad, cn.des_ciudad,
-                     ni.des_nivel_instruccion, pr.des_profesion, car.des_cargo,
-                     p.per_fecha_inscripcion, e.esp_matricula, e.esp_color_agenda
         """
         
         conexion = Conexion()
@@ -155,7 +183,7 @@ class FuncionarioDao:
                 'fecha_registro': f[17].strftime('%d/%m/%Y') if f[17] else None,
                 'matricula': f[18],
                 'color_agenda': f[19],
-                'especialidades': f[20]
+                'especialidades': self.unir_especialidades(f[20])
             }
             
         except Exception as e:
@@ -195,7 +223,8 @@ class FuncionarioDao:
                 cn.des_ciudad,
                 ni.des_nivel_instruccion,
                 pr.des_profesion,
-                car.des_cargo
+                car.des_cargo,
+                f.xmin::text || '.' || p.xmin::text || '.' || COALESCE(e.xmin::text, '0')
             FROM funcionarios f
             JOIN personas p ON f.id_persona = p.id_persona
             JOIN cargos car ON f.id_cargo = car.id_cargo
@@ -256,6 +285,8 @@ class FuncionarioDao:
                 'nivel_instruccion': f[24],
                 'profesion': f[25],
                 'cargo': f[26],
+                # Versión de la fila para control de concurrencia en updateFuncionario
+                'version': f[27],
                 'especialidades': []
             }
             
@@ -288,11 +319,11 @@ class FuncionarioDao:
         
         # Validar si es especialista
         if self.es_cargo_especialista(id_cargo):
-            if not esp_matricula:
-                app.logger.error("Matrícula es obligatoria para especialistas")
+            if not esp_matricula and self.requiere_matricula(id_cargo):
+                logger.error("Matrícula es obligatoria para especialistas")
                 return None
             if not especialidades or len(especialidades) == 0:
-                app.logger.error("Debe seleccionar al menos una especialidad")
+                logger.error("Debe seleccionar al menos una especialidad")
                 return None
         
         insertPersonaSQL = """
@@ -315,9 +346,12 @@ class FuncionarioDao:
             RETURNING id_especialista
         """
         
+        # Todas las especialidades en una sola sentencia
         insertEspecialidadSQL = """
             INSERT INTO especialista_especialidades(id_especialista, id_especialidad)
-            VALUES(%s, %s)
+            SELECT DISTINCT %s::int, nueva.id_especialidad
+            FROM unnest(%s::int[]) AS nueva(id_especialidad)
+            ON CONFLICT (id_especialista, id_especialidad) DO NOTHING
         """
 
         conexion = Conexion()
@@ -326,23 +360,23 @@ class FuncionarioDao:
 
         try:
             # 1. Insertar persona
-            app.logger.info(f"Insertando persona: {nombre} {apellido}")
+            logger.info("Insertando persona: %s %s", nombre, apellido)
             cur.execute(insertPersonaSQL, (nombre, apellido, cedula, fecha_nacimiento, genero_id, 
                                         estado_civil_id, telefono, correo, domicilio, ciudad_id, 
                                         ciudad_nacimiento_id, nivel_instruccion_id, profesion_id))
             persona_id = cur.fetchone()[0]
-            app.logger.info(f"Persona insertada con ID: {persona_id}")
+            logger.info("Persona insertada con ID: %s", persona_id)
 
             # 2. Insertar funcionario
-            app.logger.info(f"Insertando funcionario con cargo ID: {id_cargo}")
+            logger.info("Insertando funcionario con cargo ID: %s", id_cargo)
             cur.execute(insertFuncionarioSQL, (persona_id, id_cargo, fun_estado, creacion_usuario))
             funcionario_id = cur.fetchone()[0]
-            app.logger.info(f"Funcionario insertado con ID: {funcionario_id}")
+            logger.info("Funcionario insertado con ID: %s", funcionario_id)
 
             # 3. Si es especialista, insertar en especialistas
-            if self.es_cargo_especialista(id_cargo) and esp_matricula:
-                app.logger.info(f"Es especialista - Insertando datos de especialista")
-                app.logger.info(f"Matrícula: {esp_matricula}, Color: {esp_color_agenda}")
+            if self.es_cargo_especialista(id_cargo):
+                logger.info("Es especialista - Insertando datos de especialista")
+                logger.info("Matrícula: %s, Color: %s", esp_matricula, esp_color_agenda)
                 
                 cur.execute(insertEspecialistaSQL, (funcionario_id, esp_matricula, esp_color_agenda))
                 result = cur.fetchone()
@@ -351,84 +385,247 @@ class FuncionarioDao:
                     raise Exception("No se pudo obtener el ID del especialista insertado")
                 
                 especialista_id = result[0]
-                app.logger.info(f"Especialista insertado con ID: {especialista_id}")
+                logger.info("Especialista insertado con ID: %s", especialista_id)
                 
                 # 4. Insertar especialidades (múltiples)
                 if especialidades:
-                    app.logger.info(f"Insertando {len(especialidades)} especialidades: {especialidades}")
-                    for id_especialidad in especialidades:
-                        app.logger.info(f"Insertando relación - especialista_id: {especialista_id}, especialidad_id: {id_especialidad}")
-                        cur.execute(insertEspecialidadSQL, (especialista_id, id_especialidad))
-                    app.logger.info("Todas las especialidades insertadas correctamente")
+                    logger.info("Insertando %s especialidades: %s", len(especialidades), especialidades)
+                    cur.execute(insertEspecialidadSQL, (especialista_id, list(especialidades)))
 
             con.commit()
-            app.logger.info(f"Funcionario guardado exitosamente con ID: {funcionario_id}")
+            EspecialistaDao.invalidar()
+            logger.info("Funcionario guardado exitosamente con ID: %s", funcionario_id)
             return funcionario_id
 
         except Exception as e:
             con.rollback()
-            app.logger.error(f"Error al insertar funcionario completo: {str(e)}", exc_info=True)
+            logger.error("Error al insertar funcionario completo: %s", e, exc_info=True)
             return None
 
         finally:
             cur.close()
             con.close()
 
+    # Un solo UPDATE con CTEs, después de BLOQUEO_FUNCIONARIO_SQL: compara la
+    # versión esperada y actualiza persona, funcionario, especialista y
+    # especialidades. Las especialidades se sincronizan por diferencia (solo
+    # se borran las que salen y se insertan las que entran).
+    UPDATE_FUNCIONARIO_SQL = """
+        WITH actual AS (
+            SELECT f.id_funcionario, f.id_persona, e.id_especialista,
+                   f.xmin::text || '.' || p.xmin::text || '.' || COALESCE(e.xmin::text, '0') AS version
+            FROM funcionarios f
+            JOIN personas p ON f.id_persona = p.id_persona
+            LEFT JOIN especialistas e ON f.id_funcionario = e.id_funcionario
+            WHERE f.id_funcionario = %(id_funcionario)s
+        ),
+        permitido AS (
+            SELECT * FROM actual
+            WHERE %(version)s::text IS NULL OR version = %(version)s::text
+        ),
+        upd_persona AS (
+            UPDATE personas
+            SET per_nombre = %(nombre)s, per_apellido = %(apellido)s, per_cedula = %(cedula)s,
+                per_fecha_nacimiento = %(fecha_nacimiento)s, id_genero = %(genero_id)s,
+                id_estado_civil = %(estado_civil_id)s, per_telefono = %(telefono)s,
+                per_correo = %(correo)s, per_domicilio = %(domicilio)s, id_ciudad = %(ciudad_id)s,
+                id_ciudad_nacimiento = %(ciudad_nacimiento_id)s,
+                id_nivel_instruccion = %(nivel_instruccion_id)s, id_profesion = %(profesion_id)s
+            FROM permitido
+            WHERE personas.id_persona = permitido.id_persona
+            RETURNING personas.xmin
+        ),
+        upd_funcionario AS (
+            UPDATE funcionarios
+            SET id_cargo = %(id_cargo)s, fun_estado = %(fun_estado)s,
+                modificacion_fecha = CURRENT_DATE, modificacion_hora = CURRENT_TIME
+            FROM permitido
+            WHERE funcionarios.id_funcionario = permitido.id_funcionario
+            RETURNING funcionarios.xmin
+        ),
+        upd_especialista AS (
+            UPDATE especialistas
+            SET esp_matricula = %(esp_matricula)s, esp_color_agenda = %(esp_color_agenda)s
+            FROM permitido
+            WHERE %(con_especialista)s AND especialistas.id_especialista = permitido.id_especialista
+            RETURNING especialistas.id_especialista, especialistas.xmin
+        ),
+        ins_especialista AS (
+            INSERT INTO especialistas(id_funcionario, esp_matricula, esp_color_agenda)
+            SELECT id_funcionario, %(esp_matricula)s, %(esp_color_agenda)s
+            FROM permitido
+            WHERE %(con_especialista)s AND id_especialista IS NULL
+            RETURNING id_especialista, xmin
+        ),
+        especialista AS (
+            SELECT id_especialista, xmin FROM upd_especialista
+            UNION ALL
+            SELECT id_especialista, xmin FROM ins_especialista
+        ),
+        del_especialidades AS (
+            DELETE FROM especialista_especialidades ee
+            USING permitido
+            WHERE ee.id_especialista = permitido.id_especialista
+              AND (NOT %(con_especialista)s OR NOT ee.id_especialidad = ANY(%(especialidades)s::int[]))
+        ),
+        ins_especialidades AS (
+            INSERT INTO especialista_especialidades(id_especialista, id_especialidad)
+            SELECT DISTINCT esp.id_especialista, nueva.id_especialidad
+            FROM especialista esp
+            CROSS JOIN unnest(%(especialidades)s::int[]) AS nueva(id_especialidad)
+            ON CONFLICT (id_especialista, id_especialidad) DO NOTHING
+        ),
+        del_especialista AS (
+            DELETE FROM especialistas
+            USING permitido
+            WHERE NOT %(con_especialista)s AND especialistas.id_especialista = permitido.id_especialista
+        )
+        SELECT (SELECT version FROM actual),
+               (SELECT xmin::text FROM upd_funcionario) || '.' || (SELECT xmin::text FROM upd_persona) || '.' ||
+               COALESCE((SELECT xmin::text FROM especialista), '0')
+    """
+
     def updateFuncionario(self, id_funcionario, nombre, apellido, cedula, fecha_nacimiento, genero_id, 
                         estado_civil_id, telefono, correo, domicilio, ciudad_id, ciudad_nacimiento_id,
                         nivel_instruccion_id, profesion_id, id_cargo, fun_estado,
-                        esp_matricula=None, especialidades=None, esp_color_agenda='#3498db'):
-        """Actualiza un funcionario completo (persona + funcionario + especialista + especialidades)"""
+                        esp_matricula=None, especialidades=None, esp_color_agenda='#3498db',
+                        version=None):
+        """
+        Actualiza un funcionario completo (persona + funcionario + especialista + especialidades)
+        en una sola sentencia.
+
+        `version` es la que devolvió getFuncionarioParaEditar; si se indica y el
+        funcionario cambió desde entonces no se escribe nada.
+
+        Retorna la nueva versión, None si el funcionario no existe, "conflicto"
+        si la versión no coincide o False si falla la validación o la actualización.
+        """
         
         # Validar si es especialista
         if self.es_cargo_especialista(id_cargo):
-            if not esp_matricula:
+            if not esp_matricula and self.requiere_matricula(id_cargo):
                 app.logger.error("Matrícula es obligatoria para especialistas")
                 return False
             if not especialidades or len(especialidades) == 0:
                 app.logger.error("Debe seleccionar al menos una especialidad")
                 return False
-        
-        updatePersonaSQL = """
-            UPDATE personas
-            SET per_nombre = %s, per_apellido = %s, per_cedula = %s, per_fecha_nacimiento = %s,
-                id_genero = %s, id_estado_civil = %s, per_telefono = %s, per_correo = %s,
-                per_domicilio = %s, id_ciudad = %s, id_ciudad_nacimiento = %s,
-                id_nivel_instruccion = %s, id_profesion = %s
-            WHERE id_persona = (SELECT id_persona FROM funcionarios WHERE id_funcionario = %s)
-        """
-        
-        updateFuncionarioSQL = """
-            UPDATE funcionarios
-            SET id_cargo = %s, fun_estado = %s, modificacion_fecha = CURRENT_DATE, 
-                modificacion_hora = CURRENT_TIME
-            WHERE id_funcionario = %s
-        """
-        
-        updateEspecialistaSQL = """
-            UPDATE especialistas
-            SET esp_matricula = %s, esp_color_agenda = %s
-            WHERE id_funcionario = %s
-        """
-        
-        insertEspecialistaSQL = """
-            INSERT INTO especialistas(id_funcionario, esp_matricula, esp_color_agenda)
-            VALUES(%s, %s, %s) 
-            RETURNING id_especialista
-        """
-        
-        deleteEspecialidadesSQL = """
-            DELETE FROM especialista_especialidades 
-            WHERE id_especialista = (SELECT id_especialista FROM especialistas WHERE id_funcionario = %s)
-        """
-        
-        insertEspecialidadSQL = """
+
+        con_especialista = self.es_cargo_especialista(id_cargo)
+        parametros = {
+            'id_funcionario': id_funcionario, 'version': version, 'nombre': nombre,
+            'apellido': apellido, 'cedula': cedula, 'fecha_nacimiento': fecha_nacimiento,
+            'genero_id': genero_id, 'estado_civil_id': estado_civil_id, 'telefono': telefono,
+            'correo': correo, 'domicilio': domicilio, 'ciudad_id': ciudad_id,
+            'ciudad_nacimiento_id': ciudad_nacimiento_id, 'nivel_instruccion_id': nivel_instruccion_id,
+            'profesion_id': profesion_id, 'id_cargo': id_cargo, 'fun_estado': fun_estado,
+            'esp_matricula': esp_matricula, 'esp_color_agenda': esp_color_agenda,
+            'con_especialista': con_especialista,
+            'especialidades': list(especialidades or []) if con_especialista else [],
+        }
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            # Sentencia aparte (ver BLOQUEO_FUNCIONARIO_SQL): el UPDATE lee las
+            # especialidades que confirmó la edición que tenía el bloqueo
+            cur.execute(self.BLOQUEO_FUNCIONARIO_SQL, (id_funcionario,))
+            if cur.fetchone() is None:
+                con.rollback()
+                app.logger.warning(f"No se encontró el funcionario con ID: {id_funcionario}")
+                return None
+
+            cur.execute(self.UPDATE_FUNCIONARIO_SQL, parametros)
+            version_anterior, version_nueva = cur.fetchone()
+
+            if version_anterior is None:
+                con.rollback()
+                app.logger.warning(f"No se encontró el funcionario con ID: {id_funcionario}")
+                return None
+
+            if version_nueva is None:
+                con.rollback()
+                app.logger.warning(f"Conflicto de versión al actualizar funcionario {id_funcionario}: "
+                                   f"esperada {version}, actual {version_anterior}")
+                return "conflicto"
+
+            con.commit()
+            EspecialistaDao.invalidar()
+            app.logger.info(f"Funcionario {id_funcionario} actualizado exitosamente")
+            return version_nueva
+
+        except Exception as e:
+            app.logger.error(f"Error al actualizar funcionario: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
+
+    # Bloquea el funcionario antes de UPDATE_FUNCIONARIO_SQL y
+    # ESPECIALIDADES_DIFERENCIA_SQL. Tiene que
+    # ser otra sentencia: un FOR UPDATE dentro del CTE no frena al DELETE/INSERT
+    # hermanos, que ya leyeron con la foto del comienzo. Así la siguiente
+    # sentencia ve lo que confirmó quien tenía el bloqueo.
+    BLOQUEO_FUNCIONARIO_SQL = """
+        SELECT id_funcionario FROM funcionarios
+        WHERE id_funcionario = %s
+        FOR UPDATE
+    """
+
+    # Agrega y quita especialidades de un especialista en una sentencia: solo
+    # toca las filas que cambian. Con reemplazar, quita todas las que no están
+    # en agregar. Devuelve el especialista y las especialidades agregadas y
+    # quitadas (sin filas si el funcionario no existe).
+    ESPECIALIDADES_DIFERENCIA_SQL = """
+        WITH actual AS (
+            SELECT f.id_funcionario, e.id_especialista
+            FROM funcionarios f
+            LEFT JOIN especialistas e ON f.id_funcionario = e.id_funcionario
+            WHERE f.id_funcionario = %(id_funcionario)s
+        ),
+        del_especialidades AS (
+            DELETE FROM especialista_especialidades ee
+            USING actual
+            WHERE ee.id_especialista = actual.id_especialista
+              AND NOT ee.id_especialidad = ANY(%(agregar)s::int[])
+              AND (%(reemplazar)s OR ee.id_especialidad = ANY(%(quitar)s::int[]))
+            RETURNING ee.id_especialidad
+        ),
+        ins_especialidades AS (
             INSERT INTO especialista_especialidades(id_especialista, id_especialidad)
-            VALUES(%s, %s)
+            SELECT DISTINCT actual.id_especialista, nueva.id_especialidad
+            FROM actual
+            CROSS JOIN unnest(%(agregar)s::int[]) AS nueva(id_especialidad)
+            WHERE actual.id_especialista IS NOT NULL
+            ON CONFLICT (id_especialista, id_especialidad) DO NOTHING
+            RETURNING id_especialidad
+        )
+        SELECT actual.id_especialista,
+               ARRAY(SELECT id_especialidad FROM ins_especialidades ORDER BY 1),
+               ARRAY(SELECT id_especialidad FROM del_especialidades ORDER BY 1)
+        FROM actual
+    """
+
+    def updateEspecialidadesFuncionario(self, id_funcionario, agregar=None, quitar=None, reemplazar=False):
         """
-        
-        deleteEspecialistaSQL = """
-            DELETE FROM especialistas WHERE id_funcionario = %s
+        Aplica la diferencia de especialidades de un especialista. Retorna un
+        dict con agregadas, quitadas y la lista final; None si el funcionario no
+        existe; "no_especialista", "sin_especialidades" (quedaría sin ninguna) o
+        "especialidad_invalida" si no se puede aplicar; False ante otro error.
+        """
+        parametros = {
+            'id_funcionario': id_funcionario,
+            'agregar': list(agregar or []),
+            'quitar': list(quitar or []),
+            'reemplazar': bool(reemplazar),
+        }
+
+        especialidadesSQL = """
+            SELECT ARRAY(
+                SELECT id_especialidad FROM especialista_especialidades
+                WHERE id_especialista = %s ORDER BY 1)
         """
 
         conexion = Conexion()
@@ -436,50 +633,43 @@ class FuncionarioDao:
         cur = con.cursor()
 
         try:
-            # 1. Actualizar persona
-            cur.execute(updatePersonaSQL, (nombre, apellido, cedula, fecha_nacimiento, genero_id,
-                                        estado_civil_id, telefono, correo, domicilio, ciudad_id,
-                                        ciudad_nacimiento_id, nivel_instruccion_id, 
-                                        profesion_id, id_funcionario))
+            cur.execute(self.BLOQUEO_FUNCIONARIO_SQL, (id_funcionario,))
+            if cur.fetchone() is None:
+                con.rollback()
+                return None
 
-            # 2. Actualizar funcionario
-            cur.execute(updateFuncionarioSQL, (id_cargo, fun_estado, id_funcionario))
+            cur.execute(self.ESPECIALIDADES_DIFERENCIA_SQL, parametros)
+            fila = cur.fetchone()
 
-            # 3. Manejar datos de especialista
-            cur.execute("SELECT id_especialista FROM especialistas WHERE id_funcionario = %s", (id_funcionario,))
-            existe_especialista = cur.fetchone()
+            if fila is None:
+                con.rollback()
+                return None
 
-            if self.es_cargo_especialista(id_cargo):
-                # Si debe ser especialista
-                if esp_matricula:
-                    if existe_especialista:
-                        # Actualizar especialista existente
-                        cur.execute(updateEspecialistaSQL, (esp_matricula, esp_color_agenda, id_funcionario))
-                        id_especialista = existe_especialista[0]
-                    else:
-                        # Crear nuevo especialista
-                        cur.execute(insertEspecialistaSQL, (id_funcionario, esp_matricula, esp_color_agenda))
-                        id_especialista = cur.fetchone()[0]
-                    
-                    # Actualizar especialidades: eliminar viejas e insertar nuevas
-                    cur.execute(deleteEspecialidadesSQL, (id_funcionario,))
-                    
-                    if especialidades:
-                        for id_especialidad in especialidades:
-                            # ✅ CORRECCIÓN: Solo 2 parámetros, no 3
-                            cur.execute(insertEspecialidadSQL, (id_especialista, id_especialidad))
-            else:
-                # Si ya no es especialista, eliminar datos
-                if existe_especialista:
-                    cur.execute(deleteEspecialidadesSQL, (id_funcionario,))
-                    cur.execute(deleteEspecialistaSQL, (id_funcionario,))
+            id_especialista, agregadas, quitadas = fila
+            if id_especialista is None:
+                con.rollback()
+                return "no_especialista"
+
+            cur.execute(especialidadesSQL, (id_especialista,))
+            especialidades = cur.fetchone()[0]
+            if not especialidades:
+                con.rollback()
+                return "sin_especialidades"
 
             con.commit()
-            app.logger.info(f"Funcionario {id_funcionario} actualizado exitosamente")
-            return True
+            EspecialistaDao.invalidar()
+            logger.info("Especialidades del funcionario %s: +%s -%s", id_funcionario, agregadas, quitadas)
+            return {
+                'agregadas': agregadas,
+                'quitadas': quitadas,
+                'especialidades': especialidades,
+            }
 
+        except errors.ForeignKeyViolation:
+            con.rollback()
+            return "especialidad_invalida"
         except Exception as e:
-            app.logger.error(f"Error al actualizar funcionario: {str(e)}")
+            logger.error("Error al actualizar especialidades del funcionario %s: %s", id_funcionario, e)
             con.rollback()
             return False
         finally:
@@ -515,6 +705,7 @@ class FuncionarioDao:
             cur.execute("DELETE FROM personas WHERE id_persona = %s", (persona_id,))
 
             con.commit()
+            EspecialistaDao.invalidar()
             return True
 
         except Exception as e:
@@ -525,6 +716,248 @@ class FuncionarioDao:
             cur.close()
             con.close()
 
+    CLAVES_FILTRO = ('id_cargo', 'activo', 'id_especialidad')
+
+    def construir_filtro_funcionarios(self, filtro):
+        """
+        Traduce un filtro de funcionarios a (condiciones SQL, parámetros).
+        Claves admitidas: id_cargo, activo (bool), id_especialidad.
+        Las condiciones usan el alias f (funcionarios). Una clave
+        desconocida o un booleano mal escrito es ValueError.
+        """
+        condiciones = []
+        params = []
+        filtro = filtro or {}
+        validar_claves(filtro, self.CLAVES_FILTRO)
+
+        if presente(filtro.get('id_cargo')):
+            condiciones.append("f.id_cargo = %s")
+            params.append(filtro['id_cargo'])
+        if presente(filtro.get('activo')):
+            condiciones.append("f.fun_estado = %s")
+            params.append(booleano(filtro['activo']))
+        if presente(filtro.get('id_especialidad')):
+            condiciones.append("""EXISTS (
+                SELECT 1 FROM especialistas e
+                JOIN especialista_especialidades ee ON ee.id_especialista = e.id_especialista
+                WHERE e.id_funcionario = f.id_funcionario AND ee.id_especialidad = %s)""")
+            params.append(filtro['id_especialidad'])
+
+        return condiciones, params
+
+    def iterarFuncionarios(self, filtro=None, tamano_bloque=5000):
+        """
+        Recorre el listado de funcionarios (filas crudas de FUNCIONARIO_LISTA_SQL)
+        por apellido y nombre con un cursor del lado del servidor, de a
+        `tamano_bloque` filas. No usa el logger de Flask: puede ejecutarse en
+        un proceso de trabajo; los errores se propagan.
+        """
+        condiciones, params = self.construir_filtro_funcionarios(filtro)
+        funcionarioSQL = self.FUNCIONARIO_LISTA_SQL
+        if condiciones:
+            funcionarioSQL += " WHERE " + " AND ".join(condiciones)
+        funcionarioSQL += " ORDER BY p.per_apellido, p.per_nombre, f.id_funcionario"
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor(name='iterar_funcionarios')
+        cur.itersize = tamano_bloque
+
+        try:
+            cur.execute(funcionarioSQL, params)
+            for fila in cur:
+                yield fila
+        finally:
+            cur.close()
+            con.close()
+
+    def getIdsFuncionarios(self, filtro=None, requerir_criterio=False):
+        """
+        Obtiene los IDs de funcionarios que cumplen el filtro (ver construir_filtro_funcionarios).
+        Con requerir_criterio, un filtro sin ninguna condición es ValueError
+        en lugar de devolver todos los funcionarios.
+        """
+        condiciones, params = self.construir_filtro_funcionarios(filtro)
+        if requerir_criterio and not condiciones:
+            raise ValueError("El filtro no tiene ningún criterio")
+        funcionarioSQL = "SELECT f.id_funcionario FROM funcionarios f"
+        if condiciones:
+            funcionarioSQL += " WHERE " + " AND ".join(condiciones)
+        funcionarioSQL += " ORDER BY f.id_funcionario"
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(funcionarioSQL, params)
+            return [r[0] for r in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener IDs de funcionarios: {str(e)}")
+            return []
+        finally:
+            cur.close()
+            con.close()
+
+    # Elimina un bloque de funcionarios en una sentencia: especialidades,
+    # especialista, funcionario y persona. Devuelve los IDs eliminados.
+    DELETE_FUNCIONARIOS_SQL = """
+        WITH objetivo AS (
+            SELECT id_funcionario, id_persona
+            FROM funcionarios
+            WHERE id_funcionario = ANY(%s)
+            FOR UPDATE
+        ),
+        del_especialidades AS (
+            DELETE FROM especialista_especialidades ee
+            USING especialistas e, objetivo o
+            WHERE ee.id_especialista = e.id_especialista AND e.id_funcionario = o.id_funcionario
+        ),
+        del_especialistas AS (
+            DELETE FROM especialistas e
+            USING objetivo o
+            WHERE e.id_funcionario = o.id_funcionario
+        ),
+        del_funcionarios AS (
+            DELETE FROM funcionarios f
+            USING objetivo o
+            WHERE f.id_funcionario = o.id_funcionario
+            RETURNING f.id_funcionario, f.id_persona
+        ),
+        del_personas AS (
+            DELETE FROM personas p
+            USING del_funcionarios d
+            WHERE p.id_persona = d.id_persona
+        )
+        SELECT id_funcionario FROM del_funcionarios
+    """
+
+    def deleteFuncionariosLote(self, ids, tamano_lote=None):
+        """
+        Elimina varios funcionarios por bloques de `tamano_lote` (una transacción
+        y una sentencia por bloque).
+
+        Si un bloque falla porque algún funcionario está referenciado (p. ej. por
+        un usuario), ese bloque se repite uno por uno para aislarlos.
+
+        Retorna una lista con {'id_funcionario', 'resultado'} en el orden de `ids`;
+        resultado es 'eliminado', 'no_encontrado', 'en_uso' o 'error'.
+        """
+        tamano_lote = tamano_lote or self.TAMANO_LOTE_ELIMINACION
+        ids = list(dict.fromkeys(ids))
+        resultados = {}
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            for inicio in range(0, len(ids), tamano_lote):
+                bloque = ids[inicio:inicio + tamano_lote]
+
+                try:
+                    cur.execute(self.DELETE_FUNCIONARIOS_SQL, (bloque,))
+                    eliminados = {r[0] for r in cur.fetchall()}
+                    con.commit()
+
+                except errors.ForeignKeyViolation:
+                    con.rollback()
+                    app.logger.warning(f"Bloque de {len(bloque)} funcionarios con referencias, "
+                                       f"se elimina uno por uno")
+                    eliminados = set()
+                    for id_funcionario in bloque:
+                        cur.execute("SAVEPOINT eliminar_funcionario")
+                        try:
+                            cur.execute(self.DELETE_FUNCIONARIOS_SQL, ([id_funcionario],))
+                            if cur.fetchone():
+                                eliminados.add(id_funcionario)
+                            cur.execute("RELEASE SAVEPOINT eliminar_funcionario")
+                        except errors.ForeignKeyViolation:
+                            cur.execute("ROLLBACK TO SAVEPOINT eliminar_funcionario")
+                            resultados[id_funcionario] = 'en_uso'
+                    con.commit()
+
+                for id_funcionario in bloque:
+                    if id_funcionario in eliminados:
+                        resultados[id_funcionario] = 'eliminado'
+                    else:
+                        resultados.setdefault(id_funcionario, 'no_encontrado')
+
+            app.logger.info(f"Eliminación por lotes: {len(ids)} funcionarios procesados")
+
+        except Exception as e:
+            app.logger.error(f"Error al eliminar funcionarios por lotes: {str(e)}", exc_info=True)
+            con.rollback()
+        finally:
+            cur.close()
+            con.close()
+            EspecialistaDao.invalidar()
+
+        # Los bloques ya confirmados conservan su resultado; el resto queda en error
+        return [{'id_funcionario': i, 'resultado': resultados.get(i, 'error')} for i in ids]
+
+    # Marca un bloque como inactivo; informa también los que ya lo estaban
+    ARCHIVAR_FUNCIONARIOS_SQL = """
+        WITH objetivo AS (
+            SELECT id_funcionario, fun_estado
+            FROM funcionarios
+            WHERE id_funcionario = ANY(%s)
+            FOR UPDATE
+        ),
+        archivados AS (
+            UPDATE funcionarios f
+            SET fun_estado = FALSE, modificacion_fecha = CURRENT_DATE,
+                modificacion_hora = CURRENT_TIME
+            FROM objetivo o
+            WHERE f.id_funcionario = o.id_funcionario AND o.fun_estado IS DISTINCT FROM FALSE
+            RETURNING f.id_funcionario
+        )
+        SELECT o.id_funcionario, a.id_funcionario IS NOT NULL
+        FROM objetivo o
+        LEFT JOIN archivados a ON a.id_funcionario = o.id_funcionario
+    """
+
+    def archivarFuncionariosLote(self, ids, tamano_lote=None):
+        """
+        Archiva (fun_estado = FALSE) varios funcionarios por bloques; conserva
+        sus datos y referencias.
+
+        Retorna una lista con {'id_funcionario', 'resultado'} en el orden de `ids`;
+        resultado es 'archivado', 'ya_archivado', 'no_encontrado' o 'error'.
+        """
+        tamano_lote = tamano_lote or self.TAMANO_LOTE_ELIMINACION
+        ids = list(dict.fromkeys(ids))
+        resultados = {}
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            for inicio in range(0, len(ids), tamano_lote):
+                bloque = ids[inicio:inicio + tamano_lote]
+                cur.execute(self.ARCHIVAR_FUNCIONARIOS_SQL, (bloque,))
+                filas = cur.fetchall()
+                con.commit()
+
+                for id_funcionario, archivado in filas:
+                    resultados[id_funcionario] = 'archivado' if archivado else 'ya_archivado'
+                for id_funcionario in bloque:
+                    resultados.setdefault(id_funcionario, 'no_encontrado')
+
+            app.logger.info(f"Archivado por lotes: {len(ids)} funcionarios procesados")
+
+        except Exception as e:
+            app.logger.error(f"Error al archivar funcionarios por lotes: {str(e)}", exc_info=True)
+            con.rollback()
+        finally:
+            cur.close()
+            con.close()
+            EspecialistaDao.invalidar()
+
+        return [{'id_funcionario': i, 'resultado': resultados.get(i, 'error')} for i in ids]
+
     def getFuncionariosEspecialistas(self):
         """Obtiene solo los funcionarios que son especialistas"""
         funcionarioSQL = """
@@ -536,15 +969,12 @@ class FuncionarioDao:
                 p.per_telefono,
                 e.esp_matricula,
                 e.esp_color_agenda,
-                STRING_AGG(esp.des_especialidad, ', ') AS especialidades
+                lat.especialidades
             FROM funcionarios f
             JOIN personas p ON f.id_persona = p.id_persona
             JOIN especialistas e ON f.id_funcionario = e.id_funcionario
-            LEFT JOIN especialista_especialidades ee ON e.id_especialista = ee.id_especialista
-            LEFT JOIN especialidades esp ON ee.id_especialidad = esp.id_especialidad AND esp.est_especialidad = TRUE
+        """ + self.ESPECIALIDADES_LATERAL_SQL + """
             WHERE f.fun_estado = TRUE
-            GROUP BY f.id_funcionario, p.per_nombre, p.per_apellido, p.per_cedula, 
-                     p.per_telefono, e.esp_matricula, e.esp_color_agenda
             ORDER BY p.per_nombre
         """
         
@@ -563,7 +993,7 @@ class FuncionarioDao:
                 'telefono': r[4],
                 'matricula': r[5],
                 'color_agenda': r[6],
-                'especialidades': r[7]
+                'especialidades': self.unir_especialidades(r[7])
             } for r in resultados]
         except Exception as e:
             app.logger.error(f"Error al obtener funcionarios especialistas: {str(e)}")
@@ -1,8 +1,21 @@
+import logging
 from flask import current_app as app
+from psycopg2 import errors
+from psycopg2.extras import execute_values
 from app.conexion.Conexion import Conexion
+from app.dao.filtros import validar_claves, presente, booleano
+from app.reportes.cache_documentos import cache_documentos
 from datetime import date, datetime
 
+logger = logging.getLogger(__name__)
+
 class PacienteDao:
+
+    # Cantidad de pacientes insertados por transacción en la carga por lotes
+    TAMANO_LOTE = 1000
+
+    # Pacientes eliminados por transacción: bloques cortos, bloqueos cortos
+    TAMANO_LOTE_ELIMINACION = 500
     
     def calcular_es_menor(self, fecha_nacimiento):
         """Calcula automáticamente si es menor de edad basado en la fecha de nacimiento"""
@@ -123,35 +136,87 @@ class PacienteDao:
         
         return historia
 
-    def getPacientes(self):
-        """Obtiene todos los pacientes con sus datos completos"""
-        pacienteSQL = """
+    def generar_historias_clinicas_lote(self, cur, registros):
+        """
+        Genera historias clínicas únicas para un lote de pacientes con una sola consulta.
+        Usa el mismo formato y sufijos (-2, -3, ...) que generar_historia_clinica_unica.
+        Las historias manuales se respetan; si ya existen se devuelve None en su posición.
+        """
+        bases = []
+        for r in registros:
+            manual = (r.get('historia_clinica') or '').strip()
+            if manual:
+                bases.append(manual)
+                continue
+            inicial_nombre = str(r.get('nombre') or '').strip()[:1].upper() or 'X'
+            inicial_apellido = str(r.get('apellido') or '').strip()[:1].upper() or 'X'
+            cedula_limpia = ''.join(filter(str.isdigit, str(r.get('cedula') or '')))
+            bases.append(f"{inicial_nombre}{inicial_apellido}{cedula_limpia}")
+
+        # Historias ya usadas: coincidencia exacta o con sufijo de alguna base del lote
+        patrones = [b.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '-%' for b in bases]
+        cur.execute("""
+            SELECT pac_historia_clinica FROM pacientes
+            WHERE pac_historia_clinica = ANY(%s) OR pac_historia_clinica LIKE ANY(%s)
+        """, (bases, patrones))
+        ocupadas = {fila[0] for fila in cur.fetchall()}
+
+        historias = []
+        for r, base in zip(registros, bases):
+            if (r.get('historia_clinica') or '').strip():
+                if base in ocupadas:
+                    historias.append(None)
+                    continue
+                historia = base
+            else:
+                historia = base
+                sufijo = 1
+                while historia in ocupadas:
+                    sufijo += 1
+                    historia = f"{base}-{sufijo}"
+            ocupadas.add(historia)
+            historias.append(historia)
+
+        return historias
+
+    # SELECT del listado de pacientes sobre el modelo de lectura
+    # (codigos_sql/pacientes_vista.sql); se completa con el WHERE del filtro
+    PACIENTE_LISTA_SQL = """
             SELECT
-                pac.id_paciente,
-                pac.pac_historia_clinica,
-                CASE WHEN DATE_PART('year', AGE(p.per_fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END AS es_menor,
-                p.per_nombre,
-                p.per_apellido,
-                p.per_cedula,
-                p.per_fecha_nacimiento,
-                DATE_PART('year', AGE(p.per_fecha_nacimiento)) AS edad,
-                p.per_telefono,
-                g.des_genero AS genero,
-                c.des_ciudad AS ciudad,
-                p.per_fecha_inscripcion
-            FROM pacientes pac
-            JOIN personas p ON pac.id_persona = p.id_persona
-            LEFT JOIN generos g ON p.id_genero = g.id_genero AND g.est_genero = TRUE
-            LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad
-            ORDER BY pac.id_paciente DESC
+                v.id_paciente,
+                v.historia_clinica,
+                CASE WHEN DATE_PART('year', AGE(v.fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END AS es_menor,
+                v.nombre,
+                v.apellido,
+                v.cedula,
+                v.fecha_nacimiento,
+                DATE_PART('year', AGE(v.fecha_nacimiento)) AS edad,
+                v.telefono,
+                v.genero,
+                v.ciudad,
+                v.fecha_registro
+            FROM pacientes_vista v
         """
+
+    def listado_pacientes_sql(self, filtro=None):
+        """Arma (sql, params) del listado de pacientes con el filtro aplicado"""
+        condiciones, params = self.construir_filtro_pacientes(filtro)
+        pacienteSQL = self.PACIENTE_LISTA_SQL
+        if condiciones:
+            pacienteSQL += " WHERE " + " AND ".join(condiciones)
+        pacienteSQL += " ORDER BY v.id_paciente DESC"
+        return pacienteSQL, params
+
+    def getPacientes(self, filtro=None):
+        """Obtiene todos los pacientes (opcionalmente filtrados) con sus datos completos"""
+        pacienteSQL, params = self.listado_pacientes_sql(filtro)
         
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
         
         try:
-            cur.execute(pacienteSQL)
+            cur.execute(pacienteSQL, params)
             pacientes = cur.fetchall()
             
             return [{
@@ -176,195 +241,359 @@ class PacienteDao:
             cur.close()
             con.close()
 
-    def getPacienteById(self, pac_id):
-        """Obtiene un paciente específico por ID con todos sus datos"""
-        pacienteSQL = """
-            SELECT
-                pac.id_paciente,
-                pac.pac_historia_clinica,
-                CASE WHEN DATE_PART('year', AGE(p.per_fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END AS es_menor,
-                pac.pac_observaciones,
-                p.per_nombre,
-                p.per_apellido,
-                p.per_cedula,
-                p.per_fecha_nacimiento,
-                DATE_PART('year', AGE(p.per_fecha_nacimiento)) AS edad,
-                p.per_telefono,
-                p.per_correo,
-                p.per_domicilio,
-                g.des_genero AS genero,
-                ec.des_estado_civil AS estado_civil,
-                c.des_ciudad AS ciudad,
-                cn.des_ciudad AS ciudad_nacimiento,
-                ni.des_nivel_instruccion AS nivel_instruccion,
-                pr.des_profesion AS profesion,
-                p.per_fecha_inscripcion,
-                pm.pam_nom_madre,
-                pm.pam_tel_madre,
-                pm.pam_nom_padre,
-                pm.pam_tel_padre,
-                pm.pam_colegio,
-                pm.pam_tel_colegio
+    def iterarPacientes(self, filtro=None, tamano_bloque=5000):
+        """
+        Recorre el listado de pacientes con un cursor del lado del servidor,
+        trayendo `tamano_bloque` filas por viaje sin cargar todo en memoria.
+        Devuelve las filas crudas de PACIENTE_LISTA_SQL. No usa el logger de
+        Flask: puede ejecutarse en un proceso de trabajo; los errores se propagan.
+        """
+        pacienteSQL, params = self.listado_pacientes_sql(filtro)
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor(name='iterar_pacientes')
+        cur.itersize = tamano_bloque
+
+        try:
+            cur.execute(pacienteSQL, params)
+            for fila in cur:
+                yield fila
+        finally:
+            cur.close()
+            con.close()
+
+    # ============================
+    # LECTURA DE PACIENTE POR PROYECCIÓN
+    # ============================
+
+    # Campo -> (expresión SQL, join o tupla de joins que necesita) sobre las tablas base. pacientes
+    # (pac) y personas (p) se unen siempre por clave; los catálogos y
+    # pacientes_menores solo si se piden.
+    CAMPOS_PACIENTE = {
+        'id_paciente': ("pac.id_paciente", None),
+        'id_persona': ("pac.id_persona", None),
+        'historia_clinica': ("pac.pac_historia_clinica", None),
+        'es_menor': ("CASE WHEN DATE_PART('year', AGE(p.per_fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END", None),
+        'observaciones': ("pac.pac_observaciones", None),
+        'nombre': ("p.per_nombre", None),
+        'apellido': ("p.per_apellido", None),
+        'cedula': ("p.per_cedula", None),
+        'fecha_nacimiento': ("p.per_fecha_nacimiento", None),
+        'edad': ("DATE_PART('year', AGE(p.per_fecha_nacimiento))", None),
+        'telefono': ("p.per_telefono", None),
+        'correo': ("p.per_correo", None),
+        'domicilio': ("p.per_domicilio", None),
+        'fecha_registro': ("p.per_fecha_inscripcion", None),
+        'id_genero': ("p.id_genero", None),
+        'id_estado_civil': ("p.id_estado_civil", None),
+        'id_ciudad': ("p.id_ciudad", None),
+        'id_ciudad_nacimiento': ("p.id_ciudad_nacimiento", None),
+        'id_nivel_instruccion': ("p.id_nivel_instruccion", None),
+        'id_profesion': ("p.id_profesion", None),
+        'genero': ("g.des_genero", 'g'),
+        'estado_civil': ("ec.des_estado_civil", 'ec'),
+        'ciudad': ("c.des_ciudad", 'c'),
+        'ciudad_nacimiento': ("cn.des_ciudad", 'cn'),
+        'nivel_instruccion': ("ni.des_nivel_instruccion", 'ni'),
+        'profesion': ("pr.des_profesion", 'pr'),
+        'nom_madre': ("pm.pam_nom_madre", 'pm'),
+        'tel_madre': ("pm.pam_tel_madre", 'pm'),
+        'nom_padre': ("pm.pam_nom_padre", 'pm'),
+        'tel_padre': ("pm.pam_tel_padre", 'pm'),
+        'educacion': ("pm.pam_educacion", 'pm'),
+        'colegio': ("pm.pam_colegio", 'pm'),
+        'tel_colegio': ("pm.pam_tel_colegio", 'pm'),
+        # Versión de la fila para control de concurrencia (ver getVersionPaciente)
+        'version': ("pac.xmin::text || '.' || p.xmin::text || '.' || COALESCE(pm.xmin::text, '0')", 'pm'),
+        # Versión de un documento generado (ver getVersionDocumento): la de la
+        # fila, la de cada catálogo cuya descripción se muestra y la fecha del día,
+        # de la que dependen edad y es_menor
+        'version_documento': ("pac.xmin::text || '.' || p.xmin::text || '.' || COALESCE(pm.xmin::text, '0')"
+                              " || '.' || COALESCE(g.xmin::text, '0') || '.' || COALESCE(ec.xmin::text, '0')"
+                              " || '.' || COALESCE(c.xmin::text, '0') || '.' || COALESCE(cn.xmin::text, '0')"
+                              " || '.' || COALESCE(ni.xmin::text, '0') || '.' || COALESCE(pr.xmin::text, '0')"
+                              " || '.' || to_char(CURRENT_DATE, 'YYYYMMDD')",
+                              ('pm', 'g', 'ec', 'c', 'cn', 'ni', 'pr')),
+    }
+
+    JOINS_PACIENTE = {
+        'g': "LEFT JOIN generos g ON p.id_genero = g.id_genero",
+        'ec': "LEFT JOIN estados_civiles ec ON p.id_estado_civil = ec.id_estado_civil",
+        'c': "LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad",
+        'cn': "LEFT JOIN ciudades cn ON p.id_ciudad_nacimiento = cn.id_ciudad",
+        'ni': "LEFT JOIN niveles_instruccion ni ON p.id_nivel_instruccion = ni.id_nivel_instruccion",
+        'pr': "LEFT JOIN profesiones pr ON p.id_profesion = pr.id_profesion",
+        'pm': "LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente",
+    }
+
+    # Campo -> expresión sobre pacientes_vista (v). Las proyecciones que solo
+    # piden estos campos se leen de una sola tabla; 'version' necesita el xmin
+    # de las tablas base y fuerza la lectura con JOINs.
+    CAMPOS_VISTA = {
+        **{campo: f"v.{campo}" for campo in CAMPOS_PACIENTE
+           if campo not in ('es_menor', 'edad', 'version', 'version_documento')},
+        'es_menor': "CASE WHEN DATE_PART('year', AGE(v.fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END",
+        'edad': "DATE_PART('year', AGE(v.fecha_nacimiento))",
+    }
+
+    # Proyecciones predefinidas: nombre -> (campos, formato de fecha)
+    PROYECCIONES_PACIENTE = {
+        # Sin catálogos ni datos de menor: solo pacientes + personas
+        'basico': ([
+            'id_paciente', 'historia_clinica', 'es_menor', 'nombre', 'apellido', 'cedula',
+            'fecha_nacimiento', 'edad', 'telefono', 'correo', 'domicilio', 'fecha_registro'
+        ], '%d/%m/%Y'),
+        # Ficha completa (vista, PDF, Excel)
+        'detalle': ([
+            'id_paciente', 'historia_clinica', 'es_menor', 'observaciones', 'nombre', 'apellido',
+            'cedula', 'fecha_nacimiento', 'edad', 'telefono', 'correo', 'domicilio', 'genero',
+            'estado_civil', 'ciudad', 'ciudad_nacimiento', 'nivel_instruccion', 'profesion',
+            'fecha_registro', 'nom_madre', 'tel_madre', 'nom_padre', 'tel_padre', 'colegio', 'tel_colegio'
+        ], '%d/%m/%Y'),
+        # Formulario de edición: IDs de catálogo y descripciones, fecha ISO
+        'editar': ([
+            'id_paciente', 'id_persona', 'historia_clinica', 'es_menor', 'observaciones', 'nombre',
+            'apellido', 'cedula', 'fecha_nacimiento', 'telefono', 'correo', 'domicilio', 'id_genero',
+            'id_estado_civil', 'id_ciudad', 'id_ciudad_nacimiento', 'id_nivel_instruccion',
+            'id_profesion', 'genero', 'estado_civil', 'ciudad', 'ciudad_nacimiento',
+            'nivel_instruccion', 'profesion', 'nom_madre', 'tel_madre', 'nom_padre', 'tel_padre',
+            'educacion', 'colegio', 'tel_colegio', 'version'
+        ], '%Y-%m-%d'),
+    }
+
+    def resolver_proyeccion(self, campos=None):
+        """
+        Normaliza una proyección: nombre predefinido, lista de campos o texto
+        separado por comas. Devuelve (campos, formato de fecha).
+        Lanza ValueError si algún campo no existe.
+        """
+        if not campos:
+            campos = 'detalle'
+        if isinstance(campos, str) and campos in self.PROYECCIONES_PACIENTE:
+            return self.PROYECCIONES_PACIENTE[campos]
+        if isinstance(campos, str):
+            campos = [c.strip() for c in campos.split(',') if c.strip()]
+
+        desconocidos = [c for c in campos if c not in self.CAMPOS_PACIENTE]
+        if desconocidos or not campos:
+            raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}")
+        # id_paciente siempre presente; sin duplicados y respetando el orden pedido
+        campos = list(dict.fromkeys(['id_paciente'] + list(campos)))
+        return campos, '%d/%m/%Y'
+
+    def proyeccion_paciente_sql(self, campos):
+        """
+        Arma el SELECT ... FROM para los campos pedidos y devuelve (sql, columna id).
+        Si todos están en pacientes_vista se lee solo esa tabla; si no, se unen
+        las tablas base con solo los JOINs que piden los campos.
+        """
+        if all(c in self.CAMPOS_VISTA for c in campos):
+            columnas = [self.CAMPOS_VISTA[c] for c in campos]
+            return f"""
+            SELECT {', '.join(columnas)}
+            FROM pacientes_vista v
+        """, "v.id_paciente"
+
+        columnas = [self.CAMPOS_PACIENTE[c][0] for c in campos]
+        joins = []
+        for c in campos:
+            aliases = self.CAMPOS_PACIENTE[c][1] or ()
+            for alias in (aliases,) if isinstance(aliases, str) else aliases:
+                if self.JOINS_PACIENTE[alias] not in joins:
+                    joins.append(self.JOINS_PACIENTE[alias])
+
+        separador = "\n            "
+        return f"""
+            SELECT {', '.join(columnas)}
             FROM pacientes pac
             JOIN personas p ON pac.id_persona = p.id_persona
-            LEFT JOIN generos g ON p.id_genero = g.id_genero AND g.est_genero = TRUE
-            LEFT JOIN estados_civiles ec ON p.id_estado_civil = ec.id_estado_civil AND ec.est_estado_civil = TRUE
-            LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad AND c.est_ciudad = TRUE
-            LEFT JOIN ciudades cn ON p.id_ciudad_nacimiento = cn.id_ciudad AND cn.est_ciudad = TRUE
-            LEFT JOIN niveles_instruccion ni ON p.id_nivel_instruccion = ni.id_nivel_instruccion AND ni.est_nivel_instruccion = TRUE
-            LEFT JOIN profesiones pr ON p.id_profesion = pr.id_profesion AND pr.est_profesion = TRUE
-            LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente
-            WHERE pac.id_paciente = %s
+            {separador.join(joins)}
+        """, "pac.id_paciente"
+
+    def mapear_paciente(self, campos, formato_fecha, fila):
+        """Convierte una fila de proyeccion_paciente_sql en diccionario"""
+        paciente = {}
+        for campo, valor in zip(campos, fila):
+            if campo in ('fecha_nacimiento', 'fecha_registro'):
+                valor = valor.strftime(formato_fecha) if valor else None
+            elif campo == 'edad':
+                valor = int(valor) if valor else None
+            paciente[campo] = valor
+        return paciente
+
+    def getPaciente(self, pac_id, campos=None):
         """
-        
+        Obtiene un paciente con la proyección pedida (ver resolver_proyeccion).
+        Solo une las tablas que necesitan los campos solicitados.
+        """
+        campos, formato_fecha = self.resolver_proyeccion(campos)
+        pacienteSQL, columna_id = self.proyeccion_paciente_sql(campos)
+        pacienteSQL += f"WHERE {columna_id} = %s"
+
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
-        
+
         try:
             cur.execute(pacienteSQL, (pac_id,))
             p = cur.fetchone()
-            
+
             if not p:
                 return None
-            
-            return {
-                'id_paciente': p[0],
-                'historia_clinica': p[1],
-                'es_menor': p[2],
-                'observaciones': p[3],
-                'nombre': p[4],
-                'apellido': p[5],
-                'cedula': p[6],
-                'fecha_nacimiento': p[7].strftime('%d/%m/%Y') if p[7] else None,
-                'edad': int(p[8]) if p[8] else None,
-                'telefono': p[9],
-                'correo': p[10],
-                'domicilio': p[11],
-                'genero': p[12],
-                'estado_civil': p[13],
-                'ciudad': p[14],
-                'ciudad_nacimiento': p[15],
-                'nivel_instruccion': p[16],
-                'profesion': p[17],
-                'fecha_registro': p[18].strftime('%d/%m/%Y') if p[18] else None,
-                'nom_madre': p[19],
-                'tel_madre': p[20],
-                'nom_padre': p[21],
-                'tel_padre': p[22],
-                'colegio': p[23],
-                'tel_colegio': p[24]
-            }
-            
+
+            return self.mapear_paciente(campos, formato_fecha, p)
+
         except Exception as e:
-            app.logger.error(f"Error al obtener paciente por ID: {str(e)}")
+            app.logger.error(f"Error al obtener paciente: {str(e)}", exc_info=True)
             return None
         finally:
             cur.close()
             con.close()
 
-    def getPacienteParaEditar(self, pac_id):
-        """Obtiene un paciente con IDs y descripciones para edición"""
-        pacienteSQL = """
-            SELECT
-                pac.id_paciente,
-                pac.id_persona,
-                pac.pac_historia_clinica,
-                CASE WHEN DATE_PART('year', AGE(p.per_fecha_nacimiento)) < 18 THEN TRUE ELSE FALSE END AS es_menor,
-                pac.pac_observaciones,
-                p.per_nombre,
-                p.per_apellido,
-                p.per_cedula,
-                p.per_fecha_nacimiento,
-                p.per_telefono,
-                p.per_correo,
-                p.per_domicilio,
-                p.id_genero,
-                p.id_estado_civil,
-                p.id_ciudad,
-                p.id_ciudad_nacimiento,
-                p.id_nivel_instruccion,
-                p.id_profesion,
-                g.des_genero,
-                ec.des_estado_civil,
-                c.des_ciudad,
-                cn.des_ciudad AS ciudad_nacimiento_desc,
-                ni.des_nivel_instruccion,
-                pr.des_profesion,
-                pm.pam_nom_madre,
-                pm.pam_tel_madre,
-                pm.pam_nom_padre,
-                pm.pam_tel_padre,
-                pm.pam_educacion,
-                pm.pam_colegio,
-                pm.pam_tel_colegio
-            FROM pacientes pac
-            JOIN personas p ON pac.id_persona = p.id_persona
-            LEFT JOIN generos g ON p.id_genero = g.id_genero
-            LEFT JOIN estados_civiles ec ON p.id_estado_civil = ec.id_estado_civil
-            LEFT JOIN ciudades c ON p.id_ciudad = c.id_ciudad
-            LEFT JOIN ciudades cn ON p.id_ciudad_nacimiento = cn.id_ciudad
-            LEFT JOIN niveles_instruccion ni ON p.id_nivel_instruccion = ni.id_nivel_instruccion
-            LEFT JOIN profesiones pr ON p.id_profesion = pr.id_profesion
-            LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente
-            WHERE pac.id_paciente = %s
+    def getPacienteById(self, pac_id):
+        """Obtiene un paciente específico por ID con todos sus datos"""
+        return self.getPaciente(pac_id, 'detalle')
+
+    def getVersionPaciente(self, pac_id, campo='version'):
         """
-        
+        Devuelve la versión actual de la ficha del paciente o None si no existe.
+        Combina el xmin de pacientes, personas y pacientes_menores: cambia con
+        cualquier UPDATE de esas filas y se lee con una búsqueda por clave.
+        """
+        versionSQL, columna_id = self.proyeccion_paciente_sql([campo])
+        versionSQL += f"WHERE {columna_id} = %s"
+
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
-        
+
         try:
-            cur.execute(pacienteSQL, (pac_id,))
-            p = cur.fetchone()
-            
-            if not p:
-                return None
-            
-            paciente = {
-                'id_paciente': p[0],
-                'id_persona': p[1],
-                'historia_clinica': p[2],
-                'es_menor': p[3],
-                'observaciones': p[4],
-                'nombre': p[5],
-                'apellido': p[6],
-                'cedula': p[7],
-                'fecha_nacimiento': p[8].strftime('%Y-%m-%d') if p[8] else None,
-                'telefono': p[9],
-                'correo': p[10],
-                'domicilio': p[11],
-                'id_genero': p[12],
-                'id_estado_civil': p[13],
-                'id_ciudad': p[14],
-                'id_ciudad_nacimiento': p[15],
-                'id_nivel_instruccion': p[16],
-                'id_profesion': p[17],
-                'genero': p[18],
-                'estado_civil': p[19],
-                'ciudad': p[20],
-                'ciudad_nacimiento': p[21],
-                'nivel_instruccion': p[22],
-                'profesion': p[23],
-                'nom_madre': p[24],
-                'tel_madre': p[25],
-                'nom_padre': p[26],
-                'tel_padre': p[27],
-                'educacion': p[28],
-                'colegio': p[29],
-                'tel_colegio': p[30]
-            }
-            
-            app.logger.info(f"Paciente cargado para editar: {paciente['nombre']} {paciente['apellido']} - Es menor: {paciente['es_menor']}")
-            
-            return paciente
-            
+            cur.execute(versionSQL, (pac_id,))
+            fila = cur.fetchone()
+            return fila[0] if fila else None
+
         except Exception as e:
-            app.logger.error(f"Error al obtener paciente para editar: {str(e)}", exc_info=True)
+            app.logger.error(f"Error al obtener versión del paciente: {str(e)}")
             return None
         finally:
             cur.close()
             con.close()
+
+    def getVersionDocumento(self, pac_id):
+        """
+        Versión de la ficha tal como se imprime: además de la fila cambia con
+        los catálogos que muestra (género, ciudad, ...) y con el día, porque
+        edad y es_menor se calculan con la fecha actual. None si no existe.
+        """
+        return self.getVersionPaciente(pac_id, 'version_documento')
+
+    def getPacientesByIds(self, ids, campos=None):
+        """
+        Obtiene varios pacientes (proyección `campos`, por defecto 'detalle')
+        en una sola consulta. Respeta el orden de `ids`; los inexistentes se omiten.
+        """
+        campos, formato_fecha = self.resolver_proyeccion(campos)
+        pacienteSQL, columna_id = self.proyeccion_paciente_sql(campos)
+        pacienteSQL += f"WHERE {columna_id} = ANY(%s)"
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(pacienteSQL, (list(ids),))
+            por_id = {p[0]: self.mapear_paciente(campos, formato_fecha, p) for p in cur.fetchall()}
+            return [por_id[i] for i in ids if i in por_id]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener pacientes por IDs: {str(e)}")
+            return []
+        finally:
+            cur.close()
+            con.close()
+
+    CLAVES_FILTRO = ('menores', 'id_ciudad', 'id_genero', 'inscripcion_desde',
+                     'inscripcion_hasta', 'busqueda')
+
+    def construir_filtro_pacientes(self, filtro):
+        """
+        Traduce un filtro de pacientes a (condiciones SQL, parámetros).
+        Claves admitidas: menores (bool), id_ciudad, id_genero,
+        inscripcion_desde, inscripcion_hasta (YYYY-MM-DD), busqueda (texto).
+        Las condiciones usan el alias v (pacientes_vista). Una clave
+        desconocida o un booleano mal escrito es ValueError.
+        """
+        condiciones = []
+        params = []
+        filtro = filtro or {}
+        validar_claves(filtro, self.CLAVES_FILTRO)
+
+        if presente(filtro.get('menores')):
+            if booleano(filtro['menores']):
+                condiciones.append("v.fecha_nacimiento > CURRENT_DATE - INTERVAL '18 years'")
+            else:
+                condiciones.append("v.fecha_nacimiento <= CURRENT_DATE - INTERVAL '18 years'")
+        if presente(filtro.get('id_ciudad')):
+            condiciones.append("v.id_ciudad = %s")
+            params.append(filtro['id_ciudad'])
+        if presente(filtro.get('id_genero')):
+            condiciones.append("v.id_genero = %s")
+            params.append(filtro['id_genero'])
+        if presente(filtro.get('inscripcion_desde')):
+            condiciones.append("v.fecha_registro >= %s")
+            params.append(filtro['inscripcion_desde'])
+        if presente(filtro.get('inscripcion_hasta')):
+            condiciones.append("v.fecha_registro <= %s")
+            params.append(filtro['inscripcion_hasta'])
+        if presente(filtro.get('busqueda')):
+            # Nombre, apellido, cédula e historia en una columna con índice trigram
+            condiciones.append("v.busqueda LIKE lower(%s)")
+            params.append(f"%{filtro['busqueda']}%")
+
+        return condiciones, params
+
+    def getIdsPacientes(self, filtro=None, requerir_criterio=False):
+        """
+        Obtiene los IDs de pacientes que cumplen el filtro (ver construir_filtro_pacientes).
+        Con requerir_criterio, un filtro sin ninguna condición es ValueError
+        en lugar de devolver todos los pacientes.
+        """
+        condiciones, params = self.construir_filtro_pacientes(filtro)
+        if requerir_criterio and not condiciones:
+            raise ValueError("El filtro no tiene ningún criterio")
+        pacienteSQL = """
+            SELECT v.id_paciente
+            FROM pacientes_vista v
+        """
+        if condiciones:
+            pacienteSQL += " WHERE " + " AND ".join(condiciones)
+        pacienteSQL += " ORDER BY v.apellido, v.nombre"
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(pacienteSQL, params)
+            return [r[0] for r in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener IDs de pacientes: {str(e)}")
+            return []
+        finally:
+            cur.close()
+            con.close()
+
+    def getPacienteParaEditar(self, pac_id):
+        """Obtiene un paciente con IDs y descripciones para edición"""
+        paciente = self.getPaciente(pac_id, 'editar')
+
+        if paciente:
+            app.logger.info(f"Paciente cargado para editar: {paciente['nombre']} {paciente['apellido']} - Es menor: {paciente['es_menor']}")
+
+        return paciente
+
     def guardarPaciente(self, nombre, apellido, cedula, fecha_nacimiento, 
                         telefono=None,  # ← Ahora con valor por defecto
                         id_genero=None, id_estado_civil=None, correo=None, domicilio=None, 
@@ -379,7 +608,7 @@ class PacienteDao:
         
         # ✅ CORRECCIÓN: Solo validar lo esencial
         if not all([nombre, apellido, cedula, fecha_nacimiento]):
-            app.logger.error("Faltan campos obligatorios: nombre, apellido, cedula, fecha_nacimiento")
+            logger.error("Faltan campos obligatorios: nombre, apellido, cedula, fecha_nacimiento")
             return None
         
         
@@ -388,27 +617,27 @@ class PacienteDao:
         # Validar fecha de nacimiento
         valido, mensaje = self.validar_fecha_nacimiento(fecha_nacimiento)
         if not valido:
-            app.logger.error(f"Validación de fecha de nacimiento falló: {mensaje}")
+            logger.error("Validación de fecha de nacimiento falló: %s", mensaje)
             return None
         
         # Generar historia clínica si no viene
         if not historia_clinica or historia_clinica.strip() == "":
             historia_clinica = self.generar_historia_clinica_unica(nombre, apellido, cedula)
-            app.logger.info(f"Historia clínica auto-generada: {historia_clinica}")
+            logger.info("Historia clínica auto-generada: %s", historia_clinica)
         else:
             # Si viene manual, validar que sea única
             if not self.validar_historia_unica(historia_clinica):
-                app.logger.error(f"Historia clínica duplicada: {historia_clinica}")
+                logger.error("Historia clínica duplicada: %s", historia_clinica)
                 return None
         
         # Calcular automáticamente si es menor
         es_menor = self.calcular_es_menor(fecha_nacimiento)
-        app.logger.info(f"Paciente calculado como menor: {es_menor}")
+        logger.info("Paciente calculado como menor: %s", es_menor)
         
         # Validar datos de menor si aplica
         valido, mensaje = self.validar_datos_menor(es_menor, nom_madre, nom_padre)
         if not valido:
-            app.logger.error(f"Validación de datos de menor falló: {mensaje}")
+            logger.error("Validación de datos de menor falló: %s", mensaje)
             return None
         
         insertPersonaSQL = """
@@ -437,49 +666,324 @@ class PacienteDao:
 
         try:
             # 1. Insertar persona
-            app.logger.info(f"Insertando persona: {nombre} {apellido}")
+            logger.info("Insertando persona: %s %s", nombre, apellido)
             cur.execute(insertPersonaSQL, (nombre, apellido, cedula, fecha_nacimiento, id_genero, 
                                         id_estado_civil, telefono, correo, domicilio, id_ciudad, 
                                         id_ciudad_nacimiento, id_nivel_instruccion, id_profesion))
             persona_id = cur.fetchone()[0]
-            app.logger.info(f"Persona insertada con ID: {persona_id}")
+            logger.info("Persona insertada con ID: %s", persona_id)
 
             # 2. Insertar paciente
-            app.logger.info(f"Insertando paciente con historia clínica: {historia_clinica}")
+            logger.info("Insertando paciente con historia clínica: %s", historia_clinica)
             cur.execute(insertPacienteSQL, (persona_id, historia_clinica, observaciones))
             paciente_id = cur.fetchone()[0]
-            app.logger.info(f"Paciente insertado con ID: {paciente_id}")
+            logger.info("Paciente insertado con ID: %s", paciente_id)
 
             # 3. Si es menor (calculado automáticamente), insertar datos del menor
             if es_menor and (nom_madre or nom_padre):
-                app.logger.info(f"Es menor de edad - Insertando datos de tutor(es)")
-                app.logger.info(f"Madre: {nom_madre}, Padre: {nom_padre}, Colegio: {colegio}")
+                logger.info("Es menor de edad - Insertando datos de tutor(es)")
+                logger.info("Madre: %s, Padre: %s, Colegio: %s", nom_madre, nom_padre, colegio)
                 
                 cur.execute(insertMenorSQL, (paciente_id, nom_madre, tel_madre, nom_padre, 
                                             tel_padre, educacion, colegio, tel_colegio))
-                app.logger.info("Datos de menor insertados correctamente")
+                logger.info("Datos de menor insertados correctamente")
 
             con.commit()
-            app.logger.info(f"Paciente guardado exitosamente con ID: {paciente_id}")
+            logger.info("Paciente guardado exitosamente con ID: %s", paciente_id)
             return paciente_id
 
         except Exception as e:
             con.rollback()
-            app.logger.error(f"Error al insertar paciente completo: {str(e)}", exc_info=True)
+            logger.error("Error al insertar paciente completo: %s", e, exc_info=True)
             return None
 
         finally:
             cur.close()
             con.close()
 
+    # Tipos aceptados en cada registro de guardarPacientesLote (None = ausente)
+    TEXTOS_LOTE = ('nombre', 'apellido', 'cedula', 'fecha_nacimiento', 'telefono', 'correo',
+                   'domicilio', 'historia_clinica', 'observaciones', 'nom_madre', 'tel_madre',
+                   'nom_padre', 'tel_padre', 'educacion', 'colegio', 'tel_colegio')
+    IDS_LOTE = ('id_genero', 'id_estado_civil', 'id_ciudad', 'id_ciudad_nacimiento',
+                'id_nivel_instruccion', 'id_profesion')
+
+    def validar_tipos_lote(self, datos):
+        """Mensaje de error si algún campo del registro no tiene el tipo esperado, si no None"""
+        textos = [c for c in self.TEXTOS_LOTE if datos.get(c) is not None and not isinstance(datos[c], str)]
+        if textos:
+            return f"Se esperaba texto en: {', '.join(textos)}"
+        ids = [c for c in self.IDS_LOTE if datos.get(c) is not None
+               and (isinstance(datos[c], bool) or not isinstance(datos[c], int))]
+        if ids:
+            return f"Se esperaba un número entero en: {', '.join(ids)}"
+        return None
+
+    def insertarBloquePacientes(self, cur, insertables):
+        """
+        Inserta personas, pacientes y pacientes_menores de `insertables`
+        [(indice, datos, es_menor, historia)] con INSERT multi-fila. Retorna
+        (ids de pacientes en el mismo orden, cantidad de menores).
+        """
+        insertPersonasSQL = """
+            INSERT INTO personas(per_nombre, per_apellido, per_cedula, per_fecha_nacimiento,
+                            id_genero, id_estado_civil, per_telefono, per_correo, per_domicilio,
+                            id_ciudad, id_ciudad_nacimiento, id_nivel_instruccion, id_profesion)
+            VALUES %s
+            RETURNING id_persona
+        """
+
+        insertPacientesSQL = """
+            INSERT INTO pacientes(id_persona, pac_historia_clinica, pac_observaciones)
+            VALUES %s
+            RETURNING id_paciente
+        """
+
+        insertMenoresSQL = """
+            INSERT INTO pacientes_menores(id_paciente, pam_nom_madre, pam_tel_madre, pam_nom_padre,
+                                        pam_tel_padre, pam_educacion, pam_colegio, pam_tel_colegio)
+            VALUES %s
+        """
+
+        # Personas (RETURNING conserva el orden de VALUES)
+        personas_ids = execute_values(cur, insertPersonasSQL, [(
+            d['nombre'], d['apellido'], d['cedula'], d['fecha_nacimiento'],
+            d.get('id_genero'), d.get('id_estado_civil'), d.get('telefono'),
+            d.get('correo'), d.get('domicilio'), d.get('id_ciudad'),
+            d.get('id_ciudad_nacimiento'), d.get('id_nivel_instruccion'),
+            d.get('id_profesion')
+        ) for _, d, _, _ in insertables], page_size=len(insertables), fetch=True)
+
+        # Pacientes
+        pacientes_ids = execute_values(cur, insertPacientesSQL, [
+            (persona[0], historia, d.get('observaciones'))
+            for (_, d, _, historia), persona in zip(insertables, personas_ids)
+        ], page_size=len(insertables), fetch=True)
+
+        # Datos de menores con tutor
+        menores = [
+            (paciente[0], d.get('nom_madre'), d.get('tel_madre'), d.get('nom_padre'),
+             d.get('tel_padre'), d.get('educacion'), d.get('colegio'), d.get('tel_colegio'))
+            for (_, d, es_menor, _), paciente in zip(insertables, pacientes_ids)
+            if es_menor and (d.get('nom_madre') or d.get('nom_padre'))
+        ]
+        if menores:
+            execute_values(cur, insertMenoresSQL, menores, page_size=len(menores))
+
+        return [paciente[0] for paciente in pacientes_ids], len(menores)
+
+    def guardarPacientesLote(self, pacientes, tamano_lote=None):
+        """
+        Registra un lote de pacientes (migraciones, cargas masivas).
+        Valida todo en memoria, genera las historias clínicas por bloque y
+        inserta personas, pacientes y pacientes_menores con INSERT multi-fila,
+        en una transacción por bloque de `tamano_lote` registros. Si la base
+        rechaza un bloque se reintenta registro por registro (SAVEPOINT): solo
+        fallan los registros con error.
+
+        Devuelve un resultado por registro, en el mismo orden recibido:
+            {'indice', 'success', 'id_paciente', 'historia_clinica', 'error'}
+        """
+        tamano_lote = tamano_lote or self.TAMANO_LOTE
+        resultados = [None] * len(pacientes)
+        validos = []
+
+        def error(indice, mensaje):
+            resultados[indice] = {
+                'indice': indice,
+                'success': False,
+                'id_paciente': None,
+                'historia_clinica': None,
+                'error': mensaje
+            }
+
+        # 1. Validación en memoria (sin consultas)
+        for indice, datos in enumerate(pacientes):
+            if not isinstance(datos, dict):
+                error(indice, "Registro inválido")
+                continue
+
+            faltantes = [c for c in ('nombre', 'apellido', 'cedula', 'fecha_nacimiento') if not datos.get(c)]
+            if faltantes:
+                error(indice, f"Faltan campos obligatorios: {', '.join(faltantes)}")
+                continue
+
+            mensaje = self.validar_tipos_lote(datos)
+            if mensaje:
+                error(indice, mensaje)
+                continue
+
+            valido, mensaje = self.validar_fecha_nacimiento(datos['fecha_nacimiento'])
+            if not valido:
+                error(indice, mensaje)
+                continue
+
+            es_menor = self.calcular_es_menor(datos['fecha_nacimiento'])
+            valido, mensaje = self.validar_datos_menor(es_menor, datos.get('nom_madre'), datos.get('nom_padre'))
+            if not valido:
+                error(indice, mensaje)
+                continue
+
+            validos.append((indice, datos, es_menor))
+
+        def exito(indice, id_paciente, historia):
+            resultados[indice] = {
+                'indice': indice,
+                'success': True,
+                'id_paciente': id_paciente,
+                'historia_clinica': historia,
+                'error': None
+            }
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            for inicio in range(0, len(validos), tamano_lote):
+                bloque = validos[inicio:inicio + tamano_lote]
+
+                try:
+                    # 2. Historias clínicas del bloque (una sola consulta)
+                    historias = self.generar_historias_clinicas_lote(cur, [d for _, d, _ in bloque])
+
+                    insertables = []
+                    for (indice, datos, es_menor), historia in zip(bloque, historias):
+                        if historia is None:
+                            error(indice, f"Historia clínica duplicada: {datos.get('historia_clinica')}")
+                        else:
+                            insertables.append((indice, datos, es_menor, historia))
+
+                    if not insertables:
+                        con.rollback()
+                        continue
+
+                    # 3. Personas, pacientes y menores del bloque
+                    try:
+                        pacientes_ids, menores = self.insertarBloquePacientes(cur, insertables)
+                    except Exception as e:
+                        # Un registro rechazado por la base: se aísla con un SAVEPOINT por registro
+                        con.rollback()
+                        app.logger.warning(f"Bloque de {len(insertables)} pacientes rechazado ({str(e)}), "
+                                           f"se inserta uno por uno")
+                        insertados = []
+                        for insertable in insertables:
+                            indice, _, _, historia = insertable
+                            cur.execute("SAVEPOINT insertar_paciente")
+                            try:
+                                (id_paciente,), _ = self.insertarBloquePacientes(cur, [insertable])
+                                cur.execute("RELEASE SAVEPOINT insertar_paciente")
+                                insertados.append((indice, id_paciente, historia))
+                            except Exception as e:
+                                cur.execute("ROLLBACK TO SAVEPOINT insertar_paciente")
+                                app.logger.warning(f"Paciente {indice} del lote rechazado: {str(e)}")
+                                error(indice, "Los datos del paciente fueron rechazados por la base")
+                        con.commit()
+
+                        for indice, id_paciente, historia in insertados:
+                            exito(indice, id_paciente, historia)
+                        continue
+
+                    con.commit()
+
+                    for (indice, _, _, historia), id_paciente in zip(insertables, pacientes_ids):
+                        exito(indice, id_paciente, historia)
+                    app.logger.info(f"Lote de pacientes: {len(insertables)} insertados ({menores} menores)")
+
+                except Exception as e:
+                    con.rollback()
+                    app.logger.error(f"Error al insertar bloque de pacientes: {str(e)}", exc_info=True)
+                    for indice, _, _ in bloque:
+                        if resultados[indice] is None:
+                            error(indice, "No se pudo insertar el bloque de pacientes")
+
+            return resultados
+
+        finally:
+            cur.close()
+            con.close()
+
+    # Un solo UPDATE con CTEs: bloquea la fila, compara la versión esperada y
+    # actualiza persona, paciente y datos de menor. Las CTE de modificación solo
+    # actúan si `permitido` tiene fila, así un conflicto no escribe nada.
+    UPDATE_PACIENTE_SQL = """
+        WITH actual AS (
+            SELECT pac.id_paciente, pac.id_persona, pm.id_paciente_menor,
+                   pac.xmin::text || '.' || p.xmin::text || '.' || COALESCE(pm.xmin::text, '0') AS version
+            FROM pacientes pac
+            JOIN personas p ON pac.id_persona = p.id_persona
+            LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente
+            WHERE pac.id_paciente = %(pac_id)s
+            FOR UPDATE OF pac
+        ),
+        permitido AS (
+            SELECT * FROM actual
+            WHERE %(version)s::text IS NULL OR version = %(version)s::text
+        ),
+        upd_persona AS (
+            UPDATE personas
+            SET per_nombre = %(nombre)s, per_apellido = %(apellido)s, per_cedula = %(cedula)s,
+                per_fecha_nacimiento = %(fecha_nacimiento)s, id_genero = %(id_genero)s,
+                id_estado_civil = %(id_estado_civil)s, per_telefono = %(telefono)s,
+                per_correo = %(correo)s, per_domicilio = %(domicilio)s, id_ciudad = %(id_ciudad)s,
+                id_ciudad_nacimiento = %(id_ciudad_nacimiento)s,
+                id_nivel_instruccion = %(id_nivel_instruccion)s, id_profesion = %(id_profesion)s
+            FROM permitido
+            WHERE personas.id_persona = permitido.id_persona
+            RETURNING personas.xmin
+        ),
+        upd_paciente AS (
+            UPDATE pacientes
+            SET pac_historia_clinica = %(historia_clinica)s, pac_observaciones = %(observaciones)s
+            FROM permitido
+            WHERE pacientes.id_paciente = permitido.id_paciente
+            RETURNING pacientes.xmin
+        ),
+        upd_menor AS (
+            UPDATE pacientes_menores
+            SET pam_nom_madre = %(nom_madre)s, pam_tel_madre = %(tel_madre)s,
+                pam_nom_padre = %(nom_padre)s, pam_tel_padre = %(tel_padre)s,
+                pam_educacion = %(educacion)s, pam_colegio = %(colegio)s,
+                pam_tel_colegio = %(tel_colegio)s
+            FROM permitido
+            WHERE %(con_menor)s AND pacientes_menores.id_paciente_menor = permitido.id_paciente_menor
+            RETURNING pacientes_menores.xmin
+        ),
+        ins_menor AS (
+            INSERT INTO pacientes_menores(id_paciente, pam_nom_madre, pam_tel_madre, pam_nom_padre,
+                                          pam_tel_padre, pam_educacion, pam_colegio, pam_tel_colegio)
+            SELECT id_paciente, %(nom_madre)s, %(tel_madre)s, %(nom_padre)s, %(tel_padre)s,
+                   %(educacion)s, %(colegio)s, %(tel_colegio)s
+            FROM permitido
+            WHERE %(con_menor)s AND id_paciente_menor IS NULL
+            RETURNING xmin
+        ),
+        del_menor AS (
+            DELETE FROM pacientes_menores
+            USING permitido
+            WHERE NOT %(es_menor)s AND pacientes_menores.id_paciente_menor = permitido.id_paciente_menor
+        )
+        SELECT (SELECT version FROM actual),
+               (SELECT xmin::text FROM upd_paciente) || '.' || (SELECT xmin::text FROM upd_persona) || '.' ||
+               COALESCE((SELECT xmin::text FROM upd_menor), (SELECT xmin::text FROM ins_menor), '0')
+    """
+
     def updatePaciente(self, pac_id, nombre, apellido, cedula, fecha_nacimiento, id_genero, 
                     id_estado_civil, telefono, correo, domicilio, id_ciudad, id_ciudad_nacimiento,
                     id_nivel_instruccion, id_profesion, historia_clinica, observaciones=None, 
                     nom_madre=None, tel_madre=None, nom_padre=None, tel_padre=None, 
-                    educacion=None, colegio=None, tel_colegio=None):
+                    educacion=None, colegio=None, tel_colegio=None, version=None):
         """
-        Actualiza un paciente completo (persona + paciente + datos_menor)
-        El campo es_menor se calcula automáticamente basado en la fecha de nacimiento
+        Actualiza un paciente completo (persona + paciente + datos_menor) en una
+        sola sentencia. El campo es_menor se calcula automáticamente basado en
+        la fecha de nacimiento.
+
+        `version` es la que devolvió la última lectura (getVersionPaciente o el
+        campo 'version'); si se indica y el paciente cambió desde entonces no se
+        escribe nada.
+
+        Retorna la nueva versión, None si el paciente no existe, "conflicto" si
+        la versión no coincide o False si falla la validación o la actualización.
         """
         
         # Validar fecha de nacimiento
@@ -497,81 +1001,43 @@ class PacienteDao:
         if not valido:
             app.logger.error(f"Validación de datos de menor falló: {mensaje}")
             return False
-        
-        updatePersonaSQL = """
-            UPDATE personas
-            SET per_nombre = %s, per_apellido = %s, per_cedula = %s, per_fecha_nacimiento = %s,
-                id_genero = %s, id_estado_civil = %s, per_telefono = %s, per_correo = %s,
-                per_domicilio = %s, id_ciudad = %s, id_ciudad_nacimiento = %s,
-                id_nivel_instruccion = %s, id_profesion = %s
-            WHERE id_persona = (SELECT id_persona FROM pacientes WHERE id_paciente = %s)
-        """
-        
-        updatePacienteSQL = """
-            UPDATE pacientes
-            SET pac_historia_clinica = %s, pac_observaciones = %s
-            WHERE id_paciente = %s
-        """
-        
-        updateMenorSQL = """
-            UPDATE pacientes_menores
-            SET pam_nom_madre = %s, pam_tel_madre = %s, pam_nom_padre = %s, pam_tel_padre = %s,
-                pam_educacion = %s, pam_colegio = %s, pam_tel_colegio = %s
-            WHERE id_paciente = %s
-        """
-        
-        insertMenorSQL = """
-            INSERT INTO pacientes_menores(id_paciente, pam_nom_madre, pam_tel_madre, pam_nom_padre,
-                                        pam_tel_padre, pam_educacion, pam_colegio, pam_tel_colegio)
-            VALUES(%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        deleteMenorSQL = """
-            DELETE FROM pacientes_menores WHERE id_paciente = %s
-        """
+
+        parametros = {
+            'pac_id': pac_id, 'version': version, 'nombre': nombre, 'apellido': apellido,
+            'cedula': cedula, 'fecha_nacimiento': fecha_nacimiento, 'id_genero': id_genero,
+            'id_estado_civil': id_estado_civil, 'telefono': telefono, 'correo': correo,
+            'domicilio': domicilio, 'id_ciudad': id_ciudad, 'id_ciudad_nacimiento': id_ciudad_nacimiento,
+            'id_nivel_instruccion': id_nivel_instruccion, 'id_profesion': id_profesion,
+            'historia_clinica': historia_clinica, 'observaciones': observaciones,
+            'nom_madre': nom_madre, 'tel_madre': tel_madre, 'nom_padre': nom_padre,
+            'tel_padre': tel_padre, 'educacion': educacion, 'colegio': colegio,
+            'tel_colegio': tel_colegio, 'es_menor': es_menor,
+            'con_menor': bool(es_menor and (nom_madre or nom_padre)),
+        }
 
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
 
         try:
-            # 1. Actualizar persona
-            app.logger.info(f"Actualizando persona del paciente ID: {pac_id}")
-            cur.execute(updatePersonaSQL, (nombre, apellido, cedula, fecha_nacimiento, id_genero,
-                                        id_estado_civil, telefono, correo, domicilio, id_ciudad,
-                                        id_ciudad_nacimiento, id_nivel_instruccion, 
-                                        id_profesion, pac_id))
-
-            # 2. Actualizar paciente
-            app.logger.info(f"Actualizando datos del paciente ID: {pac_id}")
-            cur.execute(updatePacienteSQL, (historia_clinica, observaciones, pac_id))
-
-            # 3. Manejar datos del menor
-            cur.execute("SELECT id_paciente_menor FROM pacientes_menores WHERE id_paciente = %s", (pac_id,))
-            existe_menor = cur.fetchone()
-
-            if es_menor:
-                # Si es menor (calculado) y tiene datos de tutor
-                if nom_madre or nom_padre:
-                    if existe_menor:
-                        # Actualizar datos existentes
-                        app.logger.info(f"Actualizando datos de menor existente para paciente ID: {pac_id}")
-                        cur.execute(updateMenorSQL, (nom_madre, tel_madre, nom_padre, tel_padre,
-                                                    educacion, colegio, tel_colegio, pac_id))
-                    else:
-                        # Crear nuevos datos de menor
-                        app.logger.info(f"Insertando nuevos datos de menor para paciente ID: {pac_id}")
-                        cur.execute(insertMenorSQL, (pac_id, nom_madre, tel_madre, nom_padre,
-                                                    tel_padre, educacion, colegio, tel_colegio))
-            else:
-                # Ya no es menor, eliminar datos si existían
-                if existe_menor:
-                    app.logger.info(f"Paciente ya no es menor - Eliminando datos de tutor para paciente ID: {pac_id}")
-                    cur.execute(deleteMenorSQL, (pac_id,))
+            cur.execute(self.UPDATE_PACIENTE_SQL, parametros)
+            version_anterior, version_nueva = cur.fetchone()
+
+            if version_anterior is None:
+                con.rollback()
+                app.logger.warning(f"No se encontró el paciente con ID: {pac_id}")
+                return None
+
+            if version_nueva is None:
+                con.rollback()
+                app.logger.warning(f"Conflicto de versión al actualizar paciente {pac_id}: "
+                                   f"esperada {version}, actual {version_anterior}")
+                return "conflicto"
 
             con.commit()
+            cache_documentos.invalidar(pac_id)
             app.logger.info(f"Paciente {pac_id} actualizado exitosamente")
-            return True
+            return version_nueva
 
         except Exception as e:
             app.logger.error(f"Error al actualizar paciente: {str(e)}", exc_info=True)
@@ -614,6 +1080,7 @@ class PacienteDao:
             app.logger.info(f"Persona eliminada")
 
             con.commit()
+            cache_documentos.invalidar(pac_id)
             app.logger.info(f"Paciente {pac_id} eliminado exitosamente")
             return True
 
@@ -625,25 +1092,115 @@ class PacienteDao:
             cur.close()
             con.close()
 
+    # Elimina un bloque de pacientes en una sentencia: datos de menor, pacientes
+    # y personas. Devuelve los IDs efectivamente eliminados.
+    DELETE_PACIENTES_SQL = """
+        WITH objetivo AS (
+            SELECT id_paciente, id_persona
+            FROM pacientes
+            WHERE id_paciente = ANY(%s)
+            FOR UPDATE
+        ),
+        del_menores AS (
+            DELETE FROM pacientes_menores pm
+            USING objetivo o
+            WHERE pm.id_paciente = o.id_paciente
+        ),
+        del_pacientes AS (
+            DELETE FROM pacientes pac
+            USING objetivo o
+            WHERE pac.id_paciente = o.id_paciente
+            RETURNING pac.id_paciente, pac.id_persona
+        ),
+        del_personas AS (
+            DELETE FROM personas p
+            USING del_pacientes d
+            WHERE p.id_persona = d.id_persona
+        )
+        SELECT id_paciente FROM del_pacientes
+    """
+
+    def deletePacientesLote(self, ids, tamano_lote=None):
+        """
+        Elimina varios pacientes por bloques de `tamano_lote` (una transacción
+        y una sentencia por bloque).
+
+        Si un bloque falla porque algún paciente está referenciado, ese bloque
+        se repite paciente por paciente para aislar los que no se pueden borrar.
+
+        Retorna una lista con {'id_paciente', 'resultado'} en el orden de `ids`;
+        resultado es 'eliminado', 'no_encontrado', 'en_uso' o 'error'.
+        """
+        tamano_lote = tamano_lote or self.TAMANO_LOTE_ELIMINACION
+        ids = list(dict.fromkeys(ids))
+        resultados = {}
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            for inicio in range(0, len(ids), tamano_lote):
+                bloque = ids[inicio:inicio + tamano_lote]
+
+                try:
+                    cur.execute(self.DELETE_PACIENTES_SQL, (bloque,))
+                    eliminados = {r[0] for r in cur.fetchall()}
+                    con.commit()
+
+                except errors.ForeignKeyViolation:
+                    con.rollback()
+                    app.logger.warning(f"Bloque de {len(bloque)} pacientes con referencias, "
+                                       f"se elimina uno por uno")
+                    eliminados = set()
+                    for pac_id in bloque:
+                        cur.execute("SAVEPOINT eliminar_paciente")
+                        try:
+                            cur.execute(self.DELETE_PACIENTES_SQL, ([pac_id],))
+                            if cur.fetchone():
+                                eliminados.add(pac_id)
+                            cur.execute("RELEASE SAVEPOINT eliminar_paciente")
+                        except errors.ForeignKeyViolation:
+                            cur.execute("ROLLBACK TO SAVEPOINT eliminar_paciente")
+                            resultados[pac_id] = 'en_uso'
+                    con.commit()
+
+                for pac_id in bloque:
+                    if pac_id in eliminados:
+                        resultados[pac_id] = 'eliminado'
+                        cache_documentos.invalidar(pac_id)
+                    else:
+                        resultados.setdefault(pac_id, 'no_encontrado')
+
+            app.logger.info(f"Eliminación por lotes: {len(ids)} pacientes procesados")
+
+        except Exception as e:
+            app.logger.error(f"Error al eliminar pacientes por lotes: {str(e)}", exc_info=True)
+            con.rollback()
+        finally:
+            cur.close()
+            con.close()
+
+        # Los bloques ya confirmados conservan su resultado; el resto queda en error
+        return [{'id_paciente': pac_id, 'resultado': resultados.get(pac_id, 'error')} for pac_id in ids]
+
     def getPacientesMenores(self):
         """Obtiene solo los pacientes menores de edad (calculado automáticamente)"""
         pacienteSQL = """
             SELECT
-                pac.id_paciente,
-                pac.pac_historia_clinica,
-                p.per_nombre,
-                p.per_apellido,
-                p.per_cedula,
-                p.per_fecha_nacimiento,
-                DATE_PART('year', AGE(p.per_fecha_nacimiento)) AS edad,
-                pm.pam_nom_madre,
-                pm.pam_nom_padre,
-                pm.pam_colegio
-            FROM pacientes pac
-            JOIN personas p ON pac.id_persona = p.id_persona
-            LEFT JOIN pacientes_menores pm ON pac.id_paciente = pm.id_paciente
-            WHERE DATE_PART('year', AGE(p.per_fecha_nacimiento)) < 18
-            ORDER BY p.per_nombre
+                v.id_paciente,
+                v.historia_clinica,
+                v.nombre,
+                v.apellido,
+                v.cedula,
+                v.fecha_nacimiento,
+                DATE_PART('year', AGE(v.fecha_nacimiento)) AS edad,
+                v.nom_madre,
+                v.nom_padre,
+                v.colegio
+            FROM pacientes_vista v
+            WHERE v.fecha_nacimiento > CURRENT_DATE - INTERVAL '18 years'
+            ORDER BY v.nombre
         """
         
         conexion = Conexion()
@@ -0,0 +1,184 @@
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+from flask import current_app as app
+from app.conexion.Conexion import Conexion
+from app.conexion.avisos import avisos
+
+logger = logging.getLogger(__name__)
+
+class DisponibilidadDao:
+    """
+    Índice de disponibilidad (ver codigos_sql/disponibilidad.sql): un mapa
+    de bits por especialista y día, un bit cada UNIDAD_MINUTOS. Las reservas
+    y plantillas encolan los días que cambian; cada aviso del canal
+    disponibilidad_cambios aplica la cola, fuera de la transacción de la
+    reserva.
+    """
+
+    CANAL = 'disponibilidad_cambios'
+
+    # app.config['ZONA_HORARIA'], leída en iniciar(): el hilo de avisos no
+    # tiene contexto de aplicación
+    _zona = None
+
+    UNIDAD_MINUTOS = 5
+    UNIDADES_DIA = 24 * 60 // UNIDAD_MINUTOS
+
+    # Solo días con algún bit libre; ordenado para que los turnos salgan
+    # cronológicos dentro de cada especialista
+    DISPONIBILIDAD_SQL = """
+        SELECT d.id_especialista, d.dis_fecha, d.dis_libres::text,
+               p.per_nombre, p.per_apellido, e.esp_color_agenda
+        FROM especialista_especialidades ee
+        JOIN especialistas e ON ee.id_especialista = e.id_especialista
+        JOIN funcionarios f ON e.id_funcionario = f.id_funcionario AND f.fun_estado = TRUE
+        JOIN personas p ON f.id_persona = p.id_persona
+        JOIN disponibilidad_especialistas d ON d.id_especialista = e.id_especialista
+        WHERE ee.id_especialidad = %s
+          AND d.dis_fecha BETWEEN %s AND %s
+          AND position(B'1' IN d.dis_libres) > 0
+        ORDER BY d.id_especialista, d.dis_fecha
+    """
+
+    def libres(self, filas, ahora, por_especialista):
+        """
+        Convierte las filas de DISPONIBILIDAD_SQL en turnos libres, sin recorrer
+        bit por bit en Python: los mapas se apilan en una matriz booleana.
+        Descarta los turnos que ya empezaron (los de días anteriores y los de
+        hoy hasta la hora actual). Retorna (inicios por especialista,
+        primer turno libre o None).
+        """
+        especialistas = np.array([f[0] for f in filas])
+        fechas = np.array([f[1].toordinal() for f in filas])
+        bits = np.frombuffer(''.join(f[2] for f in filas).encode('ascii'), dtype=np.uint8)
+        bits = bits.reshape(len(filas), self.UNIDADES_DIA) == ord('1')
+
+        unidad_actual = (ahora.hour * 60 + ahora.minute) // self.UNIDAD_MINUTOS
+        hoy = ahora.date().toordinal()
+        bits[fechas < hoy] = False
+        bits[fechas == hoy, :unidad_actual + 1] = False
+
+        # np.nonzero recorre por fila: queda ordenado por especialista y hora
+        fila, unidad = np.nonzero(bits)
+        if not len(fila):
+            return {}, None
+        especialista = especialistas[fila]
+        minutos = (fechas[fila] - fechas.min()) * 24 * 60 + unidad * self.UNIDAD_MINUTOS
+
+        # Posición de cada turno dentro de su especialista (vienen agrupados), para cortar
+        posicion = np.arange(len(fila))
+        cambio = np.r_[True, especialista[1:] != especialista[:-1]]
+        primero = np.maximum.accumulate(np.where(cambio, posicion, 0))
+        conservar = posicion - primero < por_especialista
+
+        base = datetime.fromordinal(int(fechas.min()))
+        def formato(m):
+            return (base + timedelta(minutes=int(m))).strftime('%Y-%m-%dT%H:%M')
+
+        resultado = {}
+        for id_especialista, m in zip(especialista[conservar].tolist(), minutos[conservar]):
+            resultado.setdefault(id_especialista, []).append(formato(m))
+
+        i = int(np.argmin(minutos))
+        return resultado, {'id_especialista': int(especialista[i]), 'inicio': formato(minutos[i])}
+
+    def getDisponibilidad(self, id_especialidad, desde, hasta, por_especialista=10):
+        """
+        Turnos libres de los especialistas activos con la especialidad entre
+        dos fechas locales. Los días anteriores a hoy no se consultan.
+        Retorna {'primero', 'especialistas'} o None si falla.
+        """
+        ahora = datetime.now(ZoneInfo(app.config['ZONA_HORARIA'])).replace(tzinfo=None)
+        desde = max(desde, ahora.date())
+        if hasta < desde:
+            return {'primero': None, 'especialistas': []}
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(self.DISPONIBILIDAD_SQL, (id_especialidad, desde, hasta))
+            filas = cur.fetchall()
+
+            especialistas = {}
+            for f in filas:
+                especialistas.setdefault(f[0], {
+                    'id_especialista': f[0],
+                    'nombre': f[3],
+                    'apellido': f[4],
+                    'color_agenda': f[5],
+                })
+
+            if not filas:
+                return {'primero': None, 'especialistas': []}
+
+            inicios, primero = self.libres(filas, ahora, por_especialista)
+
+            return {
+                'primero': primero,
+                # El que tiene el turno más próximo primero
+                'especialistas': [dict(especialistas[i], libres=inicios[i])
+                                  for i in sorted(inicios, key=lambda i: inicios[i][0])],
+            }
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener disponibilidad: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    @classmethod
+    def iniciar(cls, app):
+        """Se suscribe a los avisos de cambios (antes de avisos.iniciar())"""
+        cls._zona = app.config['ZONA_HORARIA']
+        avisos.suscribir(cls.CANAL, cls.aplicarPendientes)
+
+    @classmethod
+    def aplicarPendientes(cls, payloads=None):
+        """
+        Recalcula los días encolados. Todos los workers reciben el aviso: la
+        base los pone en fila y los siguientes encuentran la cola vacía. Al
+        reconectar (payloads None) aplica lo que haya quedado. Los errores se
+        propagan y los registra avisos; la cola queda para el próximo aviso.
+        """
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("SELECT fn_aplicar_disponibilidad(%s)", (cls._zona,))
+            cantidad = cur.fetchone()[0]
+            con.commit()
+            if cantidad:
+                logger.debug("Disponibilidad: %s cambios aplicados", cantidad)
+            return cantidad
+
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+            con.close()
+
+    def avanzarDisponibilidad(self):
+        """Extiende el horizonte y borra los días pasados. Retorna los especialistas recalculados."""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("SELECT fn_avanzar_disponibilidad(%s)", (app.config['ZONA_HORARIA'],))
+            cantidad = cur.fetchone()[0]
+            con.commit()
+            return cantidad
+
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+            con.close()
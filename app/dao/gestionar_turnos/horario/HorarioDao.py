@@ -0,0 +1,75 @@
+from flask import current_app as app
+from psycopg2.extras import execute_values
+from app.conexion.Conexion import Conexion
+
+class HorarioDao:
+    """Plantilla semanal de atención de los especialistas (horarios_especialistas)"""
+
+    def getHorarios(self, id_especialista):
+        """Franjas del especialista ordenadas por día y hora. None si falla."""
+        horarioSQL = """
+            SELECT id_horario, hor_dia_semana, hor_inicio, hor_fin, hor_duracion_minutos
+            FROM horarios_especialistas
+            WHERE id_especialista = %s
+            ORDER BY hor_dia_semana, hor_inicio
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(horarioSQL, (id_especialista,))
+            return [{
+                'id_horario': h[0],
+                'dia_semana': h[1],
+                'inicio': h[2].strftime('%H:%M'),
+                'fin': h[3].strftime('%H:%M'),
+                'duracion_minutos': h[4],
+            } for h in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener horarios del especialista {id_especialista}: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def reemplazarHorarios(self, id_especialista, horarios):
+        """
+        Reemplaza la plantilla del especialista por `horarios`, lista de
+        (dia_semana, inicio, fin, duracion_minutos). Los turnos ya reservados
+        no cambian. Retorna True, None si el especialista no existe o False.
+        """
+        especialistaSQL = "SELECT 1 FROM especialistas WHERE id_especialista = %s FOR UPDATE"
+        eliminarSQL = "DELETE FROM horarios_especialistas WHERE id_especialista = %s"
+        insertarSQL = """
+            INSERT INTO horarios_especialistas(id_especialista, hor_dia_semana, hor_inicio,
+                                               hor_fin, hor_duracion_minutos)
+            VALUES %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(especialistaSQL, (id_especialista,))
+            if cur.fetchone() is None:
+                con.rollback()
+                return None
+
+            cur.execute(eliminarSQL, (id_especialista,))
+            if horarios:
+                execute_values(cur, insertarSQL, [(id_especialista,) + tuple(h) for h in horarios])
+            con.commit()
+            app.logger.info(f"Horarios del especialista {id_especialista} actualizados ({len(horarios)} franjas)")
+            return True
+
+        except Exception as e:
+            app.logger.error(f"Error al actualizar horarios del especialista {id_especialista}: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
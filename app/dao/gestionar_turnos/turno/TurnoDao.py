@@ -0,0 +1,292 @@
+from flask import current_app as app
+from psycopg2 import errors
+from app.conexion.Conexion import Conexion
+
+class TurnoDao:
+    """
+    Turnos de especialistas (ver codigos_sql/turnos.sql). Las fechas y horas
+    que entran y salen son locales (app.config['ZONA_HORARIA']), sin zona:
+    'YYYY-MM-DDTHH:MM'.
+    """
+
+    ESTADOS = ('reservado', 'cancelado', 'reprogramado')
+
+    # Espera máxima por una reserva en curso sobre el mismo período. Con
+    # muchas reservas simultáneas del mismo turno, las que llegan después
+    # esperan solo a que la primera confirme y fallan por la restricción de
+    # exclusión; nunca se bloquea una fila compartida (agenda, especialista,
+    # índice de disponibilidad: el trigger solo encola el día, ver
+    # codigos_sql/disponibilidad.sql).
+    ESPERA_MAXIMA = '3s'
+
+    # Turnos que genera la plantilla entre dos fechas, menos los reservados
+    DISPONIBLES_SQL = """
+        WITH dias AS (
+            SELECT d::date AS dia
+            FROM generate_series(%(desde)s::date, %(hasta)s::date, INTERVAL '1 day') AS d
+        ),
+        posibles AS (
+            SELECT h.id_especialista, inicio,
+                   inicio + make_interval(mins => h.hor_duracion_minutos) AS fin
+            FROM horarios_especialistas h
+            JOIN dias ON h.hor_dia_semana = extract(isodow FROM dias.dia)
+            CROSS JOIN LATERAL generate_series(
+                dias.dia + h.hor_inicio,
+                dias.dia + h.hor_fin - make_interval(mins => h.hor_duracion_minutos),
+                make_interval(mins => h.hor_duracion_minutos)) AS inicio
+            WHERE h.id_especialista = %(id_especialista)s
+        )
+        SELECT to_char(p.inicio, 'YYYY-MM-DD"T"HH24:MI'), to_char(p.fin, 'YYYY-MM-DD"T"HH24:MI')
+        FROM posibles p
+        WHERE p.inicio AT TIME ZONE %(zona)s > now()
+          AND NOT EXISTS (
+            SELECT 1 FROM turnos t
+            WHERE t.id_especialista = p.id_especialista
+              AND t.tur_estado = 'reservado'
+              AND t.tur_periodo && tstzrange(p.inicio AT TIME ZONE %(zona)s, p.fin AT TIME ZONE %(zona)s)
+          )
+        ORDER BY p.inicio
+    """
+
+    # Inserta el turno solo si cae exactamente en un turno de la plantilla
+    # (día, franja y múltiplo de la duración) y es futuro. Sin filas: fuera
+    # de horario. La superposición la rechaza la restricción de exclusión.
+    RESERVAR_SQL = """
+        INSERT INTO turnos(id_especialista, id_paciente, tur_periodo, tur_observacion,
+                           tur_reprogramado_de, creacion_usuario)
+        SELECT h.id_especialista, %(id_paciente)s,
+               tstzrange(%(inicio)s::timestamp AT TIME ZONE %(zona)s,
+                         (%(inicio)s::timestamp + make_interval(mins => h.hor_duracion_minutos)) AT TIME ZONE %(zona)s),
+               %(observacion)s, %(reprogramado_de)s, %(usuario)s
+        FROM horarios_especialistas h
+        WHERE h.id_especialista = %(id_especialista)s
+          AND h.hor_dia_semana = extract(isodow FROM %(inicio)s::timestamp)
+          AND %(inicio)s::time >= h.hor_inicio
+          AND %(inicio)s::timestamp + make_interval(mins => h.hor_duracion_minutos) <= %(inicio)s::date + h.hor_fin
+          AND extract(epoch FROM %(inicio)s::time - h.hor_inicio)::int %% (h.hor_duracion_minutos * 60) = 0
+          AND %(inicio)s::timestamp AT TIME ZONE %(zona)s > now()
+        LIMIT 1
+        RETURNING id_turno
+    """
+
+    TURNO_SQL = """
+        SELECT t.id_turno, t.id_especialista, t.id_paciente,
+               to_char(lower(t.tur_periodo) AT TIME ZONE %(zona)s, 'YYYY-MM-DD"T"HH24:MI'),
+               to_char(upper(t.tur_periodo) AT TIME ZONE %(zona)s, 'YYYY-MM-DD"T"HH24:MI'),
+               t.tur_estado, t.tur_observacion, t.tur_reprogramado_de,
+               p.per_nombre, p.per_apellido, e.esp_color_agenda
+        FROM turnos t
+        JOIN pacientes pac ON t.id_paciente = pac.id_paciente
+        JOIN personas p ON pac.id_persona = p.id_persona
+        JOIN especialistas e ON t.id_especialista = e.id_especialista
+    """
+
+    def zona(self):
+        return app.config['ZONA_HORARIA']
+
+    @staticmethod
+    def turno_dict(t):
+        return {
+            'id_turno': t[0],
+            'id_especialista': t[1],
+            'id_paciente': t[2],
+            'inicio': t[3],
+            'fin': t[4],
+            'estado': t[5],
+            'observacion': t[6],
+            'reprogramado_de': t[7],
+            'paciente': f"{t[8]} {t[9]}",
+            'color_agenda': t[10],
+        }
+
+    def getTurnosDisponibles(self, id_especialista, desde, hasta):
+        """Lista de {'inicio', 'fin'} libres entre las fechas (inclusive). None si falla."""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(self.DISPONIBLES_SQL, {
+                'id_especialista': id_especialista, 'desde': desde, 'hasta': hasta, 'zona': self.zona()})
+            return [{'inicio': t[0], 'fin': t[1]} for t in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener turnos disponibles: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def getTurnos(self, id_especialista=None, id_paciente=None, desde=None, hasta=None, estado='reservado'):
+        """Turnos de un especialista y/o paciente entre dos fechas locales (inclusive)"""
+        condiciones = ["t.tur_estado = %(estado)s"]
+        if id_especialista:
+            condiciones.append("t.id_especialista = %(id_especialista)s")
+        if id_paciente:
+            condiciones.append("t.id_paciente = %(id_paciente)s")
+        if desde:
+            condiciones.append("upper(t.tur_periodo) > %(desde)s::date::timestamp AT TIME ZONE %(zona)s")
+        if hasta:
+            condiciones.append("lower(t.tur_periodo) < (%(hasta)s::date + 1)::timestamp AT TIME ZONE %(zona)s")
+        turnoSQL = self.TURNO_SQL + " WHERE " + " AND ".join(condiciones) + " ORDER BY lower(t.tur_periodo)"
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(turnoSQL, {
+                'estado': estado, 'id_especialista': id_especialista, 'id_paciente': id_paciente,
+                'desde': desde, 'hasta': hasta, 'zona': self.zona()})
+            return [self.turno_dict(t) for t in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener turnos: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def insertarTurno(self, cur, id_especialista, id_paciente, inicio, observacion=None,
+                      reprogramado_de=None, usuario=None):
+        """
+        Inserta con el cursor recibido (sin confirmar). Retorna el turno o un
+        motivo de rechazo: "fuera_de_horario", "ocupado", "paciente_ocupado",
+        "en_proceso" o "paciente_invalido". La transacción queda abortada si
+        no se pudo insertar: el que llama debe hacer rollback.
+        """
+        cur.execute(f"SET LOCAL lock_timeout = '{self.ESPERA_MAXIMA}'")
+        try:
+            cur.execute(self.RESERVAR_SQL, {
+                'id_especialista': id_especialista, 'id_paciente': id_paciente, 'inicio': inicio,
+                'observacion': observacion, 'reprogramado_de': reprogramado_de, 'usuario': usuario,
+                'zona': self.zona()})
+        except errors.ExclusionViolation as e:
+            if e.diag.constraint_name == 'turnos_paciente_sin_superposicion':
+                return "paciente_ocupado"
+            return "ocupado"
+        except errors.LockNotAvailable:
+            return "en_proceso"
+        except errors.ForeignKeyViolation:
+            return "paciente_invalido"
+
+        fila = cur.fetchone()
+        if fila is None:
+            return "fuera_de_horario"
+
+        cur.execute(self.TURNO_SQL + " WHERE t.id_turno = %(id_turno)s",
+                    {'id_turno': fila[0], 'zona': self.zona()})
+        return self.turno_dict(cur.fetchone())
+
+    def reservarTurno(self, id_especialista, id_paciente, inicio, observacion=None, usuario=None):
+        """Reserva un turno. Retorna el turno, un motivo de rechazo (ver insertarTurno) o False."""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            resultado = self.insertarTurno(cur, id_especialista, id_paciente, inicio, observacion,
+                                           usuario=usuario)
+            if isinstance(resultado, str):
+                con.rollback()
+                return resultado
+
+            con.commit()
+            app.logger.info(f"Turno {resultado['id_turno']} reservado: especialista {id_especialista}, {inicio}")
+            return resultado
+
+        except Exception as e:
+            app.logger.error(f"Error al reservar turno: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
+
+    # Pasa un turno reservado a otro estado. Devuelve el estado que tenía
+    # (sin filas si no existe) y el turno si se actualizó.
+    CAMBIAR_ESTADO_SQL = """
+        WITH actual AS (
+            SELECT id_turno, tur_estado FROM turnos
+            WHERE id_turno = %(id_turno)s
+            FOR UPDATE
+        ),
+        upd AS (
+            UPDATE turnos
+            SET tur_estado = %(estado)s, tur_cancelacion_fecha = now()
+            FROM actual
+            WHERE turnos.id_turno = actual.id_turno AND actual.tur_estado = 'reservado'
+            RETURNING turnos.id_especialista, turnos.id_paciente, turnos.tur_observacion
+        )
+        SELECT actual.tur_estado, upd.id_especialista, upd.id_paciente, upd.tur_observacion
+        FROM actual
+        LEFT JOIN upd ON TRUE
+    """
+
+    def cancelarTurno(self, id_turno):
+        """Retorna True, None si no existe, "no_reservado" si ya no está reservado o False"""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(self.CAMBIAR_ESTADO_SQL, {'id_turno': id_turno, 'estado': 'cancelado'})
+            fila = cur.fetchone()
+            if fila is None:
+                con.rollback()
+                return None
+            if fila[1] is None:
+                con.rollback()
+                return "no_reservado"
+
+            con.commit()
+            app.logger.info(f"Turno {id_turno} cancelado")
+            return True
+
+        except Exception as e:
+            app.logger.error(f"Error al cancelar turno: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
+
+    def reprogramarTurno(self, id_turno, inicio, usuario=None):
+        """
+        Mueve un turno reservado a `inicio` en una transacción: el original
+        queda como reprogramado y el nuevo apunta a él. Si el nuevo horario
+        no se puede reservar, el original sigue reservado. Retorna el turno
+        nuevo, None, "no_reservado", un motivo de insertarTurno o False.
+        """
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(self.CAMBIAR_ESTADO_SQL, {'id_turno': id_turno, 'estado': 'reprogramado'})
+            fila = cur.fetchone()
+            if fila is None:
+                con.rollback()
+                return None
+            if fila[1] is None:
+                con.rollback()
+                return "no_reservado"
+
+            _, id_especialista, id_paciente, observacion = fila
+            resultado = self.insertarTurno(cur, id_especialista, id_paciente, inicio, observacion,
+                                           reprogramado_de=id_turno, usuario=usuario)
+            if isinstance(resultado, str):
+                con.rollback()
+                return resultado
+
+            con.commit()
+            app.logger.info(f"Turno {id_turno} reprogramado como {resultado['id_turno']} ({inicio})")
+            return resultado
+
+        except Exception as e:
+            app.logger.error(f"Error al reprogramar turno: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
@@ -2,12 +2,13 @@
 import re
 from flask import current_app as app
 from app.conexion.Conexion import Conexion
+from app.dao.referenciales.cargo.cache_cargos import cache_cargos
 
 class CargoDao:
 
     def getCargos(self):
         sql = """
-        SELECT id_cargo, des_cargo, est_cargo
+        SELECT id_cargo, des_cargo, est_cargo, car_requiere_especialista, car_requiere_matricula
         FROM cargos
         """
         conexion = Conexion()
@@ -16,7 +17,8 @@ class CargoDao:
         try:
             cur.execute(sql)
             cargos = cur.fetchall()
-            return [{'id': c[0], 'descripcion': c[1], 'estado': c[2]} for c in cargos]
+            return [{'id': c[0], 'descripcion': c[1], 'estado': c[2],
+                     'requiere_especialista': c[3], 'requiere_matricula': c[4]} for c in cargos]
         except Exception as e:
             app.logger.error(f"Error al obtener todos los cargos: {str(e)}")
             return []
@@ -26,7 +28,7 @@ class CargoDao:
 
     def getCargoById(self, id_cargo):
         sql = """
-        SELECT id_cargo, des_cargo, est_cargo
+        SELECT id_cargo, des_cargo, est_cargo, car_requiere_especialista, car_requiere_matricula
         FROM cargos
         WHERE id_cargo=%s
         """
@@ -37,7 +39,8 @@ class CargoDao:
             cur.execute(sql, (id_cargo,))
             cargo = cur.fetchone()
             if cargo:
-                return {"id": cargo[0], "descripcion": cargo[1], "estado": cargo[2]}
+                return {"id": cargo[0], "descripcion": cargo[1], "estado": cargo[2],
+                        "requiere_especialista": cargo[3], "requiere_matricula": cargo[4]}
             return None
         except Exception as e:
             app.logger.error(f"Error al obtener cargo: {str(e)}")
@@ -72,7 +75,7 @@ class CargoDao:
     # CRUD
     # ============================
 
-    def guardarCargo(self, descripcion, estado=True):
+    def guardarCargo(self, descripcion, estado=True, requiere_especialista=False, requiere_matricula=False):
         # Validaciones
         if not self.validarDescripcion(descripcion):
             app.logger.warning("Descripción inválida: solo letras, números y acentos")
@@ -82,17 +85,18 @@ class CargoDao:
             return False
 
         sql = """
-        INSERT INTO cargos(des_cargo, est_cargo)
-        VALUES(%s, %s)
+        INSERT INTO cargos(des_cargo, est_cargo, car_requiere_especialista, car_requiere_matricula)
+        VALUES(%s, %s, %s, %s)
         RETURNING id_cargo
         """
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
         try:
-            cur.execute(sql, (descripcion, estado))
+            cur.execute(sql, (descripcion, estado, requiere_especialista, requiere_matricula))
             id_cargo = cur.fetchone()[0]
             con.commit()
+            cache_cargos.recargar()
             return id_cargo
         except Exception as e:
             app.logger.error(f"Error al insertar cargo: {str(e)}")
@@ -102,7 +106,8 @@ class CargoDao:
             cur.close()
             con.close()
 
-    def updateCargo(self, id_cargo, descripcion, estado=True):
+    def updateCargo(self, id_cargo, descripcion, estado=True, requiere_especialista=None, requiere_matricula=None):
+        """Los atributos en None conservan su valor actual"""
         # Validaciones
         if not self.validarDescripcion(descripcion):
             app.logger.warning("Descripción inválida")
@@ -110,16 +115,19 @@ class CargoDao:
 
         sql = """
         UPDATE cargos
-        SET des_cargo=%s, est_cargo=%s
+        SET des_cargo=%s, est_cargo=%s,
+            car_requiere_especialista=COALESCE(%s, car_requiere_especialista),
+            car_requiere_matricula=COALESCE(%s, car_requiere_matricula)
         WHERE id_cargo=%s
         """
         conexion = Conexion()
         con = conexion.getConexion()
         cur = con.cursor()
         try:
-            cur.execute(sql, (descripcion, estado, id_cargo))
+            cur.execute(sql, (descripcion, estado, requiere_especialista, requiere_matricula, id_cargo))
             filas = cur.rowcount
             con.commit()
+            cache_cargos.recargar()
             return filas > 0
         except Exception as e:
             app.logger.error(f"Error al actualizar cargo: {str(e)}")
@@ -138,6 +146,7 @@ class CargoDao:
             cur.execute(sql, (id_cargo,))
             filas = cur.rowcount
             con.commit()
+            cache_cargos.recargar()
             return filas > 0
         except Exception as e:
             app.logger.error(f"Error al eliminar cargo: {str(e)}")
@@ -0,0 +1,87 @@
+"""
+Atributos de cargos en memoria (ver codigos_sql/cargos_atributos.sql).
+
+La tabla entera se lee en un diccionario inmutable que se reemplaza
+completo en cada recarga: las validaciones lo consultan sin ir a la base
+ni tomar locks. Se recarga después de cada escritura de CargoDao en este
+proceso y, para los demás workers, con cada aviso del canal cargos_cambios
+(ver app/conexion/avisos.py). Al reconectar la escucha vuelve a leer la
+tabla por si se perdió algún aviso.
+"""
+import logging
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from app.conexion.Conexion import Conexion
+from app.conexion.avisos import avisos
+
+logger = logging.getLogger(__name__)
+
+Cargo = namedtuple('Cargo', ['id_cargo', 'descripcion', 'estado',
+                             'requiere_especialista', 'requiere_matricula'])
+
+CANAL = 'cargos_cambios'
+
+CARGOS_SQL = """
+    SELECT id_cargo, des_cargo, est_cargo, car_requiere_especialista, car_requiere_matricula
+    FROM cargos
+"""
+
+
+class CacheCargos:
+
+    def __init__(self):
+        # MappingProxyType id_cargo -> Cargo; None hasta la primera lectura
+        self.cargos = None
+        self.lock = threading.Lock()
+
+    def recargar(self):
+        """Lee la tabla y reemplaza el diccionario. Si falla se conserva el anterior."""
+        try:
+            conexion = Conexion()
+        except Exception as e:
+            logger.error("Error al leer los atributos de cargos: %s", e)
+            return self.cargos
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(CARGOS_SQL)
+            cargos = MappingProxyType({c[0]: Cargo(*c) for c in cur.fetchall()})
+        except Exception as e:
+            logger.error("Error al leer los atributos de cargos: %s", e)
+            return self.cargos
+        finally:
+            cur.close()
+            con.close()
+
+        self.cargos = cargos
+        logger.info("Atributos de %s cargos cargados", len(cargos))
+        return cargos
+
+    def obtener(self):
+        """Diccionario vigente; lo lee si todavía no se cargó"""
+        cargos = self.cargos
+        if cargos is None:
+            with self.lock:
+                cargos = self.cargos if self.cargos is not None else self.recargar()
+        return cargos or {}
+
+    def get(self, id_cargo):
+        return self.obtener().get(id_cargo)
+
+    def requiere_especialista(self, id_cargo):
+        cargo = self.get(id_cargo)
+        return bool(cargo and cargo.requiere_especialista)
+
+    def requiere_matricula(self, id_cargo):
+        cargo = self.get(id_cargo)
+        return bool(cargo and cargo.requiere_matricula)
+
+    def iniciar(self):
+        """Se suscribe a los avisos de cambios; la primera lectura la hace el hilo de avisos"""
+        # Varios avisos juntos se resuelven con una sola lectura
+        avisos.suscribir(CANAL, lambda payloads: self.recargar())
+
+
+cache_cargos = CacheCargos()
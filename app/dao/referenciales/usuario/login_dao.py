@@ -16,7 +16,8 @@ class LoginDao:
             u.id_grupo,
             u.usu_estado,
             CONCAT(p.per_nombre, ' ', p.per_apellido) AS nombre_persona,
-            g.des_grupo AS grupo
+            g.des_grupo AS grupo,
+            COALESCE(u.usu_bloqueado_hasta > now(), FALSE) AS bloqueado
         FROM usuarios u
         LEFT JOIN funcionarios f ON f.id_funcionario = u.id_funcionario
         LEFT JOIN personas p ON p.id_persona = f.id_persona
@@ -40,7 +41,8 @@ class LoginDao:
                     "id_grupo": usuario_encontrado[5],
                     "usu_estado": usuario_encontrado[6],
                     "nombre_persona": usuario_encontrado[7],
-                    "grupo": usuario_encontrado[8]
+                    "grupo": usuario_encontrado[8],
+                    "bloqueado": usuario_encontrado[9]
                 }
             else:
                 return None
@@ -50,3 +52,124 @@ class LoginDao:
         finally:
             cur.close()
             con.close()
+
+    def actualizarClave(self, id_usuario, clave_anterior, clave_nueva):
+        """
+        Reemplaza el hash de la contraseña (rehash al ingresar) solo si no
+        cambió desde que se leyó. Retorna True si se actualizó.
+        """
+        actualizar_clave_sql = """
+        UPDATE usuarios
+        SET usu_clave = %s
+        WHERE id_usuario = %s AND usu_clave = %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+        try:
+            cur.execute(actualizar_clave_sql, (clave_nueva, id_usuario, clave_anterior))
+            con.commit()
+            return cur.rowcount > 0
+        except Exception as e:
+            con.rollback()
+            app.logger.error(f"Error al actualizar la clave del usuario {id_usuario}: {str(e)}")
+            return False
+        finally:
+            cur.close()
+            con.close()
+
+    def tomarFichas(self, fichas):
+        """
+        Toma una ficha de cada cubeta [(clave, capacidad, segundos por ficha)]
+        (ver codigos_sql/limite_ingresos.sql). Retorna True si todas tenían,
+        False si alguna estaba vacía o None si falla la consulta.
+        """
+        tomar_fichas_sql = "SELECT " + ", ".join(["fn_tomar_ficha(%s, %s, %s)"] * len(fichas))
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+        try:
+            cur.execute(tomar_fichas_sql, [valor for ficha in fichas for valor in ficha])
+            resultado = all(cur.fetchone())
+            con.commit()
+            return resultado
+        except Exception as e:
+            con.rollback()
+            app.logger.error(f"Error al tomar fichas de ingreso: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def limpiarFichas(self):
+        """Borra las cubetas sin uso en el último día (ya estarían llenas)"""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+        try:
+            cur.execute("DELETE FROM ingresos_fichas WHERE fic_actualizado < now() - INTERVAL '1 day'")
+            con.commit()
+            return cur.rowcount
+        except Exception as e:
+            con.rollback()
+            app.logger.error(f"Error al limpiar fichas de ingreso: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def registrarFallo(self, id_usuario, max_intentos, minutos_bloqueo):
+        """
+        Suma un intento fallido y bloquea al usuario `minutos_bloqueo` si llegó
+        a `max_intentos`. Retorna (intentos, bloqueado) o None si falla.
+        """
+        registrar_fallo_sql = """
+        UPDATE usuarios
+        SET usu_nro_intentos = COALESCE(usu_nro_intentos, 0) + 1,
+            usu_bloqueado_hasta = CASE
+                WHEN COALESCE(usu_nro_intentos, 0) + 1 >= %s THEN now() + make_interval(mins => %s)
+                ELSE usu_bloqueado_hasta END
+        WHERE id_usuario = %s
+        RETURNING usu_nro_intentos, COALESCE(usu_bloqueado_hasta > now(), FALSE)
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+        try:
+            cur.execute(registrar_fallo_sql, (max_intentos, minutos_bloqueo, id_usuario))
+            resultado = cur.fetchone()
+            con.commit()
+            return resultado
+        except Exception as e:
+            con.rollback()
+            app.logger.error(f"Error al registrar intento fallido del usuario {id_usuario}: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def registrarIngreso(self, id_usuario):
+        """Ingreso correcto: vuelve a cero los intentos y quita el bloqueo"""
+        registrar_ingreso_sql = """
+        UPDATE usuarios
+        SET usu_nro_intentos = 0, usu_bloqueado_hasta = NULL
+        WHERE id_usuario = %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+        try:
+            cur.execute(registrar_ingreso_sql, (id_usuario,))
+            con.commit()
+            return True
+        except Exception as e:
+            con.rollback()
+            app.logger.error(f"Error al registrar ingreso del usuario {id_usuario}: {str(e)}")
+            return False
+        finally:
+            cur.close()
+            con.close()
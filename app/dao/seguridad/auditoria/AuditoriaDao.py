@@ -0,0 +1,33 @@
+from psycopg2.extras import execute_values
+from app.conexion.Conexion import Conexion
+
+class AuditoriaDao:
+    """Escritura por lotes de la tabla auditoria (ver codigos_sql/auditoria.sql)"""
+
+    def insertarLote(self, filas):
+        """
+        Inserta las filas (fecha, id_usuario, entidad, id_entidad, método,
+        endpoint, campos, ip, id_solicitud) en una sola transacción. Los
+        errores se propagan: el que llama conserva las filas y reintenta.
+        """
+        auditoriaSQL = """
+            INSERT INTO auditoria(aud_fecha, id_usuario, aud_entidad, aud_id_entidad, aud_metodo,
+                                  aud_endpoint, aud_campos, aud_ip, aud_id_solicitud)
+            VALUES %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            execute_values(cur, auditoriaSQL, filas, page_size=1000)
+            con.commit()
+            return len(filas)
+
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+            con.close()
@@ -0,0 +1,119 @@
+from flask import current_app as app
+from psycopg2.extras import execute_values
+from app.conexion.Conexion import Conexion
+
+class PermisoDao:
+    """Páginas y permisos por grupo (ver codigos_sql/permisos.sql)"""
+
+    ACCIONES = ('leer', 'insertar', 'editar', 'borrar')
+
+    def getPaginasActivas(self):
+        """
+        Devuelve (versión de la matriz, [(id_pagina, pag_nombre, pag_blueprints,
+        pag_direcc, id_modulo, des_modulo, est_modulo, pag_menu)]) en una sola transacción,
+        ordenadas como el menú. Los errores se propagan: sin páginas no se
+        puede decidir ningún permiso.
+        """
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("SELECT ver_numero FROM permisos_version")
+            fila = cur.fetchone()
+            cur.execute("""
+                SELECT pa.id_pagina, pa.pag_nombre, pa.pag_blueprints, pa.pag_direcc,
+                       m.id_modulo, m.des_modulo, m.est_modulo, pa.pag_menu
+                FROM paginas pa
+                JOIN modulos m ON pa.id_modulo = m.id_modulo
+                WHERE pa.pag_estado IS TRUE
+                ORDER BY m.des_modulo, pa.pag_nombre
+            """)
+            return (fila[0] if fila else 0), cur.fetchall()
+        finally:
+            cur.close()
+            con.close()
+
+    def getPermisosGrupo(self, id_grupo):
+        """[(id_pagina, leer, insertar, editar, borrar)] del grupo. Los errores se propagan."""
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("""
+                SELECT id_pagina, leer, insertar, editar, borrar
+                FROM permisos
+                WHERE id_grupo = %s
+            """, (id_grupo,))
+            return cur.fetchall()
+        finally:
+            cur.close()
+            con.close()
+
+    def getPermisos(self, id_grupo):
+        """Todas las páginas con los permisos del grupo (falsos si no tiene fila). None si falla."""
+        permisoSQL = """
+            SELECT pa.id_pagina, pa.pag_nombre, pa.pag_direcc, m.des_modulo,
+                   COALESCE(pe.leer, FALSE), COALESCE(pe.insertar, FALSE),
+                   COALESCE(pe.editar, FALSE), COALESCE(pe.borrar, FALSE)
+            FROM paginas pa
+            JOIN modulos m ON pa.id_modulo = m.id_modulo
+            LEFT JOIN permisos pe ON pe.id_pagina = pa.id_pagina AND pe.id_grupo = %s
+            ORDER BY m.des_modulo, pa.pag_nombre
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(permisoSQL, (id_grupo,))
+            return [{
+                'id_pagina': p[0],
+                'pagina': p[1],
+                'direccion': p[2],
+                'modulo': p[3],
+                'leer': p[4],
+                'insertar': p[5],
+                'editar': p[6],
+                'borrar': p[7],
+            } for p in cur.fetchall()]
+
+        except Exception as e:
+            app.logger.error(f"Error al obtener permisos del grupo: {str(e)}")
+            return None
+        finally:
+            cur.close()
+            con.close()
+
+    def guardarPermisos(self, id_grupo, permisos):
+        """
+        Reemplaza los permisos del grupo por `permisos`, una lista de
+        (id_pagina, leer, insertar, editar, borrar). Retorna True o False.
+        """
+        permisoSQL = """
+            INSERT INTO permisos(id_pagina, id_grupo, leer, insertar, editar, borrar)
+            VALUES %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute("DELETE FROM permisos WHERE id_grupo = %s", (id_grupo,))
+            filas = [(p[0], id_grupo) + tuple(p[1:]) for p in permisos if any(p[1:])]
+            if filas:
+                execute_values(cur, permisoSQL, filas)
+            con.commit()
+            app.logger.info(f"Permisos del grupo {id_grupo} actualizados: {len(filas)} páginas")
+            return True
+
+        except Exception as e:
+            app.logger.error(f"Error al guardar permisos del grupo: {str(e)}")
+            con.rollback()
+            return False
+        finally:
+            cur.close()
+            con.close()
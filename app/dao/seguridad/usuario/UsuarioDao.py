@@ -1,6 +1,6 @@
 from flask import current_app as app
 from app.conexion.Conexion import Conexion
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.seguridad.claves import servicio_claves, ColaClavesLlena
 
 class UsuarioDao:
     
@@ -169,7 +169,10 @@ class UsuarioDao:
 
     def guardarUsuario(self, username, password, id_funcionario, id_grupo, 
                        usu_estado=True, creacion_usuario=1):
-        """Crea un nuevo usuario con contraseña encriptada"""
+        """
+        Crea un nuevo usuario con contraseña encriptada. Lanza
+        ColaClavesLlena si hay demasiados hashes en espera.
+        """
         
         # Validar que el username no exista
         if not self.validarUsernameDisponible(username):
@@ -200,7 +203,7 @@ class UsuarioDao:
                 return None
             
             # Encriptar contraseña
-            password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+            password_hash = servicio_claves.generar(password)
             
             # Insertar usuario
             cur.execute(insertUsuarioSQL, (username, password_hash, id_funcionario, 
@@ -211,6 +214,9 @@ class UsuarioDao:
             app.logger.info(f"Usuario {username} creado exitosamente con ID: {usuario_id}")
             return usuario_id
             
+        except ColaClavesLlena:
+            con.rollback()
+            raise
         except Exception as e:
             con.rollback()
             app.logger.error(f"Error al guardar usuario: {str(e)}")
@@ -221,7 +227,10 @@ class UsuarioDao:
 
     def updateUsuario(self, id_usuario, username, id_grupo, usu_estado, 
                      password=None, modificacion_usuario=1):
-        """Actualiza un usuario existente (NO cambia el funcionario)"""
+        """
+        Actualiza un usuario existente (NO cambia el funcionario). Lanza
+        ColaClavesLlena si hay demasiados hashes en espera.
+        """
         
         # Validar username disponible
         if not self.validarUsernameDisponible(username, id_usuario):
@@ -241,7 +250,7 @@ class UsuarioDao:
                     modificacion_usuario = %s
                 WHERE id_usuario = %s
             """
-            password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+            password_hash = servicio_claves.generar(password)
             params = (username, password_hash, id_grupo, usu_estado, modificacion_usuario, id_usuario)
         else:
             # Sin contraseña, solo actualizar los demás campos
@@ -304,10 +313,11 @@ class UsuarioDao:
             con.close()
 
     def resetearIntentos(self, id_usuario):
-        """Resetea el contador de intentos fallidos de login"""
+        """Resetea el contador de intentos fallidos de login (y quita el bloqueo)"""
         resetSQL = """
             UPDATE usuarios
             SET usu_nro_intentos = 0,
+                usu_bloqueado_hasta = NULL,
                 modificacion_fecha = CURRENT_DATE,
                 modificacion_hora = CURRENT_TIME
             WHERE id_usuario = %s
@@ -329,4 +339,26 @@ class UsuarioDao:
             return False
         finally:
             cur.close()
-            con.close()
\ No newline at end of file
+            con.close()
+    def getUsuarioSesion(self, id_usuario):
+        """
+        Estado y grupo de un usuario para validar su sesión: (usu_estado,
+        id_grupo, des_grupo) o None si no existe. Los errores se propagan.
+        """
+        sesionSQL = """
+            SELECT u.usu_estado, u.id_grupo, g.des_grupo
+            FROM usuarios u
+            LEFT JOIN grupos g ON g.id_grupo = u.id_grupo
+            WHERE u.id_usuario = %s
+        """
+
+        conexion = Conexion()
+        con = conexion.getConexion()
+        cur = con.cursor()
+
+        try:
+            cur.execute(sesionSQL, (id_usuario,))
+            return cur.fetchone()
+        finally:
+            cur.close()
+            con.close()
@@ -0,0 +1,56 @@
+"""
+Calibración de las iteraciones de PBKDF2 para este servidor.
+
+Mide el costo de una iteración con hashlib (lo mismo que usa werkzeug) y
+propone el método para que verificar una contraseña tarde cerca del
+objetivo. El resultado va en app.config['CLAVE_METODO']; los hashes
+existentes se rehacen solos en el próximo ingreso de cada usuario.
+
+Uso: flask --app app calibrar-claves [--objetivo-ms 250]
+"""
+import hashlib
+import os
+import time
+import click
+from flask import current_app as app
+from flask.cli import with_appcontext
+
+# Mínimo recomendado por OWASP para PBKDF2-HMAC-SHA256
+MIN_ITERACIONES = 600000
+
+# Iteraciones de cada medición
+ITERACIONES_MUESTRA = 200000
+
+
+def medir_iteracion(algoritmo='sha256', muestras=5):
+    """Segundos por iteración (la mejor de `muestras` mediciones)"""
+    sal = os.urandom(16)
+    mejor = None
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        hashlib.pbkdf2_hmac(algoritmo, b'calibracion', sal, ITERACIONES_MUESTRA)
+        duracion = (time.perf_counter() - inicio) / ITERACIONES_MUESTRA
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+@click.command('calibrar-claves')
+@with_appcontext
+@click.option('--objetivo-ms', default=250, show_default=True, help='Tiempo buscado por verificación.')
+@click.option('--algoritmo', default='sha256', show_default=True)
+def calibrar_claves_comando(objetivo_ms, algoritmo):
+    """Propone CLAVE_METODO para que una verificación tarde unos --objetivo-ms"""
+    por_iteracion = medir_iteracion(algoritmo)
+    iteraciones = int(objetivo_ms / 1000 / por_iteracion) // 10000 * 10000
+    if iteraciones < MIN_ITERACIONES:
+        click.echo(f"Aviso: {iteraciones} iteraciones quedan debajo del mínimo; se usa {MIN_ITERACIONES}")
+        iteraciones = MIN_ITERACIONES
+
+    verificacion_ms = iteraciones * por_iteracion * 1000
+    hilos = app.config.get('CLAVE_HILOS') or max(1, (os.cpu_count() or 2) - 1)
+    actual = app.config.get('CLAVE_METODO')
+
+    click.echo(f"Método actual: {actual}")
+    click.echo(f"Propuesto: app.config['CLAVE_METODO'] = 'pbkdf2:{algoritmo}:{iteraciones}'")
+    click.echo(f"Verificación: {verificacion_ms:.0f} ms; con {hilos} hilos, "
+               f"hasta {hilos * 1000 / verificacion_ms:.1f} ingresos por segundo por worker")
@@ -0,0 +1,24 @@
+"""
+Mantenimiento diario del índice de disponibilidad de turnos.
+
+Las reservas y cancelaciones lo actualizan solas (trigger y cola, ver
+DisponibilidadDao); este proceso
+extiende el horizonte un día más, borra los días pasados y, al recalcular
+todo, corrige cualquier diferencia.
+
+Uso: flask --app app refrescar-disponibilidad
+"""
+import time
+import click
+from flask.cli import with_appcontext
+from app.dao.gestionar_turnos.disponibilidad.DisponibilidadDao import DisponibilidadDao
+
+
+@click.command('refrescar-disponibilidad')
+@with_appcontext
+def refrescar_disponibilidad_comando():
+    """Recalcula la disponibilidad de los próximos días de todos los especialistas"""
+    reloj = time.perf_counter()
+    cantidad = DisponibilidadDao().avanzarDisponibilidad()
+    click.echo(f"Disponibilidad recalculada para {cantidad} especialistas "
+               f"({time.perf_counter() - reloj:.1f} s)")
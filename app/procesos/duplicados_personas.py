@@ -0,0 +1,222 @@
+"""
+Detección de personas duplicadas.
+
+En lugar de comparar todas contra todas se arman bloques con claves
+normalizadas: misma cédula (solo dígitos) o mismo primer apellido y fecha
+de nacimiento. Dentro de cada bloque se generan los pares y la similitud
+de nombres se calcula vectorizada con numpy sobre conteos de trigramas.
+La ejecución incremental solo busca pares donde al menos una persona es
+nueva o fue modificada desde la ejecución anterior.
+
+Uso: flask --app app detectar-duplicados [--completa]
+"""
+import time
+from datetime import datetime, timezone
+import click
+import numpy as np
+import pandas as pd
+from flask import current_app as app
+from flask.cli import with_appcontext
+from app.dao.gestionar_personas.duplicado.DuplicadoDao import DuplicadoDao
+
+# Largo máximo del nombre completo normalizado que se compara
+LONGITUD_NOMBRE = 48
+
+# Dimensiones del vector de trigramas (potencia de 2)
+DIMENSIONES = 64
+
+# Similitud mínima para proponer un par que comparte apellido y nacimiento
+UMBRAL_SIMILITUD = 0.75
+
+# Cédulas normalizadas más cortas no se usan como clave
+LARGO_MINIMO_CEDULA = 5
+
+# Bloques más grandes se descartan (claves genéricas, datos de relleno)
+MAX_BLOQUE = 200
+
+# Filas por paso en los cálculos vectorizados (acota la memoria)
+TAMANO_PASO = 100000
+
+COLUMNAS = ['id_persona', 'nombre', 'apellido', 'cedula', 'fecha_nacimiento']
+
+
+def normalizar_texto(serie):
+    """Minúsculas, sin acentos ni signos y con espacios simples"""
+    return (serie.fillna('').astype(str)
+            .str.normalize('NFKD')
+            .str.encode('ascii', 'ignore').str.decode('ascii')
+            .str.lower()
+            .str.replace(r'[^a-z]+', ' ', regex=True)
+            .str.strip())
+
+
+def normalizar_cedula(serie):
+    """Solo dígitos y sin ceros a la izquierda"""
+    return (serie.fillna('').astype(str)
+            .str.replace(r'\D', '', regex=True)
+            .str.lstrip('0'))
+
+
+def preparar(df):
+    """Agrega las claves de bloque y el nombre completo normalizado"""
+    df = df.copy()
+    apellido = normalizar_texto(df['apellido'])
+    nombre = normalizar_texto(df['nombre'])
+    df['cedula_n'] = normalizar_cedula(df['cedula'])
+    df['apellido_n'] = apellido.str.split(' ', n=1).str[0]
+    df['nombre_completo'] = (' ' + apellido + ' ' + nombre + ' ').str.slice(0, LONGITUD_NOMBRE)
+    return df
+
+
+def vectores_trigramas(textos):
+    """
+    Conteo de trigramas de cada texto, repartidos en DIMENSIONES cubetas por
+    hash. Devuelve una matriz (len(textos), DIMENSIONES) de uint8.
+    """
+    bits = DIMENSIONES.bit_length() - 1
+    vectores = np.zeros((len(textos), DIMENSIONES), dtype=np.uint8)
+
+    for inicio in range(0, len(textos), TAMANO_PASO):
+        parte = textos[inicio:inicio + TAMANO_PASO]
+        # Texto ASCII de ancho fijo -> matriz de bytes (relleno con ceros)
+        b = np.array(list(parte), dtype=f'S{LONGITUD_NOMBRE}').view(np.uint8)
+        b = b.reshape(len(parte), LONGITUD_NOMBRE).astype(np.uint64)
+
+        codigos = (b[:, :-2] << 16) | (b[:, 1:-1] << 8) | b[:, 2:]
+        validos = b[:, 2:] != 0
+        cubetas = ((codigos * 2654435761) & 0xFFFFFFFF) >> (32 - bits)
+
+        filas = np.broadcast_to(np.arange(len(parte))[:, None], cubetas.shape)
+        indices = (filas * DIMENSIONES + cubetas)[validos].astype(np.int64)
+        conteos = np.bincount(indices, minlength=len(parte) * DIMENSIONES)
+        vectores[inicio:inicio + len(parte)] = np.minimum(conteos, 255).reshape(len(parte), DIMENSIONES)
+
+    return vectores
+
+
+def similitud(vectores, a, b):
+    """Jaccard ponderado entre las filas a[i] y b[i] de `vectores`"""
+    resultado = np.empty(len(a), dtype=np.float64)
+    for inicio in range(0, len(a), TAMANO_PASO):
+        va = vectores[a[inicio:inicio + TAMANO_PASO]].astype(np.uint16)
+        vb = vectores[b[inicio:inicio + TAMANO_PASO]].astype(np.uint16)
+        interseccion = np.minimum(va, vb).sum(axis=1)
+        union = np.maximum(va, vb).sum(axis=1)
+        resultado[inicio:inicio + TAMANO_PASO] = np.divide(
+            interseccion, union, out=np.zeros(len(va)), where=union > 0)
+    return resultado
+
+
+def pares_por_clave(df, claves, motivo):
+    """Pares (posición a, posición b) de filas que comparten todas las `claves`"""
+    bloques = df[claves].copy()
+    bloques['pos'] = np.arange(len(df))
+    bloques = bloques.dropna(subset=claves)
+
+    tamano = bloques.groupby(claves, sort=False)['pos'].transform('size')
+    bloques = bloques[(tamano > 1) & (tamano <= MAX_BLOQUE)]
+
+    pares = bloques.merge(bloques, on=claves, suffixes=('_a', '_b'))
+    pares = pares[pares['pos_a'] < pares['pos_b']]
+    return pd.DataFrame({'a': pares['pos_a'].to_numpy(), 'b': pares['pos_b'].to_numpy(), 'motivo': motivo})
+
+
+def detectar(df, nuevas=None):
+    """
+    Devuelve (candidatos, pares comparados). candidatos es un DataFrame con
+    id_persona_a < id_persona_b, motivo y puntaje. Si se indica `nuevas`
+    (IDs), solo se consideran pares con al menos una de ellas.
+    """
+    df = preparar(df).reset_index(drop=True)
+    vacias = {'cedula_n': '', 'apellido_n': ''}
+    claves = df.replace(vacias, np.nan)
+    claves.loc[claves['cedula_n'].str.len() < LARGO_MINIMO_CEDULA, 'cedula_n'] = np.nan
+
+    pares = pd.concat([
+        pares_por_clave(claves, ['cedula_n'], 'cedula'),
+        pares_por_clave(claves, ['apellido_n', 'fecha_nacimiento'], 'apellido_fecha'),
+    ], ignore_index=True)
+
+    ids = df['id_persona'].to_numpy()
+    if nuevas is not None and len(pares):
+        es_nueva = np.isin(ids, np.fromiter(nuevas, dtype=ids.dtype))
+        pares = pares[es_nueva[pares['a'].to_numpy()] | es_nueva[pares['b'].to_numpy()]]
+
+    # Un par que coincide por cédula y por apellido queda con el motivo cédula
+    pares = pares.drop_duplicates(subset=['a', 'b'], keep='first').reset_index(drop=True)
+    comparados = len(pares)
+    if not comparados:
+        return pd.DataFrame(columns=['id_persona_a', 'id_persona_b', 'motivo', 'puntaje']), 0
+
+    # Solo se vectorizan los nombres que participan en algún par
+    usadas, inversa = np.unique(np.concatenate([pares['a'].to_numpy(), pares['b'].to_numpy()]),
+                                return_inverse=True)
+    vectores = vectores_trigramas(df['nombre_completo'].to_numpy()[usadas])
+    sim = similitud(vectores, inversa[:comparados], inversa[comparados:])
+
+    por_cedula = (pares['motivo'] == 'cedula').to_numpy()
+    puntaje = np.where(por_cedula, 0.5 + 0.5 * sim, sim)
+    conservar = por_cedula | (sim >= UMBRAL_SIMILITUD)
+
+    id_a, id_b = ids[pares['a'].to_numpy()], ids[pares['b'].to_numpy()]
+    candidatos = pd.DataFrame({
+        'id_persona_a': np.minimum(id_a, id_b),
+        'id_persona_b': np.maximum(id_a, id_b),
+        'motivo': pares['motivo'].to_numpy(),
+        'puntaje': np.round(puntaje, 3),
+    })[conservar]
+    return candidatos, comparados
+
+
+def ejecutar_deteccion(completa=False):
+    """
+    Corre la detección y guarda los candidatos. Sin ejecución previa siempre
+    es completa. Requiere contexto de aplicación. Retorna un resumen.
+    """
+    duplicadodao = DuplicadoDao()
+    inicio = datetime.now(timezone.utc)
+    reloj = time.perf_counter()
+
+    ultima = None if completa else duplicadodao.getUltimaEjecucion()
+    ultimo_id = duplicadodao.getMaxIdPersona()
+
+    if ultima is None:
+        df = pd.DataFrame.from_records(duplicadodao.iterarPersonas(), columns=COLUMNAS)
+        nuevas = None
+    else:
+        nuevas_df = pd.DataFrame.from_records(
+            duplicadodao.iterarPersonasNuevas(ultima[0], ultima[1]), columns=COLUMNAS)
+        fechas = nuevas_df['fecha_nacimiento'].dropna().unique().tolist()
+        cedulas = [c for c in normalizar_cedula(nuevas_df['cedula']).unique() if c]
+        # Solo se cargan las personas que pueden compartir bloque con alguna nueva
+        df = pd.concat([
+            nuevas_df,
+            pd.DataFrame.from_records(duplicadodao.iterarVecinas(fechas, cedulas), columns=COLUMNAS),
+        ]).drop_duplicates(subset=['id_persona'])
+        nuevas = set(nuevas_df['id_persona'])
+
+    candidatos, comparados = detectar(df, nuevas)
+    filas = list(candidatos.itertuples(index=False, name=None))
+    filas = [(int(a), int(b), motivo, float(puntaje)) for a, b, motivo, puntaje in filas]
+    duplicadodao.guardarCandidatos(filas, inicio, ultimo_id, ultima is None, len(df), comparados)
+
+    resumen = {
+        'completa': ultima is None,
+        'personas': len(df),
+        'nuevas': len(df) if nuevas is None else len(nuevas),
+        'pares': comparados,
+        'candidatos': len(filas),
+        'segundos': round(time.perf_counter() - reloj, 1),
+    }
+    app.logger.info(f"Detección de duplicados: {resumen}")
+    return resumen
+
+
+@click.command('detectar-duplicados')
+@with_appcontext
+@click.option('--completa', is_flag=True, help='Revisa todas las personas, no solo las nuevas.')
+def detectar_duplicados_comando(completa):
+    """Busca personas duplicadas y deja los pares en personas_duplicadas"""
+    resumen = ejecutar_deteccion(completa)
+    click.echo(f"{resumen['candidatos']} candidatos en {resumen['pares']} pares comparados "
+               f"({resumen['personas']} personas, {resumen['segundos']} s)")
@@ -0,0 +1,138 @@
+"""
+Prueba de concurrencia de la reserva de turnos contra la base configurada.
+
+Simula la apertura de la agenda: muchos pacientes intentan reservar a la
+vez. Tres escenarios, cada hilo con su propia conexión:
+
+  mismo turno    todos piden el mismo horario. Debe quedar exactamente una
+                 reserva y el resto recibir "ocupado" (o "en_proceso"), sin
+                 errores ni esperas largas.
+  turnos libres  cada hilo pide un horario distinto de la agenda. Todas
+                 deben reservarse: no hay un bloqueo compartido que las
+                 ponga en fila.
+  mismo día      horarios distintos de un solo día del especialista (la
+                 fila del índice de disponibilidad es por día). Todas deben
+                 reservarse, ninguna con "en_proceso".
+
+Al terminar cancela los turnos creados (salvo --conservar).
+
+Uso: python -m app.procesos.prueba_concurrencia_turnos --especialista 3 \
+         --pacientes 10-60 --desde 2026-11-02 [--hilos 50] [--conservar]
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from app import app
+from app.dao.gestionar_turnos.turno.TurnoDao import TurnoDao
+
+
+def leer_pacientes(texto):
+    """'10-60' o '10,11,12' -> lista de IDs"""
+    if '-' in texto:
+        inicio, fin = (int(x) for x in texto.split('-'))
+        return list(range(inicio, fin + 1))
+    return [int(x) for x in texto.split(',')]
+
+
+def rafaga(pedidos):
+    """
+    Ejecuta pedidos [(id_especialista, id_paciente, inicio)] en hilos que
+    arrancan juntos. Devuelve [(resultado, segundos)] en el mismo orden.
+    """
+    resultados = [None] * len(pedidos)
+    largada = threading.Barrier(len(pedidos))
+
+    def reservar(i, id_especialista, id_paciente, inicio):
+        with app.app_context():
+            turnodao = TurnoDao()
+            largada.wait()
+            reloj = time.perf_counter()
+            resultado = turnodao.reservarTurno(id_especialista, id_paciente, inicio)
+            resultados[i] = (resultado, time.perf_counter() - reloj)
+
+    hilos = [threading.Thread(target=reservar, args=(i,) + pedido) for i, pedido in enumerate(pedidos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def resumir(nombre, resultados):
+    estados = Counter('reservado' if isinstance(r, dict) else ('error' if r is False else r)
+                      for r, _ in resultados)
+    tiempos = sorted(s * 1000 for _, s in resultados)
+    p95 = tiempos[max(0, int(len(tiempos) * 0.95) - 1)]
+    print(f"{nombre}: {dict(estados)}")
+    print(f"  ms por reserva: mediana {statistics.median(tiempos):.1f}, p95 {p95:.1f}, máx {tiempos[-1]:.1f}")
+    return estados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de concurrencia de reserva de turnos')
+    parser.add_argument('--especialista', type=int, required=True)
+    parser.add_argument('--pacientes', required=True, help="IDs: '10-60' o '10,11,12'")
+    parser.add_argument('--desde', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--hilos', type=int, default=50)
+    parser.add_argument('--conservar', action='store_true', help='No cancelar los turnos creados')
+    args = parser.parse_args()
+
+    pacientes = leer_pacientes(args.pacientes)
+    hilos = min(args.hilos, len(pacientes))
+
+    with app.app_context():
+        turnodao = TurnoDao()
+        libres = turnodao.getTurnosDisponibles(args.especialista, args.desde,
+                                               date.fromordinal(args.desde.toordinal() + 30))
+    if not libres or len(libres) < hilos + 1:
+        raise SystemExit(f"Se necesitan al menos {hilos + 1} turnos libres; hay {len(libres or [])}")
+
+    inicios = [datetime.fromisoformat(t['inicio']) for t in libres]
+    creados = []
+    fallas = []
+
+    # 1. Todos contra el mismo turno
+    resultados = rafaga([(args.especialista, pacientes[i], inicios[0]) for i in range(hilos)])
+    estados = resumir('mismo turno', resultados)
+    creados += [r['id_turno'] for r, _ in resultados if isinstance(r, dict)]
+    if estados['reservado'] != 1 or estados['error']:
+        fallas.append('mismo turno: se esperaba exactamente una reserva y ningún error')
+
+    # 2. Cada uno a un turno distinto
+    resultados = rafaga([(args.especialista, pacientes[i], inicios[i + 1]) for i in range(hilos)])
+    estados = resumir('turnos libres', resultados)
+    creados += [r['id_turno'] for r, _ in resultados if isinstance(r, dict)]
+    if estados['reservado'] != hilos:
+        fallas.append('turnos libres: todas las reservas debían confirmarse')
+
+    # 3. Horarios distintos del día con más turnos libres que quedan
+    por_dia = defaultdict(list)
+    for inicio in inicios[hilos + 1:]:
+        por_dia[inicio.date()].append(inicio)
+    dia = max(por_dia.values(), key=len, default=[])[:hilos]
+    if len(dia) < 2:
+        print('mismo día: no quedan dos turnos libres el mismo día, se omite')
+    else:
+        resultados = rafaga([(args.especialista, pacientes[i], inicio) for i, inicio in enumerate(dia)])
+        estados = resumir(f'mismo día ({dia[0].date()})', resultados)
+        creados += [r['id_turno'] for r, _ in resultados if isinstance(r, dict)]
+        if estados['reservado'] != len(dia):
+            fallas.append('mismo día: todas las reservas debían confirmarse, sin "en_proceso"')
+
+    if not args.conservar:
+        with app.app_context():
+            turnodao = TurnoDao()
+            for id_turno in creados:
+                turnodao.cancelarTurno(id_turno)
+        print(f"{len(creados)} turnos de prueba cancelados")
+
+    if fallas:
+        raise SystemExit('FALLÓ: ' + '; '.join(fallas))
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
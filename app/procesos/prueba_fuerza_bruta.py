@@ -0,0 +1,141 @@
+"""
+Prueba de carga del límite de ingresos contra la base configurada.
+
+Simula ráfagas de intentos con contraseñas incorrectas a través de la
+ruta /login (cliente de prueba de Flask, un cliente por hilo) y mide
+cuántos hashes se calcularon, cuántos intentos se rechazaron y cuánta
+CPU usó el proceso (incluye la del propio cliente de prueba). Escenarios:
+
+  un nick     muchas IPs contra el mismo usuario: no debe haber más
+              hashes que la capacidad de la cubeta del nick.
+  una IP      una IP prueba muchos nicks (relleno de credenciales): no
+              más hashes que la capacidad de la cubeta de la IP.
+
+Durante cada ráfaga un ingreso legítimo (otro nick, otra IP) mide la
+latencia. El nick atacado queda bloqueado: se desbloquea al terminar
+(salvo --conservar).
+
+Uso: python -m app.procesos.prueba_fuerza_bruta --nick carlos --clave secreta \
+         --otros ana,beto [--intentos 500] [--hilos 50] [--conservar]
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+from app import app
+from app.seguridad.claves import servicio_claves
+from app.seguridad.limite_ingresos import limite_ingresos
+
+
+def intento(cliente, nick, clave, ip):
+    reloj = time.perf_counter()
+    respuesta = cliente.post('/login', data={'usuario_nombre': nick, 'usuario_clave': clave},
+                             environ_base={'REMOTE_ADDR': ip})
+    return respuesta.status_code, time.perf_counter() - reloj
+
+
+def rafaga(pedidos, hilos, legitimo):
+    """
+    Ejecuta pedidos [(nick, clave, ip)] repartidos en `hilos` mientras
+    `legitimo` (nick, clave, ip) ingresa hasta tres veces, una por segundo
+    (más agotaría su propia cubeta). Devuelve
+    (códigos, hashes, segundos de CPU, segundos, latencias legítimas).
+    """
+    codigos = Counter()
+    latencias = []
+    lock = threading.Lock()
+    terminado = threading.Event()
+
+    def atacar(parte):
+        cliente = app.test_client()
+        for nick, clave, ip in parte:
+            codigo, _ = intento(cliente, nick, clave, ip)
+            with lock:
+                codigos[codigo] += 1
+
+    def ingresar():
+        cliente = app.test_client()
+        for _ in range(3):
+            codigo, segundos = intento(cliente, *legitimo)
+            latencias.append((codigo, segundos))
+            if terminado.wait(1):
+                break
+
+    hashes = servicio_claves.completados
+    cpu = time.process_time()
+    reloj = time.perf_counter()
+
+    trabajadores = [threading.Thread(target=atacar, args=(pedidos[i::hilos],)) for i in range(hilos)]
+    observador = threading.Thread(target=ingresar)
+    observador.start()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    terminado.set()
+    observador.join()
+
+    return (codigos, servicio_claves.completados - hashes, time.process_time() - cpu,
+            time.perf_counter() - reloj, latencias)
+
+
+def resumir(nombre, resultado, maximo_hashes):
+    codigos, hashes, cpu, segundos, latencias = resultado
+    # Cada ingreso legítimo también calcula un hash
+    maximo_hashes += len(latencias)
+    print(f"{nombre}: {sum(codigos.values())} intentos en {segundos:.1f} s, respuestas {dict(codigos)}")
+    print(f"  hashes calculados {hashes} (máximo esperado {maximo_hashes}), CPU {cpu:.1f} s")
+    if latencias:
+        tiempos = [s * 1000 for _, s in latencias]
+        print(f"  ingreso legítimo: {dict(Counter(c for c, _ in latencias))}, "
+              f"mediana {statistics.median(tiempos):.0f} ms, máx {max(tiempos):.0f} ms")
+    return hashes <= maximo_hashes and all(c == 302 for c, _ in latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga del límite de ingresos')
+    parser.add_argument('--nick', required=True, help='Usuario existente que se ataca')
+    parser.add_argument('--clave', required=True, help='Contraseña de un usuario legítimo (--otros)')
+    parser.add_argument('--otros', required=True,
+                        help="Nicks existentes: el primero ingresa con --clave durante la prueba")
+    parser.add_argument('--intentos', type=int, default=500)
+    parser.add_argument('--hilos', type=int, default=50)
+    parser.add_argument('--conservar', action='store_true', help='No desbloquear al usuario atacado')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    otros = args.otros.split(',')
+    capacidad_nick = limite_ingresos.limites['nick'][0]
+    capacidad_ip = limite_ingresos.limites['ip'][0]
+    fallas = []
+
+    # 1. Un nick desde muchas IPs
+    pedidos = [(args.nick, f'incorrecta{i}', f'10.1.{i // 250}.{i % 250}') for i in range(args.intentos)]
+    resultado = rafaga(pedidos, args.hilos, (otros[0], args.clave, '10.9.0.1'))
+    if not resumir('un nick', resultado, capacidad_nick):
+        fallas.append('un nick')
+
+    # 2. Una IP contra muchos nicks existentes
+    pedidos = [(otros[1 + i % max(1, len(otros) - 1)] if len(otros) > 1 else args.nick,
+                f'incorrecta{i}', '10.2.0.1') for i in range(args.intentos)]
+    resultado = rafaga(pedidos, args.hilos, (otros[0], args.clave, '10.9.0.2'))
+    if not resumir('una IP', resultado, capacidad_ip):
+        fallas.append('una IP')
+
+    if not args.conservar:
+        from app.dao.referenciales.usuario.login_dao import LoginDao
+        with app.app_context():
+            for nick in [args.nick] + otros[1:]:
+                usuario = LoginDao().buscarUsuario(nick)
+                if usuario:
+                    LoginDao().registrarIngreso(usuario['id_usuario'])
+        print("Usuarios de prueba desbloqueados")
+
+    if fallas:
+        raise SystemExit('FALLÓ: ' + ', '.join(fallas))
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Auditoría de cambios con escritura diferida.
+
+Cada solicitud de escritura a la API que termina bien (POST, PUT, PATCH,
+DELETE con estado menor a 400) deja una fila: usuario de la sesión,
+entidad y id tomados de la ruta, y los campos enviados. El hilo de la
+solicitud solo arma una tupla y la deja en una cola en memoria; un hilo
+aparte la vacía cada AUDITORIA_INTERVALO segundos con un INSERT de varias
+filas (execute_values). Si la base falla las filas se conservan y se
+reintentan en la siguiente vuelta; al salir del proceso se escribe lo
+que quede.
+
+Cada valor se acota al largo de su columna y los textos pierden los
+caracteres que JSONB no acepta (NUL, sustitutos sueltos) antes de entrar
+a la cola. Si aun así la base rechaza un lote por sus datos, se parte en
+mitades hasta aislar las filas culpables, que se registran en el log y se
+descartan; las demás se escriben.
+
+Las contraseñas y otros campos de SENSIBLES se guardan como '***'.
+
+Configuración (app.config):
+    AUDITORIA_INTERVALO     segundos entre escrituras (1)
+    AUDITORIA_TAMANO_COLA   filas en espera antes de descartar (50000)
+"""
+import atexit
+import logging
+import queue
+import threading
+import psycopg2
+from datetime import datetime, timezone
+from flask import g, request, session, current_app
+from psycopg2.extras import Json
+from app.dao.seguridad.auditoria.AuditoriaDao import AuditoriaDao
+
+logger = logging.getLogger(__name__)
+
+METODOS_ESCRITURA = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+# Campos cuyo valor no se guarda
+SENSIBLES = {'password', 'password_confirmacion', 'usu_clave', 'clave', 'csrf_token'}
+
+# Largo máximo de cada valor de texto guardado
+LARGO_VALOR = 500
+
+# Respuestas más largas no se leen para buscar el id creado
+LARGO_RESPUESTA = 4096
+
+# Filas que no se pudieron escribir y se conservan para reintentar
+MAX_PENDIENTES = 50000
+
+# Largos de las columnas de auditoria (ver codigos_sql/auditoria.sql)
+LARGO_ENTIDAD = 60
+LARGO_METODO = 10
+LARGO_ENDPOINT = 120
+LARGO_IP = 45
+LARGO_ID_SOLICITUD = 64
+
+# Usuario de creacion_usuario/modificacion_usuario cuando no hay sesión (procesos, pruebas)
+USUARIO_SISTEMA = 1
+
+
+def usuario_sesion():
+    """id_usuario de la sesión, o USUARIO_SISTEMA si no hay"""
+    return session.get('id_usuario', USUARIO_SISTEMA)
+
+
+def limpiar_texto(texto, largo):
+    """Texto sin caracteres NUL ni sustitutos sueltos (JSONB y TEXT no los aceptan), cortado a `largo`"""
+    if texto is None:
+        return None
+    texto = str(texto).replace('\x00', '').encode('utf-8', 'replace').decode('utf-8')
+    return texto[:largo]
+
+
+def limpiar_valor(valor):
+    """Un valor del cuerpo enviado, apto para JSONB"""
+    if isinstance(valor, str):
+        if len(valor) > LARGO_VALOR:
+            return limpiar_texto(valor, LARGO_VALOR) + '…'
+        return limpiar_texto(valor, LARGO_VALOR)
+    if isinstance(valor, dict):
+        return resumir_campos(valor)
+    if isinstance(valor, list):
+        return [limpiar_valor(v) for v in valor[:50]]
+    return valor
+
+
+def resumir_campos(datos):
+    """Campos enviados para la auditoría: sin valores sensibles y con textos acotados"""
+    if isinstance(datos, list):
+        return {'cantidad': len(datos)}
+    if not isinstance(datos, dict):
+        return None
+    campos = {}
+    for clave, valor in datos.items():
+        clave = limpiar_texto(clave, LARGO_VALOR)
+        campos[clave] = '***' if clave in SENSIBLES else limpiar_valor(valor)
+    return campos
+
+
+class RegistroAuditoria:
+
+    def __init__(self):
+        self.dao = AuditoriaDao()
+        self.intervalo = 1
+        self.cola = queue.Queue(50000)
+        self.descartados = 0
+        # Filas de una escritura fallida, primeras en la siguiente
+        self.pendientes = []
+        self.lock = threading.Lock()
+        self.detener = threading.Event()
+        self.hilo = None
+
+    def configurar(self, app):
+        """Audita las escrituras de la API y arranca el hilo que escribe"""
+        self.intervalo = app.config.get('AUDITORIA_INTERVALO', 1)
+        self.cola = queue.Queue(app.config.get('AUDITORIA_TAMANO_COLA', 50000))
+        app.after_request(auditar_solicitud)
+
+        self.hilo = threading.Thread(target=self.ejecutar, name='auditoria', daemon=True)
+        self.hilo.start()
+        atexit.register(self.cerrar)
+
+    def registrar(self, entidad, id_entidad, campos=None, id_usuario=None, endpoint=None, metodo=None):
+        """Deja una fila en la cola; no espera a la base. Si la cola está llena se descarta."""
+        fila = (datetime.now(timezone.utc), id_usuario,
+                limpiar_texto(entidad, LARGO_ENTIDAD) or '?',
+                limpiar_texto(id_entidad, LARGO_ENTIDAD),
+                limpiar_texto(metodo or request.method, LARGO_METODO),
+                limpiar_texto(endpoint or request.endpoint, LARGO_ENDPOINT) or '?',
+                None if campos is None else Json(campos),
+                limpiar_texto(request.remote_addr, LARGO_IP),
+                limpiar_texto(g.get('id_solicitud'), LARGO_ID_SOLICITUD))
+        try:
+            self.cola.put_nowait(fila)
+        except queue.Full:
+            self.descartados += 1
+
+    def escribir(self, filas):
+        """
+        Inserta las filas. Si la base rechaza el lote por sus datos lo parte
+        en mitades hasta aislar las filas culpables, que se descartan.
+        Retorna las filas que quedaron sin escribir por otro error (base
+        caída, etc.) para reintentarlas.
+        """
+        try:
+            self.dao.insertarLote(filas)
+            return []
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            if len(filas) == 1:
+                _, id_usuario, entidad, id_entidad, metodo, endpoint, _, _, id_solicitud = filas[0]
+                logger.error("Fila de auditoría descartada (%s %s %s/%s, usuario %s, solicitud %s): %s",
+                             metodo, endpoint, entidad, id_entidad, id_usuario, id_solicitud, e)
+                self.descartados += 1
+                return []
+        except Exception as e:
+            logger.error("Error al escribir %s filas de auditoría: %s", len(filas), e)
+            return filas
+
+        mitad = len(filas) // 2
+        pendientes = self.escribir(filas[:mitad])
+        if pendientes:
+            return pendientes + filas[mitad:]
+        return self.escribir(filas[mitad:])
+
+    def vaciar(self):
+        """Escribe lo que hay en la cola. Retorna False si la base falló."""
+        with self.lock:
+            while True:
+                filas = self.pendientes
+                self.pendientes = []
+                try:
+                    while True:
+                        filas.append(self.cola.get_nowait())
+                except queue.Empty:
+                    pass
+                if not filas:
+                    return True
+
+                filas = self.escribir(filas)
+                if filas:
+                    if len(filas) > MAX_PENDIENTES:
+                        self.descartados += len(filas) - MAX_PENDIENTES
+                    self.pendientes = filas[-MAX_PENDIENTES:]
+                    return False
+
+                if self.descartados:
+                    logger.warning("Auditoría: %s filas descartadas", self.descartados)
+                    self.descartados = 0
+                if self.cola.empty():
+                    return True
+
+    def ejecutar(self):
+        while not self.detener.wait(self.intervalo):
+            self.vaciar()
+
+    def cerrar(self):
+        """Al salir del proceso: detiene el hilo y escribe lo que quede"""
+        self.detener.set()
+        if self.hilo is not None:
+            self.hilo.join(timeout=10)
+        if not self.vaciar():
+            logger.error("Auditoría: %s filas sin escribir al cerrar", len(self.pendientes))
+
+
+auditoria = RegistroAuditoria()
+
+
+def entidad_solicitud():
+    """
+    (entidad, id) de la ruta: '/api/v1/funcionarios/<int:id_funcionario>'
+    -> ('funcionarios', '12'). Con varias variables el id las une con '/'.
+    """
+    partes = [p for p in request.url_rule.rule.split('/') if p and not p.startswith('<')]
+    # Sin el prefijo /api/v1
+    partes = partes[2:] if partes[:1] == ['api'] else partes
+    entidad = partes[0] if partes else request.endpoint
+    valores = [str(v) for v in (request.view_args or {}).values()]
+    return entidad, '/'.join(valores) if valores else None
+
+
+def id_creado(respuesta):
+    """Id del registro creado por un POST, si la respuesta (corta) lo trae en data.id_*"""
+    if not respuesta.is_json or (respuesta.content_length or 0) > LARGO_RESPUESTA:
+        return None
+    cuerpo = respuesta.get_json(silent=True)
+    datos = cuerpo.get('data') if isinstance(cuerpo, dict) else None
+    if isinstance(datos, dict):
+        for clave, valor in datos.items():
+            if clave.startswith('id_') and isinstance(valor, (int, str)):
+                return valor
+    return None
+
+
+def auditar_solicitud(respuesta):
+    """after_request: una fila por escritura exitosa a la API"""
+    if (request.method not in METODOS_ESCRITURA or respuesta.status_code >= 400
+            or request.url_rule is None or not request.path.startswith('/api/')):
+        return respuesta
+    # POST que solo consultan (exportar, validar): @requiere_permiso('leer')
+    if getattr(current_app.view_functions.get(request.endpoint), 'permiso', (None,))[0] == 0:
+        return respuesta
+
+    entidad, id_entidad = entidad_solicitud()
+    if id_entidad is None and request.method == 'POST':
+        id_entidad = id_creado(respuesta)
+
+    if request.is_json:
+        campos = resumir_campos(request.get_json(silent=True))
+    else:
+        campos = resumir_campos(request.form.to_dict()) if request.form else None
+
+    auditoria.registrar(entidad, id_entidad, campos, session.get('id_usuario'))
+    return respuesta
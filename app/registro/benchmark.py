@@ -0,0 +1,105 @@
+"""
+Costo del registro en el hilo de la solicitud, antes y después.
+
+Simula las llamadas de guardarPaciente (ocho INFO por alta) y mide cuánto
+tarda el hilo que registra. El escenario "antes" usa f-strings con un
+StreamHandler síncrono (el handler por defecto de Flask); el "después",
+formato diferido, muestreo de app.dao, registros sin ubicación y la cola
+con su listener.
+Ambos escriben a un archivo temporal.
+
+Uso: python -m app.registro.benchmark [altas]
+"""
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from logging.handlers import QueueListener
+from app.registro.registro_json import FormateadorJSON, FiltroMuestreo, ManejadorCola, ajustar_registro
+
+PACIENTE = ('María José', 'Benítez Ortiz', 'HC-2024-000123', 4512, 3321, 'Ana Ortiz', 'Luis Benítez', 'San José')
+
+
+def alta_antes(logger):
+    nombre, apellido, historia, persona_id, paciente_id, madre, padre, colegio = PACIENTE
+    logger.info(f"Historia clínica auto-generada: {historia}")
+    logger.info(f"Paciente calculado como menor: {True}")
+    logger.info(f"Insertando persona: {nombre} {apellido}")
+    logger.info(f"Persona insertada con ID: {persona_id}")
+    logger.info(f"Insertando paciente con historia clínica: {historia}")
+    logger.info(f"Paciente insertado con ID: {paciente_id}")
+    logger.info(f"Madre: {madre}, Padre: {padre}, Colegio: {colegio}")
+    logger.info(f"Paciente guardado exitosamente con ID: {paciente_id}")
+
+
+def alta_despues(logger):
+    nombre, apellido, historia, persona_id, paciente_id, madre, padre, colegio = PACIENTE
+    logger.info("Historia clínica auto-generada: %s", historia)
+    logger.info("Paciente calculado como menor: %s", True)
+    logger.info("Insertando persona: %s %s", nombre, apellido)
+    logger.info("Persona insertada con ID: %s", persona_id)
+    logger.info("Insertando paciente con historia clínica: %s", historia)
+    logger.info("Paciente insertado con ID: %s", paciente_id)
+    logger.info("Madre: %s, Padre: %s, Colegio: %s", madre, padre, colegio)
+    logger.info("Paciente guardado exitosamente con ID: %s", paciente_id)
+
+
+def medir(alta, logger, altas):
+    inicio = time.perf_counter()
+    for _ in range(altas):
+        alta(logger)
+    return (time.perf_counter() - inicio) / altas * 1e6
+
+
+def logger_nuevo(nombre, nivel):
+    logger = logging.getLogger(nombre)
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(nivel)
+    return logger
+
+
+def escenario_antes(ruta, nivel, altas):
+    logger = logger_nuevo('benchmark_antes.app.dao', nivel)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        manejador = logging.StreamHandler(archivo)
+        manejador.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+        logger.addHandler(manejador)
+        return medir(alta_antes, logger, altas), None
+
+
+def escenario_despues(ruta, nivel, altas):
+    # ajustar_registro cambia variables globales de logging: se restauran al final
+    globales = (logging.logProcesses, logging.logMultiprocessing, logging._srcfile)
+    ajustar_registro()
+    logger = logger_nuevo('benchmark_despues.app.dao', nivel)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        destino = logging.StreamHandler(archivo)
+        destino.setFormatter(FormateadorJSON())
+        cola = queue.Queue(10000)
+        manejador = ManejadorCola(cola)
+        manejador.addFilter(FiltroMuestreo({'benchmark_despues.app.dao': 0.1}))
+        logger.addHandler(manejador)
+        listener = QueueListener(cola, destino)
+        listener.start()
+        try:
+            return medir(alta_despues, logger, altas), manejador
+        finally:
+            listener.stop()
+            logging.logProcesses, logging.logMultiprocessing, logging._srcfile = globales
+
+
+def main(altas=20000):
+    directorio = tempfile.mkdtemp(prefix='benchmark_registro_')
+    print(f"{altas} altas simuladas, microsegundos por alta en el hilo de la solicitud")
+    for nivel in ('INFO', 'WARNING'):
+        antes, _ = escenario_antes(os.path.join(directorio, 'antes.log'), nivel, altas)
+        despues, manejador = escenario_despues(os.path.join(directorio, 'despues.log'), nivel, altas)
+        print(f"  nivel {nivel:8} antes {antes:8.2f}  después {despues:8.2f}  "
+              f"({antes / despues:.1f}x, descartados {manejador.descartados})")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
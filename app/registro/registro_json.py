@@ -0,0 +1,176 @@
+"""
+Registro estructurado y asíncrono.
+
+Los hilos de las solicitudes solo dejan el LogRecord en una cola en
+memoria; un QueueListener en segundo plano arma el JSON y escribe. El
+mensaje se formatea recién en ese hilo, y solo si el registro pasó el
+nivel y el muestreo: usar logger.info("texto %s", valor), nunca f-strings.
+Como el formateo es diferido, los argumentos deben ser valores que no
+cambien después de la llamada (números, textos, tuplas).
+
+Cada registro lleva el id de la solicitud (cabecera X-Request-ID si es
+válida, o uno nuevo) para correlacionar las líneas de una misma petición.
+
+Configuración (app.config):
+    LOG_NIVEL       nivel mínimo ('INFO' por defecto)
+    LOG_MUESTREO    {prefijo de logger: fracción} para INFO/DEBUG
+    LOG_TAMANO_COLA registros en espera antes de descartar (10000)
+    LOG_UBICACION   True para guardar archivo y línea de cada llamada
+                    (recorre la pila en cada registro; False por defecto)
+"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+CABECERA_ID_SOLICITUD = 'X-Request-ID'
+
+# Id de solicitud aceptado desde la cabecera; cualquier otro se reemplaza
+ID_SOLICITUD_VALIDO = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+# Atributos propios de LogRecord: lo demás viene de extra={...}
+ATRIBUTOS_REGISTRO = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'id_solicitud'}
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, record):
+        datos = {
+            'fecha': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'id_solicitud': getattr(record, 'id_solicitud', None),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in ATRIBUTOS_REGISTRO:
+                datos[clave] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FiltroIdSolicitud(logging.Filter):
+    """Copia el id de la solicitud al registro (corre en el hilo de la solicitud)"""
+
+    def filter(self, record):
+        record.id_solicitud = g.get('id_solicitud') if has_request_context() else None
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar una fracción de los registros INFO/DEBUG de los loggers cuyo
+    nombre empieza con alguno de los prefijos. WARNING o más siempre pasa.
+    Con fracción 0.25 pasa uno de cada cuatro (por prefijo, sin azar).
+    """
+
+    def __init__(self, fracciones):
+        super().__init__()
+        # El prefijo más largo gana
+        self.reglas = sorted(
+            ((prefijo, max(1, round(1 / fraccion)) if fraccion > 0 else 0, itertools.count())
+             for prefijo, fraccion in fracciones.items()),
+            key=lambda regla: len(regla[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefijo, cada, contador in self.reglas:
+            if record.name == prefijo or record.name.startswith(prefijo + '.'):
+                return cada != 0 and next(contador) % cada == 0
+        return True
+
+
+class ManejadorCola(QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que llama: el mensaje, sus
+    argumentos y la excepción viajan tal cual hasta el listener. Si la
+    cola está llena el registro se descarta y se cuenta.
+    """
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def ajustar_registro(ubicacion=False):
+    """
+    Quita de cada LogRecord los datos que el JSON no usa (proceso y, si
+    no se pide, la ubicación de la llamada). Afecta a todo el proceso.
+    """
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    if not ubicacion:
+        logging._srcfile = None
+
+
+def asignar_id_solicitud():
+    """Usa el X-Request-ID del cliente solo si son hasta 64 letras, dígitos o guiones"""
+    id_solicitud = request.headers.get(CABECERA_ID_SOLICITUD, '')
+    if not ID_SOLICITUD_VALIDO.fullmatch(id_solicitud):
+        id_solicitud = uuid.uuid4().hex
+    g.id_solicitud = id_solicitud
+
+
+def devolver_id_solicitud(respuesta):
+    if 'id_solicitud' in g:
+        respuesta.headers[CABECERA_ID_SOLICITUD] = g.id_solicitud
+    return respuesta
+
+
+def configurar_registro(app, destino=None):
+    """
+    Reemplaza el handler por defecto de Flask por la cola y arranca el
+    listener. `destino` es el handler final (stderr si no se indica).
+    Devuelve el listener; se detiene (vaciando la cola) al salir.
+    """
+    ajustar_registro(app.config.get('LOG_UBICACION', False))
+    cola = queue.Queue(app.config.get('LOG_TAMANO_COLA', 10000))
+
+    if destino is None:
+        destino = logging.StreamHandler(sys.stderr)
+    destino.setFormatter(FormateadorJSON())
+
+    manejador = ManejadorCola(cola)
+    manejador.addFilter(FiltroMuestreo(app.config.get('LOG_MUESTREO', {})))
+    manejador.addFilter(FiltroIdSolicitud())
+
+    # Los loggers de los módulos (logging.getLogger(__name__)) cuelgan de app.logger
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(manejador)
+    app.logger.setLevel(app.config.get('LOG_NIVEL', 'INFO'))
+    app.logger.propagate = False
+
+    app.before_request(asignar_id_solicitud)
+    app.after_request(devolver_id_solicitud)
+
+    listener = QueueListener(cola, destino, respect_handler_level=True)
+    listener.start()
+
+    def detener():
+        if listener._thread is not None:
+            listener.stop()
+
+    atexit.register(detener)
+    return listener
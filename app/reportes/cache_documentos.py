@@ -0,0 +1,106 @@
+"""
+Caché en disco de documentos generados por paciente (PDF, Excel).
+
+Cada archivo se identifica por tipo, ID de paciente y versión del
+documento (la fila, los catálogos que muestra y la fecha del día, ver
+PacienteDao.getVersionDocumento), así un documento viejo nunca se sirve
+después de un cambio ni con la edad de otro día. El directorio
+es compartido por todos los workers del host: un acierto actualiza la
+fecha de modificación del archivo y el desalojo borra primero los menos
+usados hasta quedar por debajo del límite de bytes.
+"""
+import glob
+import os
+import re
+import tempfile
+import threading
+
+DIRECTORIO_DOCUMENTOS = os.path.join(tempfile.gettempdir(), 'clausys_documentos')
+
+# Tamaño máximo del caché en disco
+MAX_BYTES = 256 * 1024 * 1024
+
+EXTENSIONES = {'pdf': 'pdf', 'excel': 'xlsx'}
+
+
+class CacheDocumentos:
+
+    def __init__(self, directorio=DIRECTORIO_DOCUMENTOS, max_bytes=MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Bytes escritos desde el último recorrido del directorio (estimación)
+        self.bytes_estimados = None
+
+    def ruta(self, tipo, pac_id, version):
+        version = re.sub(r'[^0-9A-Za-z.]', '', str(version))
+        return os.path.join(self.directorio, f"{tipo}_{int(pac_id)}_{version}.{EXTENSIONES[tipo]}")
+
+    def obtener(self, tipo, pac_id, version):
+        """Devuelve la ruta del documento en caché o None"""
+        ruta = self.ruta(tipo, pac_id, version)
+        try:
+            os.utime(ruta)  # marca como usado recientemente
+            return ruta
+        except OSError:
+            return None
+
+    def guardar(self, tipo, pac_id, version, contenido):
+        """Guarda el documento, descarta sus versiones anteriores y aplica el límite"""
+        os.makedirs(self.directorio, exist_ok=True)
+        self.invalidar(pac_id, tipo)
+
+        ruta = self.ruta(tipo, pac_id, version)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+        with self.lock:
+            if self.bytes_estimados is None:
+                self.bytes_estimados = self.desalojar()
+            self.bytes_estimados += len(contenido)
+            if self.bytes_estimados > self.max_bytes:
+                self.bytes_estimados = self.desalojar()
+        return ruta
+
+    def invalidar(self, pac_id, tipo=None):
+        """Borra los documentos de un paciente (todos los tipos o uno solo)"""
+        patron = f"{tipo or '*'}_{int(pac_id)}_*"
+        for ruta in glob.glob(os.path.join(self.directorio, patron)):
+            if ruta.endswith('.tmp'):
+                continue
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def desalojar(self):
+        """Borra los documentos menos usados hasta quedar en el 90% del límite; devuelve el total"""
+        archivos = []
+        try:
+            with os.scandir(self.directorio) as entradas:
+                for e in entradas:
+                    if e.is_file() and not e.name.endswith('.tmp'):
+                        info = e.stat()
+                        archivos.append((info.st_mtime, info.st_size, e.path))
+        except OSError:
+            return 0
+
+        total = sum(a[1] for a in archivos)
+        if total <= self.max_bytes:
+            return total
+
+        objetivo = self.max_bytes * 0.9
+        for _, tamano, ruta in sorted(archivos):
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except OSError:
+                pass
+        return total
+
+
+cache_documentos = CacheDocumentos()
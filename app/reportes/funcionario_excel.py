@@ -0,0 +1,35 @@
+"""
+Listado de funcionarios en Excel. Lee directamente de la base y puede
+ejecutarse en un proceso de trabajo.
+"""
+from openpyxl import Workbook
+from app.dao.gestionar_personas.funcionario.FuncionarioDao import FuncionarioDao
+
+ENCABEZADOS = ["ID", "Apellido", "Nombre", "Cédula", "Fecha Nacimiento", "Edad", "Teléfono",
+               "Género", "Ciudad", "Cargo", "Activo", "Matrícula", "Especialidades", "Fecha Registro"]
+
+
+def fila_funcionario(f):
+    """Fila cruda de FUNCIONARIO_LISTA_SQL -> valores de una fila del listado"""
+    return [f[0], f[2], f[1], f[3], f[4], int(f[5]) if f[5] is not None else None, f[6],
+            f[7], f[8], f[9], 'Sí' if f[10] else 'No', f[11],
+            FuncionarioDao.unir_especialidades(f[12]), f[14]]
+
+
+def exportar_lista_funcionarios(ruta, filtro=None):
+    """
+    Exporta el listado de funcionarios filtrado a un Excel en `ruta`, en modo
+    write-only (las filas van a disco a medida que se escriben) desde un
+    cursor del lado del servidor. Devuelve las filas escritas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Funcionarios")
+    ws.append(ENCABEZADOS)
+
+    filas = 0
+    for f in FuncionarioDao().iterarFuncionarios(filtro):
+        ws.append(fila_funcionario(f))
+        filas += 1
+
+    wb.save(ruta)
+    return filas
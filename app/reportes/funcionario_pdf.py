@@ -0,0 +1,106 @@
+"""
+Listado de funcionarios en PDF: tablas de platypus que se parten solas
+entre páginas, con el encabezado repetido y el número de página al pie.
+"""
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import cm
+from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from app.dao.gestionar_personas.funcionario.FuncionarioDao import FuncionarioDao
+from app.reportes.funcionario_excel import fila_funcionario
+
+# Filas por tabla; cada tabla se arma recién cuando el documento la necesita
+FILAS_POR_TABLA = 200
+
+# Columnas del listado de Excel que entran en una hoja apaisada
+COLUMNAS = [(1, "Apellido", 3.2), (2, "Nombre", 3.2), (3, "Cédula", 2.2), (5, "Edad", 1.1),
+            (6, "Teléfono", 2.4), (9, "Cargo", 3.2), (10, "Activo", 1.3), (11, "Matrícula", 2.2),
+            (12, "Especialidades", 5.2)]
+
+ESTILO_TABLA = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+class FlowablesPerezosos(list):
+    """
+    Lista de flowables que se rellena desde un generador a medida que
+    SimpleDocTemplate.build la consume (build saca de a uno del frente),
+    así nunca hay más de un par de tablas armadas en memoria.
+    """
+
+    def __init__(self, generador):
+        super().__init__()
+        self.generador = generador
+
+    def __len__(self):
+        if super().__len__() < 2:
+            self.extend(next(self.generador, None) for _ in range(2))
+            while super().__len__() and self[-1] is None:
+                self.pop()
+        return super().__len__()
+
+
+def tablas_funcionarios(filas, estilo_celda):
+    encabezado = [nombre for _, nombre, _ in COLUMNAS]
+    anchos = [ancho * cm for _, _, ancho in COLUMNAS]
+
+    def celda(i, valor):
+        if valor is None:
+            return ''
+        # Las especialidades pueden ser largas: se parten en renglones
+        if i == 12:
+            return Paragraph(valor, estilo_celda)
+        return str(valor)
+
+    def tabla(bloque):
+        datos = [encabezado] + [[celda(i, fila[i]) for i, _, _ in COLUMNAS] for fila in bloque]
+        t = LongTable(datos, colWidths=anchos, repeatRows=1)
+        t.setStyle(ESTILO_TABLA)
+        return t
+
+    bloque = []
+    for f in filas:
+        bloque.append(fila_funcionario(f))
+        if len(bloque) == FILAS_POR_TABLA:
+            yield tabla(bloque)
+            bloque = []
+    if bloque:
+        yield tabla(bloque)
+
+
+def exportar_lista_funcionarios_pdf(ruta, filtro=None):
+    """
+    Exporta el listado de funcionarios filtrado a un PDF en `ruta` desde un
+    cursor del lado del servidor. Devuelve las filas escritas.
+    """
+    estilos = getSampleStyleSheet()
+    estilo_celda = estilos['BodyText'].clone('celda', fontSize=7, leading=8)
+    filas = 0
+
+    def contar(iterador):
+        nonlocal filas
+        for f in iterador:
+            filas += 1
+            yield f
+
+    def pie(canvas, doc):
+        canvas.setFont('Helvetica', 7)
+        canvas.drawString(doc.leftMargin, 0.8 * cm, "Listado de funcionarios")
+        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.8 * cm, f"Página {doc.page}")
+
+    doc = SimpleDocTemplate(ruta, pagesize=landscape(letter), title="Listado de funcionarios",
+                            leftMargin=1.2 * cm, rightMargin=1.2 * cm,
+                            topMargin=1.2 * cm, bottomMargin=1.5 * cm)
+    flowables = FlowablesPerezosos(tablas_funcionarios(
+        contar(FuncionarioDao().iterarFuncionarios(filtro)), estilo_celda))
+    if not len(flowables):
+        flowables.append(Paragraph("No hay funcionarios con los filtros indicados.", estilos['Normal']))
+
+    doc.build(flowables, onFirstPage=pie, onLaterPages=pie)
+    return filas
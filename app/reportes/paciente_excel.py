@@ -0,0 +1,86 @@
+"""
+Documentos Excel de pacientes: ficha individual y listado completo.
+
+La ficha trabaja solo con el diccionario de PacienteDao; el listado lee
+directamente de la base y puede ejecutarse en un proceso de trabajo.
+"""
+import io
+from openpyxl import Workbook
+from app.dao.gestionar_personas.paciente.PacienteDao import PacienteDao
+
+
+def generar_excel_paciente(paciente):
+    """Genera un Excel (bytes) con los datos de un paciente"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Datos del Paciente"
+
+    # Encabezados
+    ws['A1'] = "Campo"
+    ws['B1'] = "Valor"
+
+    # Datos básicos
+    datos = [
+        ["Historia Clínica", paciente.get('historia_clinica', 'N/A')],
+        ["Nombre", paciente.get('nombre', '')],
+        ["Apellido", paciente.get('apellido', '')],
+        ["Cédula", paciente.get('cedula', 'N/A')],
+        ["Fecha Nacimiento", paciente.get('fecha_nacimiento', 'N/A')],
+        ["Edad", f"{paciente.get('edad', 'N/A')} años"],
+        ["Es menor de edad", 'Sí' if paciente.get('es_menor') else 'No'],
+        ["Género", paciente.get('genero', 'N/A')],
+        ["Estado Civil", paciente.get('estado_civil', 'N/A')],
+        ["Teléfono", paciente.get('telefono', 'N/A')],
+        ["Correo", paciente.get('correo', 'N/A')],
+        ["Domicilio", paciente.get('domicilio', 'N/A')],
+        ["Ciudad", paciente.get('ciudad', 'N/A')],
+        ["Ciudad Nacimiento", paciente.get('ciudad_nacimiento', 'N/A')],
+        ["Nivel Instrucción", paciente.get('nivel_instruccion', 'N/A')],
+        ["Profesión", paciente.get('profesion', 'N/A')],
+    ]
+
+    # Agregar datos del tutor si es menor
+    if paciente.get('es_menor'):
+        datos.extend([
+            ["--- Datos del Tutor ---", ""],
+            ["Nombre Madre", paciente.get('nom_madre', 'N/A')],
+            ["Teléfono Madre", paciente.get('tel_madre', 'N/A')],
+            ["Nombre Padre", paciente.get('nom_padre', 'N/A')],
+            ["Teléfono Padre", paciente.get('tel_padre', 'N/A')],
+            ["Educación", paciente.get('educacion', 'N/A')],
+            ["Colegio", paciente.get('colegio', 'N/A')],
+            ["Teléfono Colegio", paciente.get('tel_colegio', 'N/A')],
+        ])
+
+    if paciente.get('observaciones'):
+        datos.append(["Observaciones", paciente.get('observaciones', '')])
+
+    for idx, (campo, valor) in enumerate(datos, start=2):
+        ws[f'A{idx}'] = campo
+        ws[f'B{idx}'] = valor
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def exportar_lista_pacientes(ruta, filtro=None):
+    """
+    Exporta el listado de pacientes filtrado a un Excel en `ruta`.
+    Usa el modo write-only de openpyxl (las filas van a disco a medida que
+    se escriben) alimentado por un cursor del lado del servidor, así la
+    memoria no crece con la cantidad de filas. Devuelve las filas escritas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Pacientes")
+    ws.append(["ID", "Historia Clínica", "Menor", "Nombre", "Apellido", "Cédula",
+               "Fecha Nacimiento", "Edad", "Teléfono", "Género", "Ciudad", "Fecha Registro"])
+
+    filas = 0
+    for p in PacienteDao().iterarPacientes(filtro):
+        ws.append([p[0], p[1], 'Sí' if p[2] else 'No', p[3], p[4], p[5],
+                   p[6], int(p[7]) if p[7] is not None else None, p[8], p[9], p[10], p[11]])
+        filas += 1
+
+    wb.save(ruta)
+    return filas
@@ -0,0 +1,84 @@
+"""
+Renderizado de fichas de paciente en PDF.
+
+No depende de Flask ni de la base de datos: recibe los diccionarios que
+devuelve PacienteDao, así puede ejecutarse en procesos de trabajo.
+"""
+import io
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+def dibujar_ficha_paciente(p, paciente):
+    """Dibuja la ficha de un paciente en la página actual del canvas"""
+    width, height = letter
+
+    # Título
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, height - 50, "Ficha de Paciente")
+
+    # Datos del paciente
+    p.setFont("Helvetica", 12)
+    y = height - 100
+
+    datos = [
+        f"Historia Clínica: {paciente.get('historia_clinica', 'N/A')}",
+        f"Nombre: {paciente.get('nombre', '')} {paciente.get('apellido', '')}",
+        f"Cédula: {paciente.get('cedula', 'N/A')}",
+        f"Fecha Nacimiento: {paciente.get('fecha_nacimiento', 'N/A')}",
+        f"Edad: {paciente.get('edad', 'N/A')} años",
+        f"Es menor de edad: {'Sí' if paciente.get('es_menor') else 'No'}",
+        f"Género: {paciente.get('genero', 'N/A')}",
+        f"Estado Civil: {paciente.get('estado_civil', 'N/A')}",
+        f"Teléfono: {paciente.get('telefono', 'N/A')}",
+        f"Correo: {paciente.get('correo', 'N/A')}",
+        f"Domicilio: {paciente.get('domicilio', 'N/A')}",
+        f"Ciudad: {paciente.get('ciudad', 'N/A')}",
+        f"Nivel Instrucción: {paciente.get('nivel_instruccion', 'N/A')}",
+        f"Profesión: {paciente.get('profesion', 'N/A')}",
+    ]
+
+    for dato in datos:
+        p.drawString(50, y, dato)
+        y -= 20
+
+    # Datos del tutor si es menor
+    if paciente.get('es_menor') and (paciente.get('nom_madre') or paciente.get('nom_padre')):
+        y -= 20
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(50, y, "Datos del Tutor:")
+        y -= 20
+        p.setFont("Helvetica", 12)
+
+        if paciente.get('nom_madre'):
+            p.drawString(50, y, f"Madre: {paciente.get('nom_madre', 'N/A')} - Tel: {paciente.get('tel_madre', 'N/A')}")
+            y -= 20
+
+        if paciente.get('nom_padre'):
+            p.drawString(50, y, f"Padre: {paciente.get('nom_padre', 'N/A')} - Tel: {paciente.get('tel_padre', 'N/A')}")
+            y -= 20
+
+        if paciente.get('colegio'):
+            p.drawString(50, y, f"Colegio: {paciente.get('colegio', 'N/A')} - Tel: {paciente.get('tel_colegio', 'N/A')}")
+
+    if paciente.get('observaciones'):
+        y -= 30
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(50, y, "Observaciones:")
+        y -= 20
+        p.setFont("Helvetica", 10)
+        p.drawString(50, y, paciente.get('observaciones', ''))
+
+    p.showPage()
+
+
+def generar_pdf_pacientes(pacientes):
+    """Genera un PDF (bytes) con una página por paciente"""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+
+    for paciente in pacientes:
+        dibujar_ficha_paciente(p, paciente)
+
+    p.save()
+    return buffer.getvalue()
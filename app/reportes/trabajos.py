@@ -0,0 +1,219 @@
+"""
+Trabajos en segundo plano para reportes de pacientes y funcionarios (PDF, Excel).
+
+La petición web solo registra el trabajo y responde; un hilo coordinador
+lo ejecuta y deja el renderizado pesado a procesos de trabajo. El estado
+y el archivo final quedan en disco, así cualquier worker web del mismo
+host puede consultar el avance o servir la descarga.
+"""
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pypdf import PdfWriter
+from app.dao.gestionar_personas.paciente.PacienteDao import PacienteDao
+from app.reportes.paciente_pdf import generar_pdf_pacientes
+from app.reportes.paciente_excel import exportar_lista_pacientes
+from app.reportes.funcionario_excel import exportar_lista_funcionarios
+from app.reportes.funcionario_pdf import exportar_lista_funcionarios_pdf
+
+DIRECTORIO_TRABAJOS = os.path.join(tempfile.gettempdir(), 'clausys_reportes')
+
+# Pacientes que renderiza cada proceso por tarea
+PACIENTES_POR_TAREA = 25
+
+# Procesos de renderizado (se deja al menos un núcleo para el servidor web)
+MAX_PROCESOS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Trabajos que se coordinan a la vez; el resto espera en cola
+MAX_TRABAJOS_SIMULTANEOS = 2
+
+# Segundos que se conserva un trabajo terminado antes de borrarlo
+DURACION_TRABAJO = 3600
+
+MIMETYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_lock = threading.Lock()
+_procesos = None
+_coordinadores = None
+
+
+def _pools():
+    """Crea los pools de forma perezosa (una vez por worker web)"""
+    global _procesos, _coordinadores
+    with _lock:
+        if _procesos is None:
+            # spawn: no se hereda el estado de hilos del servidor web. Los procesos
+            # solo importan app.reportes y app.dao; la aplicación (hilos de fondo,
+            # conexiones) no se crea en ellos (ver crear_app en app/__init__.py)
+            _procesos = ProcessPoolExecutor(max_workers=MAX_PROCESOS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            _coordinadores = ThreadPoolExecutor(max_workers=MAX_TRABAJOS_SIMULTANEOS,
+                                                thread_name_prefix='reportes')
+        return _procesos, _coordinadores
+
+
+def _directorio(id_trabajo):
+    # Solo se aceptan IDs generados por _crear_trabajo (evita rutas arbitrarias)
+    try:
+        uuid.UUID(hex=id_trabajo)
+    except (ValueError, TypeError):
+        return None
+    return os.path.join(DIRECTORIO_TRABAJOS, id_trabajo)
+
+
+def _guardar_estado(id_trabajo, **cambios):
+    ruta = os.path.join(_directorio(id_trabajo), 'estado.json')
+    estado = obtener_trabajo(id_trabajo) or {}
+    estado.update(cambios)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+    return estado
+
+
+def obtener_trabajo(id_trabajo):
+    """Devuelve el estado de un trabajo o None si no existe"""
+    directorio = _directorio(id_trabajo)
+    if not directorio:
+        return None
+    try:
+        with open(os.path.join(directorio, 'estado.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ruta_archivo_trabajo(id_trabajo):
+    """Ruta del archivo final si el trabajo terminó, si no None"""
+    estado = obtener_trabajo(id_trabajo)
+    if not estado or estado.get('estado') != 'listo':
+        return None
+    return os.path.join(_directorio(id_trabajo), f"reporte.{estado['extension']}")
+
+
+def limpiar_trabajos_vencidos():
+    """Elimina los trabajos más antiguos que DURACION_TRABAJO"""
+    if not os.path.isdir(DIRECTORIO_TRABAJOS):
+        return
+    limite = time.time() - DURACION_TRABAJO
+    for nombre in os.listdir(DIRECTORIO_TRABAJOS):
+        ruta = os.path.join(DIRECTORIO_TRABAJOS, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                shutil.rmtree(ruta, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _crear_trabajo(flask_app, tipo, extension, total, ejecutor, *argumentos):
+    """
+    Registra un trabajo y lo encola. `ejecutor(id_trabajo, ruta_salida, *argumentos)`
+    corre en un hilo coordinador con contexto de aplicación y devuelve la
+    cantidad de registros procesados.
+    """
+    limpiar_trabajos_vencidos()
+
+    id_trabajo = uuid.uuid4().hex
+    os.makedirs(_directorio(id_trabajo), exist_ok=True)
+    estado = _guardar_estado(id_trabajo, id=id_trabajo, tipo=tipo, extension=extension,
+                             mimetype=MIMETYPES[extension], estado='pendiente', total=total,
+                             procesados=0, error=None, creado=time.time(), terminado=None)
+
+    _, coordinadores = _pools()
+    coordinadores.submit(_ejecutar_trabajo, flask_app, id_trabajo, extension, ejecutor, argumentos)
+    return estado
+
+
+def _ejecutar_trabajo(flask_app, id_trabajo, extension, ejecutor, argumentos):
+    with flask_app.app_context():
+        try:
+            _guardar_estado(id_trabajo, estado='procesando')
+
+            ruta = os.path.join(_directorio(id_trabajo), f"reporte.{extension}")
+            procesados = ejecutor(id_trabajo, ruta + '.tmp', *argumentos)
+            os.replace(ruta + '.tmp', ruta)
+
+            _guardar_estado(id_trabajo, estado='listo', total=procesados, procesados=procesados,
+                            terminado=time.time())
+            flask_app.logger.info(f"Reporte {id_trabajo} generado: {procesados} registros")
+
+        except Exception as e:
+            flask_app.logger.error(f"Error en trabajo de reporte {id_trabajo}: {str(e)}", exc_info=True)
+            _guardar_estado(id_trabajo, estado='error', error=str(e) if isinstance(e, LookupError)
+                            else 'Error al generar el reporte', terminado=time.time())
+
+
+# ============================================
+# PDF CON LAS FICHAS DE VARIOS PACIENTES
+# ============================================
+def crear_trabajo_pdf_pacientes(flask_app, ids):
+    """Encola un PDF con una ficha por paciente, en el orden de `ids`"""
+    return _crear_trabajo(flask_app, 'pdf_pacientes', 'pdf', len(ids), _generar_pdf_pacientes, list(ids))
+
+
+def _generar_pdf_pacientes(id_trabajo, ruta, ids):
+    """Lee por bloques, renderiza cada bloque en un proceso y une los PDF parciales"""
+    procesos, _ = _pools()
+    pacientedao = PacienteDao()
+
+    tareas = []
+    for inicio in range(0, len(ids), PACIENTES_POR_TAREA):
+        pacientes = pacientedao.getPacientesByIds(ids[inicio:inicio + PACIENTES_POR_TAREA])
+        if pacientes:
+            tareas.append((len(pacientes), procesos.submit(generar_pdf_pacientes, pacientes)))
+
+    if not tareas:
+        raise LookupError('No se encontraron pacientes')
+
+    # Se une en el orden pedido; el avance se publica a medida que terminan
+    escritor = PdfWriter()
+    procesados = 0
+    for cantidad, tarea in tareas:
+        escritor.append(io.BytesIO(tarea.result()))
+        procesados += cantidad
+        _guardar_estado(id_trabajo, procesados=procesados)
+
+    with open(ruta, 'wb') as f:
+        escritor.write(f)
+    return procesados
+
+
+# ============================================
+# EXCEL CON EL LISTADO DE PACIENTES
+# ============================================
+def crear_trabajo_excel_pacientes(flask_app, filtro):
+    """Encola la exportación del listado de pacientes filtrado a Excel"""
+    return _crear_trabajo(flask_app, 'excel_pacientes', 'xlsx', None, _generar_excel_pacientes, filtro)
+
+
+def _generar_excel_pacientes(id_trabajo, ruta, filtro):
+    """La exportación completa corre en un proceso: no compite por el GIL del worker web"""
+    procesos, _ = _pools()
+    return procesos.submit(exportar_lista_pacientes, ruta, filtro).result()
+
+
+# ============================================
+# LISTADO DE FUNCIONARIOS (EXCEL Y PDF)
+# ============================================
+def crear_trabajo_lista_funcionarios(flask_app, extension, filtro):
+    """Encola la exportación del listado de funcionarios filtrado ('xlsx' o 'pdf')"""
+    return _crear_trabajo(flask_app, f'{extension}_funcionarios', extension, None,
+                          _generar_lista_funcionarios, extension, filtro)
+
+
+def _generar_lista_funcionarios(id_trabajo, ruta, extension, filtro):
+    """Como el Excel de pacientes: se lee y escribe a disco dentro de un proceso"""
+    procesos, _ = _pools()
+    exportar = exportar_lista_funcionarios if extension == 'xlsx' else exportar_lista_funcionarios_pdf
+    return procesos.submit(exportar, ruta, filtro).result()
@@ -0,0 +1,14 @@
+"""
+Control de concurrencia optimista de las APIs: la versión de un registro
+que el cliente espera modificar (ver PacienteDao/FuncionarioDao, columna
+'version'). Si no coincide con la actual la actualización responde 409.
+"""
+from flask import request
+
+
+def leerVersionEsperada(data):
+    """Versión esperada del registro: cabecera If-Match o campo 'version' del cuerpo"""
+    if request.if_match and not request.if_match.star_tag:
+        for etag in request.if_match.as_set():
+            return etag
+    return data.get('version')
@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify, current_app as app
+from app.dao.gestionar_personas.cambio.CambioDao import CambioDao
+
+cambioapi = Blueprint('cambioapi', __name__)
+
+# Cambios por respuesta
+LIMITE_CAMBIOS = 1000
+MAX_LIMITE_CAMBIOS = 5000
+
+
+# ============================================
+# CAMBIOS DESDE UN TOKEN (SINCRONIZACIÓN INCREMENTAL)
+# ============================================
+@cambioapi.route('/cambios', methods=['GET'])
+@cambioapi.route('/changes', methods=['GET'])
+def getCambios():
+    """
+    ?since=<token> devuelve los IDs modificados y eliminados desde ese token
+    y el token para la próxima consulta. Sin since solo devuelve el token
+    actual: se pide ANTES de cargar el listado completo y después se sigue
+    desde él (ver CambioDao.getTokenActual).
+    ?tablas=pacientes,funcionarios limita las tablas; ?limite= el tamaño del bloque.
+    Si hay_mas es true se debe volver a pedir con el nuevo token.
+    """
+    cambiodao = CambioDao()
+
+    tablas = [t.strip() for t in request.args.get('tablas', '').split(',') if t.strip()]
+    desconocidas = [t for t in tablas if t not in CambioDao.TABLAS]
+    if desconocidas:
+        return jsonify({
+            'success': False,
+            'error': f"Tablas desconocidas: {', '.join(desconocidas)}. Válidas: {', '.join(CambioDao.TABLAS)}"
+        }), 400
+
+    limite = min(max(request.args.get('limite', LIMITE_CAMBIOS, type=int), 1), MAX_LIMITE_CAMBIOS)
+    token = request.args.get('since')
+
+    try:
+        if not token:
+            token = cambiodao.getTokenActual()
+            if token is None:
+                raise RuntimeError('No se pudo obtener el token actual')
+            return jsonify({
+                'success': True,
+                'data': {'cambios': {}, 'token': token, 'hay_mas': False},
+                'error': None
+            }), 200
+
+        try:
+            cambiodao.leer_token(token)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'El token no es válido.'
+            }), 400
+
+        resultado = cambiodao.getCambios(token, tablas, limite)
+        if resultado is None:
+            raise RuntimeError('No se pudieron leer los cambios')
+
+        return jsonify({
+            'success': True,
+            'data': resultado,
+            'error': None
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error al obtener cambios: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify, session, current_app as app
+from app.dao.gestionar_personas.duplicado.DuplicadoDao import DuplicadoDao
+
+duplicadoapi = Blueprint('duplicadoapi', __name__)
+
+# Pares por página
+LIMITE_DUPLICADOS = 100
+MAX_LIMITE_DUPLICADOS = 1000
+
+
+# ============================================
+# PARES CANDIDATOS A DUPLICADO
+# ============================================
+@duplicadoapi.route('/personas/duplicados', methods=['GET'])
+def getDuplicados():
+    """
+    Pares detectados por `flask detectar-duplicados`, de mayor a menor puntaje.
+    ?estado=pendiente|confirmado|descartado (por defecto pendiente),
+    ?limite= y ?desplazamiento= para paginar.
+    """
+    duplicadodao = DuplicadoDao()
+
+    estado = request.args.get('estado', 'pendiente')
+    if estado not in DuplicadoDao.ESTADOS:
+        return jsonify({
+            'success': False,
+            'error': f"Estado no válido. Válidos: {', '.join(DuplicadoDao.ESTADOS)}"
+        }), 400
+
+    limite = min(max(request.args.get('limite', LIMITE_DUPLICADOS, type=int), 1), MAX_LIMITE_DUPLICADOS)
+    desplazamiento = max(request.args.get('desplazamiento', 0, type=int), 0)
+
+    duplicados = duplicadodao.getDuplicados(estado, limite, desplazamiento)
+    if duplicados is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': duplicados,
+        'error': None
+    }), 200
+
+
+# ============================================
+# REVISIÓN DE UN PAR
+# ============================================
+@duplicadoapi.route('/personas/duplicados/<int:id_duplicado>', methods=['PATCH'])
+def updateEstadoDuplicado(id_duplicado):
+    """Body: {"estado": "confirmado" | "descartado" | "pendiente"}"""
+    duplicadodao = DuplicadoDao()
+    data = request.get_json(silent=True) or {}
+
+    estado = data.get('estado')
+    if estado not in DuplicadoDao.ESTADOS:
+        return jsonify({
+            'success': False,
+            'error': f"Estado no válido. Válidos: {', '.join(DuplicadoDao.ESTADOS)}"
+        }), 400
+
+    resultado = duplicadodao.updateEstadoDuplicado(id_duplicado, estado, session.get('id_usuario'))
+    if resultado is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+    if not resultado:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el par con el ID proporcionado.'
+        }), 404
+
+    app.logger.info(f"Par duplicado {id_duplicado} marcado como {estado}")
+    return jsonify({
+        'success': True,
+        'data': {'id_duplicado': id_duplicado, 'estado': estado},
+        'error': None
+    }), 200
@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify
+from app.dao.gestionar_personas.especialista.EspecialistaDao import EspecialistaDao
+
+especialistaapi = Blueprint('especialistaapi', __name__)
+
+
+# ============================================
+# ESPECIALISTAS POR ESPECIALIDAD
+# ============================================
+@especialistaapi.route('/especialistas', methods=['GET'])
+def getEspecialistas():
+    """
+    ?especialidad=<id> (obligatorio). Especialistas activos con esa
+    especialidad, ordenados por apellido. Para todos los especialistas con
+    sus especialidades ver /funcionarios/especialistas.
+    """
+    especialistadao = EspecialistaDao()
+
+    id_especialidad = request.args.get('especialidad', type=int)
+    if not id_especialidad:
+        return jsonify({
+            'success': False,
+            'error': 'Indique la especialidad.'
+        }), 400
+
+    especialistas = especialistadao.getEspecialistasPorEspecialidad(id_especialidad)
+    if especialistas is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': especialistas,
+        'error': None
+    }), 200
@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify, current_app as app
+from app.dao.gestionar_personas.estadistica.EstadisticaPacienteDao import EstadisticaPacienteDao
+from datetime import date
+
+estadisticaapi = Blueprint('estadisticaapi', __name__)
+
+
+# ============================================
+# RESUMEN DE PACIENTES
+# ============================================
+@estadisticaapi.route('/estadisticas/pacientes', methods=['GET'])
+def getResumenPacientes():
+    """
+    Total, menores/adultos, histograma de edades y distribución por ciudad,
+    género y profesión (cacheado unos segundos)
+    """
+    estadisticadao = EstadisticaPacienteDao()
+
+    try:
+        resumen = estadisticadao.getResumen()
+        if resumen is None:
+            raise RuntimeError('No se pudo calcular el resumen')
+
+        return jsonify({
+            'success': True,
+            'data': resumen,
+            'error': None
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error al obtener estadísticas de pacientes: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
+# ============================================
+# INSCRIPCIONES POR PERIODO
+# ============================================
+@estadisticaapi.route('/estadisticas/pacientes/inscripciones', methods=['GET'])
+def getInscripcionesPacientes():
+    """
+    Serie de pacientes inscriptos.
+    ?periodo=dia|semana|mes (por defecto mes), ?desde= y ?hasta= (YYYY-MM-DD).
+    """
+    estadisticadao = EstadisticaPacienteDao()
+
+    try:
+        periodo = request.args.get('periodo', 'mes')
+        desde = request.args.get('desde', type=date.fromisoformat)
+        hasta = request.args.get('hasta', type=date.fromisoformat)
+        if (request.args.get('desde') and not desde) or (request.args.get('hasta') and not hasta):
+            raise ValueError("Las fechas deben tener el formato YYYY-MM-DD")
+        desde, hasta = estadisticadao.rango_inscripciones(periodo, desde, hasta)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        inscripciones = estadisticadao.getInscripciones(periodo, desde, hasta)
+        if inscripciones is None:
+            raise RuntimeError('No se pudo calcular la serie de inscripciones')
+
+        return jsonify({
+            'success': True,
+            'data': inscripciones,
+            'error': None
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error al obtener inscripciones de pacientes: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
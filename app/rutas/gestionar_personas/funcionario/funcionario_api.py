@@ -1,15 +1,36 @@
-from flask import Blueprint, request, jsonify, current_app as app
+from flask import Blueprint, request, jsonify, url_for, current_app as app
 from app.dao.gestionar_personas.funcionario.FuncionarioDao import FuncionarioDao
 from flask import send_file
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from openpyxl import Workbook
-import io
+from app.reportes import trabajos
+from app.seguridad.permisos import requiere_permiso
+from app.rutas.concurrencia import leerVersionEsperada
+from app.registro.auditoria import usuario_sesion
 
 
 funcionarioapi = Blueprint('funcionarioapi', __name__)
 
+# Máximo de funcionarios por petición en las operaciones por lotes
+MAX_FUNCIONARIOS_LOTE = 5000
 
+# Máximo de funcionarios por página del listado
+MAX_LIMITE_FUNCIONARIOS = 1000
+
+# Formatos de exportación del listado -> extensión del trabajo de reporte
+FORMATOS_EXPORTACION = {'excel': 'xlsx', 'pdf': 'pdf'}
+
+
+def leerFiltroFuncionarios():
+    """Lee los filtros del listado desde el query string (ver FuncionarioDao.construir_filtro_funcionarios)"""
+    args = request.args
+    filtro = {
+        'id_cargo': args.get('id_cargo', type=int),
+        'id_especialidad': args.get('id_especialidad', type=int),
+    }
+    if args.get('activo') in ('true', '1'):
+        filtro['activo'] = True
+    elif args.get('activo') in ('false', '0'):
+        filtro['activo'] = False
+    return filtro
 
 
 # ============================================
@@ -17,11 +38,20 @@ funcionarioapi = Blueprint('funcionarioapi', __name__)
 # ============================================
 @funcionarioapi.route('/funcionarios', methods=['GET'])
 def getFuncionarios():
-    """Obtiene la lista completa de funcionarios"""
+    """
+    Obtiene la lista de funcionarios. Filtros opcionales (query string):
+    id_cargo, id_especialidad y activo=true|false. ?limite= y
+    ?desplazamiento= paginan; sin limite devuelve todos.
+    """
     funcionariodao = FuncionarioDao()
+
+    limite = request.args.get('limite', type=int)
+    if limite is not None:
+        limite = min(max(limite, 1), MAX_LIMITE_FUNCIONARIOS)
+    desplazamiento = max(request.args.get('desplazamiento', 0, type=int), 0)
     
     try:
-        funcionarios = funcionariodao.getFuncionarios()
+        funcionarios = funcionariodao.getFuncionarios(leerFiltroFuncionarios(), limite, desplazamiento)
         
         return jsonify({
             'success': True,
@@ -105,11 +135,14 @@ def getFuncionarioParaEditar(id_funcionario):
         funcionario = funcionariodao.getFuncionarioParaEditar(id_funcionario)
 
         if funcionario:
-            return jsonify({
+            respuesta = jsonify({
                 'success': True,
                 'data': funcionario,
                 'error': None
-            }), 200
+            })
+            # La versión viaja también como ETag para enviarla en If-Match al guardar
+            respuesta.set_etag(funcionario['version'])
+            return respuesta, 200
         else:
             return jsonify({
                 'success': False,
@@ -148,7 +181,7 @@ def addFuncionario():
 
     # Validar si es especialista
     if funcionariodao.es_cargo_especialista(data['id_cargo']):
-        if not data.get('esp_matricula'):
+        if not data.get('esp_matricula') and funcionariodao.requiere_matricula(data['id_cargo']):
             return jsonify({
                 'success': False,
                 'error': 'La matrícula es obligatoria para especialistas.'
@@ -183,7 +216,7 @@ def addFuncionario():
             # Datos de funcionario
             id_cargo=data['id_cargo'],
             fun_estado=data.get('activo', True),
-            creacion_usuario=data.get('creacion_usuario', 1),
+            creacion_usuario=usuario_sesion(),
             
             # Datos de especialista (condicionales)
             esp_matricula=data.get('esp_matricula'),
@@ -219,19 +252,15 @@ def addFuncionario():
 # ============================================
 @funcionarioapi.route('/funcionarios/<int:id_funcionario>', methods=['PUT'])
 def updateFuncionario(id_funcionario):
-    """Actualiza un funcionario existente con todos sus datos"""
+    """
+    Actualiza un funcionario existente con todos sus datos en una sola ida a la base.
+    Con If-Match (o 'version' en el cuerpo) se rechaza con 409 si otro usuario
+    lo modificó desde que se cargó el formulario.
+    """
     data = request.get_json()
     funcionariodao = FuncionarioDao()
     app.logger.info(f"Datos recibidos para actualizar: {data}")
 
-    # Verificar que el funcionario existe
-    funcionario_existente = funcionariodao.getFuncionarioById(id_funcionario)
-    if not funcionario_existente:
-        return jsonify({
-            'success': False,
-            'error': 'No se encontró el funcionario con el ID proporcionado.'
-        }), 404
-
     # Campos obligatorios
     campos_requeridos = [
         'nombre', 'apellido', 'cedula', 'telefono', 'id_cargo'
@@ -244,15 +273,26 @@ def updateFuncionario(id_funcionario):
                 'error': f'El campo {campo} es obligatorio y no puede estar vacío.'
             }), 400
 
+    # Como en PATCH: una lista de IDs (un texto o un objeto no se itera como lista)
+    try:
+        especialidades = [] if data.get('especialidades') is None else data['especialidades']
+        if not isinstance(especialidades, list):
+            raise TypeError('Se espera una lista')
+        especialidades = [int(i) for i in especialidades]
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'La lista de especialidades no es válida.'
+        }), 400
+
     # Validar si es especialista
     if funcionariodao.es_cargo_especialista(data['id_cargo']):
-        if not data.get('esp_matricula'):
+        if not data.get('esp_matricula') and funcionariodao.requiere_matricula(data['id_cargo']):
             return jsonify({
                 'success': False,
                 'error': 'La matrícula es obligatoria para especialistas.'
             }), 400
         
-        especialidades = data.get('especialidades', [])
         if not especialidades or len(especialidades) == 0:
             return jsonify({
                 'success': False,
@@ -284,19 +324,35 @@ def updateFuncionario(id_funcionario):
             
             # Datos de especialista
             esp_matricula=data.get('esp_matricula'),
-            especialidades=data.get('especialidades', []),
-            esp_color_agenda=data.get('esp_color_agenda', '#3498db')
+            especialidades=especialidades,
+            esp_color_agenda=data.get('esp_color_agenda', '#3498db'),
+
+            # Control de concurrencia optimista
+            version=leerVersionEsperada(data)
         )
 
-        if resultado:
+        if resultado is None:
+            return jsonify({
+                'success': False,
+                'error': 'No se encontró el funcionario con el ID proporcionado.'
+            }), 404
+        elif resultado == "conflicto":
             return jsonify({
+                'success': False,
+                'error': 'El funcionario fue modificado por otro usuario. Recargue los datos e intente nuevamente.'
+            }), 409
+        elif resultado:
+            respuesta = jsonify({
                 'success': True,
                 'data': {
                     'id_funcionario': id_funcionario,
+                    'version': resultado,
                     'mensaje': 'Funcionario actualizado exitosamente'
                 },
                 'error': None
-            }), 200
+            })
+            respuesta.set_etag(resultado)
+            return respuesta, 200
         else:
             return jsonify({
                 'success': False,
@@ -311,6 +367,170 @@ def updateFuncionario(id_funcionario):
         }), 500
 
 
+# ============================================
+# AGREGAR / QUITAR ESPECIALIDADES
+# ============================================
+ERRORES_ESPECIALIDADES = {
+    "no_especialista": (409, 'El funcionario no es especialista.'),
+    "sin_especialidades": (409, 'El especialista debe conservar al menos una especialidad.'),
+    "especialidad_invalida": (400, 'Alguna de las especialidades no existe.'),
+}
+
+
+@funcionarioapi.route('/funcionarios/<int:id_funcionario>/especialidades', methods=['PATCH'])
+def updateEspecialidadesFuncionario(id_funcionario):
+    """
+    Body: {"agregar": [ids], "quitar": [ids]} o {"especialidades": [ids]}
+    para dejar exactamente esas. Solo se escriben las filas que cambian.
+    """
+    data = request.get_json(silent=True) or {}
+    funcionariodao = FuncionarioDao()
+
+    reemplazar = 'especialidades' in data
+    try:
+        if reemplazar:
+            listas = [data['especialidades']]
+        else:
+            listas = [[] if data.get(clave) is None else data[clave] for clave in ('agregar', 'quitar')]
+        if not all(isinstance(lista, list) for lista in listas):
+            raise TypeError('Se esperan listas')
+        agregar = [int(i) for i in listas[0]]
+        quitar = [] if reemplazar else [int(i) for i in listas[1]]
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'Las listas de especialidades no son válidas.'
+        }), 400
+
+    if not reemplazar and not agregar and not quitar:
+        return jsonify({
+            'success': False,
+            'error': 'Debe enviar especialidades para agregar o quitar.'
+        }), 400
+
+    resultado = funcionariodao.updateEspecialidadesFuncionario(id_funcionario, agregar, quitar, reemplazar)
+
+    if resultado is None:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el funcionario con el ID proporcionado.'
+        }), 404
+    if isinstance(resultado, str):
+        codigo, mensaje = ERRORES_ESPECIALIDADES[resultado]
+        return jsonify({
+            'success': False,
+            'error': mensaje
+        }), codigo
+    if not resultado:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': dict(resultado, id_funcionario=id_funcionario),
+        'error': None
+    }), 200
+
+
+# ============================================
+# ELIMINAR / ARCHIVAR FUNCIONARIOS POR LOTES
+# ============================================
+def leerIdsFuncionarios(data, funcionariodao):
+    """
+    IDs de {"ids": [...]} o {"filtro": {...}} (ver FuncionarioDao.construir_filtro_funcionarios).
+    Devuelve (ids, None) o (None, respuesta de error).
+    """
+    if data.get('ids'):
+        try:
+            if not isinstance(data['ids'], list):
+                raise TypeError()
+            ids = [int(i) for i in data['ids']]
+        except (TypeError, ValueError):
+            return None, (jsonify({
+                'success': False,
+                'error': 'La lista de ids no es válida.'
+            }), 400)
+    elif isinstance(data.get('filtro'), dict):
+        try:
+            ids = funcionariodao.getIdsFuncionarios(data['filtro'], requerir_criterio=True)
+        except ValueError as e:
+            return None, (jsonify({
+                'success': False,
+                'error': f'El filtro no es válido: {e}.'
+            }), 400)
+    else:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Debe enviar una lista de ids o un filtro con al menos un criterio.'
+        }), 400)
+
+    if len(ids) > MAX_FUNCIONARIOS_LOTE:
+        return None, (jsonify({
+            'success': False,
+            'error': f'No se pueden procesar más de {MAX_FUNCIONARIOS_LOTE} funcionarios por petición.'
+        }), 413)
+
+    return ids, None
+
+
+def respuestaLote(resultados):
+    resumen = {}
+    for r in resultados:
+        resumen[r['resultado']] = resumen.get(r['resultado'], 0) + 1
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'total': len(resultados),
+            'resumen': resumen,
+            'resultados': resultados
+        },
+        'error': None
+    }), 200
+
+
+@funcionarioapi.route('/funcionarios/eliminar', methods=['POST'])
+@requiere_permiso('borrar')
+def deleteFuncionariosLote():
+    """Elimina varios funcionarios en bloques y responde el resultado de cada ID"""
+    funcionariodao = FuncionarioDao()
+    ids, error = leerIdsFuncionarios(request.get_json(silent=True) or {}, funcionariodao)
+    if error:
+        return error
+
+    try:
+        return respuestaLote(funcionariodao.deleteFuncionariosLote(ids))
+
+    except Exception as e:
+        app.logger.error(f"Error al eliminar funcionarios por lotes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
+@funcionarioapi.route('/funcionarios/archivar', methods=['POST'])
+@requiere_permiso('borrar')
+def archivarFuncionariosLote():
+    """Marca como inactivos varios funcionarios sin borrar sus datos"""
+    funcionariodao = FuncionarioDao()
+    ids, error = leerIdsFuncionarios(request.get_json(silent=True) or {}, funcionariodao)
+    if error:
+        return error
+
+    try:
+        return respuestaLote(funcionariodao.archivarFuncionariosLote(ids))
+
+    except Exception as e:
+        app.logger.error(f"Error al archivar funcionarios por lotes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
 # ============================================
 # ELIMINAR FUNCIONARIO
 # ============================================
@@ -337,4 +557,87 @@ def deleteFuncionario(id_funcionario):
         return jsonify({
             'success': False,
             'error': 'Ocurrió un error interno. Consulte con el administrador.'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+# ============================================
+# EXPORTAR LISTADO DE FUNCIONARIOS (EN SEGUNDO PLANO)
+# ============================================
+@funcionarioapi.route('/funcionarios/exportar/<formato>', methods=['POST'])
+@requiere_permiso('leer')
+def exportarFuncionarios(formato):
+    """
+    Encola la exportación del listado a Excel o PDF (formato excel|pdf) con
+    los mismos filtros (query string) que GET /funcionarios. Responde 202
+    con el trabajo; el archivo se baja de /funcionarios/reportes/<id>/descargar.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({
+            'success': False,
+            'error': 'Formato no admitido (excel o pdf).'
+        }), 404
+
+    try:
+        trabajo = trabajos.crear_trabajo_lista_funcionarios(
+            app._get_current_object(), FORMATOS_EXPORTACION[formato], leerFiltroFuncionarios())
+        return jsonify({
+            'success': True,
+            'data': trabajo,
+            'error': None
+        }), 202, {'Location': url_for('funcionarioapi.getReporteFuncionarios', id_trabajo=trabajo['id'])}
+
+    except Exception as e:
+        app.logger.error(f"Error al crear exportación de funcionarios: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
+def obtenerTrabajoFuncionarios(id_trabajo):
+    """Estado del trabajo si es una exportación de funcionarios, si no None"""
+    trabajo = trabajos.obtener_trabajo(id_trabajo)
+    if trabajo and trabajo.get('tipo', '').endswith('_funcionarios'):
+        return trabajo
+    return None
+
+
+@funcionarioapi.route('/funcionarios/reportes/<id_trabajo>', methods=['GET'])
+def getReporteFuncionarios(id_trabajo):
+    """Consulta el estado de una exportación del listado"""
+    trabajo = obtenerTrabajoFuncionarios(id_trabajo)
+
+    if not trabajo:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el trabajo de reporte.'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': trabajo,
+        'error': None
+    }), 200
+
+
+@funcionarioapi.route('/funcionarios/reportes/<id_trabajo>/descargar', methods=['GET'])
+def descargarReporteFuncionarios(id_trabajo):
+    """Descarga el archivo de una exportación terminada"""
+    trabajo = obtenerTrabajoFuncionarios(id_trabajo)
+
+    if not trabajo:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el trabajo de reporte.'
+        }), 404
+
+    ruta = trabajos.ruta_archivo_trabajo(id_trabajo)
+    if not ruta:
+        return jsonify({
+            'success': False,
+            'data': trabajo,
+            'error': 'El reporte todavía no está listo.'
+        }), 409
+
+    return send_file(ruta, as_attachment=True, mimetype=trabajo['mimetype'],
+                     download_name=f"funcionarios_{id_trabajo[:8]}.{trabajo['extension']}")
@@ -1,14 +1,73 @@
-from flask import Blueprint, request, jsonify, current_app as app
+from flask import Blueprint, request, jsonify, url_for, current_app as app
 from app.dao.gestionar_personas.paciente.PacienteDao import PacienteDao
 from flask import send_file
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from openpyxl import Workbook
-import io
+from app.reportes.paciente_pdf import generar_pdf_pacientes
+from app.reportes.paciente_excel import generar_excel_paciente
+from app.reportes.cache_documentos import cache_documentos
+from app.reportes import trabajos
+from app.seguridad.permisos import requiere_permiso
+from app.rutas.concurrencia import leerVersionEsperada
+from datetime import date
 
 
 pacienteapi = Blueprint('pacienteapi', __name__)
 
+# Máximo de pacientes aceptados por petición en /pacientes/batch
+MAX_PACIENTES_LOTE = 20000
+
+# Máximo de fichas por trabajo de reporte PDF
+MAX_PACIENTES_REPORTE = 2000
+
+
+# ============================================
+# FILTROS DEL LISTADO DE PACIENTES
+# ============================================
+def leerFiltroPacientes():
+    """Lee los filtros del listado desde el query string (ver PacienteDao.construir_filtro_pacientes)"""
+    args = request.args
+    filtro = {
+        'id_ciudad': args.get('id_ciudad', type=int),
+        'id_genero': args.get('id_genero', type=int),
+        'inscripcion_desde': args.get('inscripcion_desde', type=date.fromisoformat),
+        'inscripcion_hasta': args.get('inscripcion_hasta', type=date.fromisoformat),
+        'busqueda': (args.get('busqueda') or '').strip() or None,
+    }
+    if args.get('menores') in ('true', '1'):
+        filtro['menores'] = True
+    elif args.get('menores') in ('false', '0'):
+        filtro['menores'] = False
+    return filtro
+
+
+# ============================================
+# DOCUMENTOS DE PACIENTE (CACHÉ POR VERSIÓN)
+# ============================================
+def enviarDocumentoPaciente(tipo, pac_id, generador, nombre, mimetype):
+    """
+    Sirve el PDF/Excel de un paciente desde el caché si la versión del
+    documento (fila, catálogos y fecha del día, ver getVersionDocumento) no
+    cambió; si no, lo genera con `generador(paciente)` y lo guarda.
+    La respuesta lleva ETag de esa versión, así el navegador revalida con 304.
+    """
+    pacientedao = PacienteDao()
+
+    version = pacientedao.getVersionDocumento(pac_id)
+    if version is None:
+        return jsonify({'success': False, 'error': 'Paciente no encontrado'}), 404
+
+    ruta = cache_documentos.obtener(tipo, pac_id, version)
+    if not ruta:
+        paciente = pacientedao.getPacienteById(pac_id)
+        if not paciente:
+            return jsonify({'success': False, 'error': 'Paciente no encontrado'}), 404
+        ruta = cache_documentos.guardar(tipo, pac_id, version, generador(paciente))
+
+    respuesta = send_file(ruta, as_attachment=True, download_name=nombre, mimetype=mimetype,
+                          etag=f"{tipo}-{pac_id}-{version}", conditional=True)
+    # Privado (datos de salud) y siempre revalidado contra la versión actual
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
 
 # ============================================
 # GENERAR PDF DE PACIENTE
@@ -16,155 +75,149 @@ pacienteapi = Blueprint('pacienteapi', __name__)
 @pacienteapi.route('/pacientes/<int:pac_id>/pdf', methods=['GET'])
 def generarPDF(pac_id):
     """Genera un PDF con la ficha del paciente"""
-    pacientedao = PacienteDao()
-    
     try:
-        paciente = pacientedao.getPacienteById(pac_id)
-        
-        if not paciente:
-            return jsonify({'success': False, 'error': 'Paciente no encontrado'}), 404
-        
-        # Crear PDF en memoria
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        
-        # Título
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, height - 50, "Ficha de Paciente")
-        
-        # Datos del paciente
-        p.setFont("Helvetica", 12)
-        y = height - 100
-        
-        datos = [
-            f"Historia Clínica: {paciente.get('historia_clinica', 'N/A')}",
-            f"Nombre: {paciente.get('nombre', '')} {paciente.get('apellido', '')}",
-            f"Cédula: {paciente.get('cedula', 'N/A')}",
-            f"Fecha Nacimiento: {paciente.get('fecha_nacimiento', 'N/A')}",
-            f"Edad: {paciente.get('edad', 'N/A')} años",
-            f"Es menor de edad: {'Sí' if paciente.get('es_menor') else 'No'}",
-            f"Género: {paciente.get('genero', 'N/A')}",
-            f"Estado Civil: {paciente.get('estado_civil', 'N/A')}",
-            f"Teléfono: {paciente.get('telefono', 'N/A')}",
-            f"Correo: {paciente.get('correo', 'N/A')}",
-            f"Domicilio: {paciente.get('domicilio', 'N/A')}",
-            f"Ciudad: {paciente.get('ciudad', 'N/A')}",
-            f"Nivel Instrucción: {paciente.get('nivel_instruccion', 'N/A')}",
-            f"Profesión: {paciente.get('profesion', 'N/A')}",
-        ]
-        
-        for dato in datos:
-            p.drawString(50, y, dato)
-            y -= 20
-        
-        # Datos del tutor si es menor
-        if paciente.get('es_menor') and (paciente.get('nom_madre') or paciente.get('nom_padre')):
-            y -= 20
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(50, y, "Datos del Tutor:")
-            y -= 20
-            p.setFont("Helvetica", 12)
-            
-            if paciente.get('nom_madre'):
-                p.drawString(50, y, f"Madre: {paciente.get('nom_madre', 'N/A')} - Tel: {paciente.get('tel_madre', 'N/A')}")
-                y -= 20
-            
-            if paciente.get('nom_padre'):
-                p.drawString(50, y, f"Padre: {paciente.get('nom_padre', 'N/A')} - Tel: {paciente.get('tel_padre', 'N/A')}")
-                y -= 20
-            
-            if paciente.get('colegio'):
-                p.drawString(50, y, f"Colegio: {paciente.get('colegio', 'N/A')} - Tel: {paciente.get('tel_colegio', 'N/A')}")
-        
-        if paciente.get('observaciones'):
-            y -= 30
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(50, y, "Observaciones:")
-            y -= 20
-            p.setFont("Helvetica", 10)
-            p.drawString(50, y, paciente.get('observaciones', ''))
-        
-        p.showPage()
-        p.save()
-        
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name=f"paciente_{pac_id}.pdf", mimetype='application/pdf')
+        return enviarDocumentoPaciente('pdf', pac_id, lambda paciente: generar_pdf_pacientes([paciente]),
+                                       f"paciente_{pac_id}.pdf", 'application/pdf')
         
     except Exception as e:
         app.logger.error(f"Error al generar PDF: {str(e)}")
         return jsonify({'success': False, 'error': 'Error al generar PDF'}), 500
 
 
+# ============================================
+# REPORTE PDF DE VARIOS PACIENTES (EN SEGUNDO PLANO)
+# ============================================
+@pacienteapi.route('/pacientes/reportes/pdf', methods=['POST'])
+@requiere_permiso('leer')
+def crearReportePDF():
+    """
+    Encola la generación de un PDF con las fichas de varios pacientes.
+    Acepta {"ids": [...]} o {"filtro": {...}} (ver PacienteDao.construir_filtro_pacientes).
+    Responde 202 con el ID del trabajo para consultar su estado.
+    """
+    data = request.get_json(silent=True) or {}
+    pacientedao = PacienteDao()
+
+    try:
+        if data.get('ids'):
+            ids = [int(i) for i in data['ids']]
+        elif isinstance(data.get('filtro'), dict):
+            ids = pacientedao.getIdsPacientes(data['filtro'])
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Debe enviar una lista de ids o un filtro.'
+            }), 400
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'La lista de ids no es válida.'
+        }), 400
+
+    if not ids:
+        return jsonify({
+            'success': False,
+            'error': 'No hay pacientes para el reporte.'
+        }), 404
+
+    if len(ids) > MAX_PACIENTES_REPORTE:
+        return jsonify({
+            'success': False,
+            'error': f'El reporte no puede superar {MAX_PACIENTES_REPORTE} pacientes.'
+        }), 413
+
+    try:
+        trabajo = trabajos.crear_trabajo_pdf_pacientes(app._get_current_object(), ids)
+        return jsonify({
+            'success': True,
+            'data': trabajo,
+            'error': None
+        }), 202, {'Location': url_for('pacienteapi.getReporte', id_trabajo=trabajo['id'])}
+
+    except Exception as e:
+        app.logger.error(f"Error al crear trabajo de reporte: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
+@pacienteapi.route('/pacientes/reportes/<id_trabajo>', methods=['GET'])
+def getReporte(id_trabajo):
+    """Consulta el estado de un trabajo de reporte (PDF o Excel)"""
+    trabajo = trabajos.obtener_trabajo(id_trabajo)
+
+    if not trabajo:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el trabajo de reporte.'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': trabajo,
+        'error': None
+    }), 200
+
+
+@pacienteapi.route('/pacientes/reportes/<id_trabajo>/descargar', methods=['GET'])
+def descargarReporte(id_trabajo):
+    """Descarga el archivo (PDF o Excel) de un trabajo terminado"""
+    trabajo = trabajos.obtener_trabajo(id_trabajo)
+
+    if not trabajo:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el trabajo de reporte.'
+        }), 404
+
+    ruta = trabajos.ruta_archivo_trabajo(id_trabajo)
+    if not ruta:
+        return jsonify({
+            'success': False,
+            'data': trabajo,
+            'error': 'El reporte todavía no está listo.'
+        }), 409
+
+    return send_file(ruta, as_attachment=True, mimetype=trabajo['mimetype'],
+                     download_name=f"pacientes_{id_trabajo[:8]}.{trabajo['extension']}")
+
+
+# ============================================
+# EXPORTAR LISTADO DE PACIENTES A EXCEL (EN SEGUNDO PLANO)
+# ============================================
+@pacienteapi.route('/pacientes/exportar/excel', methods=['POST'])
+@requiere_permiso('leer')
+def exportarPacientesExcel():
+    """
+    Encola la exportación del listado completo a Excel con los mismos
+    filtros (query string) que GET /pacientes. Responde 202 con el trabajo.
+    """
+    try:
+        trabajo = trabajos.crear_trabajo_excel_pacientes(app._get_current_object(), leerFiltroPacientes())
+        return jsonify({
+            'success': True,
+            'data': trabajo,
+            'error': None
+        }), 202, {'Location': url_for('pacienteapi.getReporte', id_trabajo=trabajo['id'])}
+
+    except Exception as e:
+        app.logger.error(f"Error al crear exportación de pacientes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
 # ============================================
 # GENERAR EXCEL DE PACIENTE
 # ============================================
 @pacienteapi.route('/pacientes/<int:pac_id>/excel', methods=['GET'])
 def generarExcel(pac_id):
     """Genera un archivo Excel con los datos del paciente"""
-    pacientedao = PacienteDao()
-    
     try:
-        paciente = pacientedao.getPacienteById(pac_id)
-        
-        if not paciente:
-            return jsonify({'success': False, 'error': 'Paciente no encontrado'}), 404
-        
-        # Crear Excel en memoria
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Datos del Paciente"
-        
-        # Encabezados
-        ws['A1'] = "Campo"
-        ws['B1'] = "Valor"
-        
-        # Datos básicos
-        datos = [
-            ["Historia Clínica", paciente.get('historia_clinica', 'N/A')],
-            ["Nombre", paciente.get('nombre', '')],
-            ["Apellido", paciente.get('apellido', '')],
-            ["Cédula", paciente.get('cedula', 'N/A')],
-            ["Fecha Nacimiento", paciente.get('fecha_nacimiento', 'N/A')],
-            ["Edad", f"{paciente.get('edad', 'N/A')} años"],
-            ["Es menor de edad", 'Sí' if paciente.get('es_menor') else 'No'],
-            ["Género", paciente.get('genero', 'N/A')],
-            ["Estado Civil", paciente.get('estado_civil', 'N/A')],
-            ["Teléfono", paciente.get('telefono', 'N/A')],
-            ["Correo", paciente.get('correo', 'N/A')],
-            ["Domicilio", paciente.get('domicilio', 'N/A')],
-            ["Ciudad", paciente.get('ciudad', 'N/A')],
-            ["Ciudad Nacimiento", paciente.get('ciudad_nacimiento', 'N/A')],
-            ["Nivel Instrucción", paciente.get('nivel_instruccion', 'N/A')],
-            ["Profesión", paciente.get('profesion', 'N/A')],
-        ]
-        
-        # Agregar datos del tutor si es menor
-        if paciente.get('es_menor'):
-            datos.extend([
-                ["--- Datos del Tutor ---", ""],
-                ["Nombre Madre", paciente.get('nom_madre', 'N/A')],
-                ["Teléfono Madre", paciente.get('tel_madre', 'N/A')],
-                ["Nombre Padre", paciente.get('nom_padre', 'N/A')],
-                ["Teléfono Padre", paciente.get('tel_padre', 'N/A')],
-                ["Educación", paciente.get('educacion', 'N/A')],
-                ["Colegio", paciente.get('colegio', 'N/A')],
-                ["Teléfono Colegio", paciente.get('tel_colegio', 'N/A')],
-            ])
-        
-        if paciente.get('observaciones'):
-            datos.append(["Observaciones", paciente.get('observaciones', '')])
-        
-        for idx, (campo, valor) in enumerate(datos, start=2):
-            ws[f'A{idx}'] = campo
-            ws[f'B{idx}'] = valor
-        
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        return send_file(buffer, as_attachment=True, download_name=f"paciente_{pac_id}.xlsx", 
-                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        return enviarDocumentoPaciente('excel', pac_id, generar_excel_paciente, f"paciente_{pac_id}.xlsx",
+                                       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         
     except Exception as e:
         app.logger.error(f"Error al generar Excel: {str(e)}")
@@ -176,11 +229,15 @@ def generarExcel(pac_id):
 # ============================================
 @pacienteapi.route('/pacientes', methods=['GET'])
 def getPacientes():
-    """Obtiene la lista completa de pacientes"""
+    """
+    Obtiene la lista de pacientes. Filtros opcionales (query string):
+    menores=true|false, id_ciudad, id_genero, inscripcion_desde,
+    inscripcion_hasta (YYYY-MM-DD) y busqueda.
+    """
     pacientedao = PacienteDao()
     
     try:
-        pacientes = pacientedao.getPacientes()
+        pacientes = pacientedao.getPacientes(leerFiltroPacientes())
         
         return jsonify({
             'success': True,
@@ -226,11 +283,23 @@ def getPacientesMenores():
 # ============================================
 @pacienteapi.route('/pacientes/<int:pac_id>', methods=['GET'])
 def getPaciente(pac_id):
-    """Obtiene un paciente específico por su ID"""
+    """
+    Obtiene un paciente específico por su ID.
+    ?fields= acepta una proyección predefinida (basico, detalle, editar) o una
+    lista de campos separada por comas; solo se unen las tablas necesarias.
+    """
     pacientedao = PacienteDao()
+
+    try:
+        pacientedao.resolver_proyeccion(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f"{str(e)}. Campos válidos: {', '.join(PacienteDao.CAMPOS_PACIENTE)}"
+        }), 400
     
     try:
-        paciente = pacientedao.getPacienteById(pac_id)
+        paciente = pacientedao.getPaciente(pac_id, request.args.get('fields'))
         
         if paciente:
             return jsonify({
@@ -264,11 +333,14 @@ def getPacienteParaEditar(pac_id):
         paciente = pacientedao.getPacienteParaEditar(pac_id)
 
         if paciente:
-            return jsonify({
+            respuesta = jsonify({
                 'success': True,
                 'data': paciente,
                 'error': None
-            }), 200
+            })
+            # La versión viaja también como ETag para enviarla en If-Match al guardar
+            respuesta.set_etag(paciente['version'])
+            return respuesta, 200
         else:
             return jsonify({
                 'success': False,
@@ -363,22 +435,69 @@ def addPaciente():
         }), 500
 
 
+# ============================================
+# CREAR PACIENTES POR LOTE (MIGRACIÓN / CARGA MASIVA)
+# ============================================
+@pacienteapi.route('/pacientes/batch', methods=['POST'])
+def addPacientesLote():
+    """
+    Crea muchos pacientes en una sola petición.
+    Acepta una lista de pacientes o {"pacientes": [...]} con los mismos campos
+    que POST /pacientes. Devuelve un resultado por registro.
+    """
+    data = request.get_json(silent=True)
+    pacientedao = PacienteDao()
+
+    pacientes = data.get('pacientes') if isinstance(data, dict) else data
+
+    if not isinstance(pacientes, list) or len(pacientes) == 0:
+        return jsonify({
+            'success': False,
+            'error': 'Debe enviar una lista de pacientes no vacía.'
+        }), 400
+
+    if len(pacientes) > MAX_PACIENTES_LOTE:
+        return jsonify({
+            'success': False,
+            'error': f'El lote no puede superar {MAX_PACIENTES_LOTE} pacientes.'
+        }), 413
+
+    try:
+        resultados = pacientedao.guardarPacientesLote(pacientes)
+        creados = sum(1 for r in resultados if r['success'])
+
+        return jsonify({
+            'success': creados == len(resultados),
+            'data': {
+                'total': len(resultados),
+                'creados': creados,
+                'fallidos': len(resultados) - creados,
+                'resultados': resultados
+            },
+            'error': None
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error inesperado al agregar lote de pacientes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno del servidor. Consulte con el administrador.'
+        }), 500
+
+
 # ============================================
 # ACTUALIZAR PACIENTE EXISTENTE
 # ============================================
 @pacienteapi.route('/pacientes/<int:pac_id>', methods=['PUT'])
 def updatePaciente(pac_id):
+    """
+    Actualiza un paciente en una sola ida a la base.
+    Con If-Match (o 'version' en el cuerpo) se rechaza con 409 si otro usuario
+    lo modificó desde que se cargó el formulario.
+    """
     data = request.get_json()
     pacientedao = PacienteDao()
 
-    # Verificar que existe
-    paciente_existente = pacientedao.getPacienteById(pac_id)
-    if not paciente_existente:
-        return jsonify({
-            'success': False,
-            'error': 'No se encontró el paciente con el ID proporcionado.'
-        }), 404
-
     # ✅ CORRECCIÓN: historia_clinica es obligatorio en UPDATE, pero telefono NO
     campos_requeridos = ['nombre', 'apellido', 'cedula', 'fecha_nacimiento', 'historia_clinica']
 
@@ -423,18 +542,34 @@ def updatePaciente(pac_id):
             tel_padre=data.get('tel_padre'),
             educacion=data.get('educacion'),
             colegio=data.get('colegio'),
-            tel_colegio=data.get('tel_colegio')
+            tel_colegio=data.get('tel_colegio'),
+
+            # Control de concurrencia optimista
+            version=leerVersionEsperada(data)
         )
 
-        if resultado:
+        if resultado is None:
             return jsonify({
+                'success': False,
+                'error': 'No se encontró el paciente con el ID proporcionado.'
+            }), 404
+        elif resultado == "conflicto":
+            return jsonify({
+                'success': False,
+                'error': 'El paciente fue modificado por otro usuario. Recargue los datos e intente nuevamente.'
+            }), 409
+        elif resultado:
+            respuesta = jsonify({
                 'success': True,
                 'data': {
                     'id_paciente': pac_id,
+                    'version': resultado,
                     'mensaje': 'Paciente actualizado exitosamente'
                 },
                 'error': None
-            }), 200
+            })
+            respuesta.set_etag(resultado)
+            return respuesta, 200
         else:
             return jsonify({
                 'success': False,
@@ -448,6 +583,74 @@ def updatePaciente(pac_id):
             'error': 'Ocurrió un error interno.'
         }), 500
 
+# ============================================
+# ELIMINAR PACIENTES POR LOTES
+# ============================================
+@pacienteapi.route('/pacientes/eliminar', methods=['POST'])
+@requiere_permiso('borrar')
+def deletePacientesLote():
+    """
+    Elimina varios pacientes en bloques (ver PacienteDao.deletePacientesLote).
+    Acepta {"ids": [...]} o {"filtro": {...}} con al menos un criterio.
+    Responde con el resultado de cada ID.
+    """
+    data = request.get_json(silent=True) or {}
+    pacientedao = PacienteDao()
+
+    if data.get('ids'):
+        try:
+            if not isinstance(data['ids'], list):
+                raise TypeError()
+            ids = [int(i) for i in data['ids']]
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'La lista de ids no es válida.'
+            }), 400
+    elif isinstance(data.get('filtro'), dict):
+        try:
+            ids = pacientedao.getIdsPacientes(data['filtro'], requerir_criterio=True)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'El filtro no es válido: {e}.'
+            }), 400
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'Debe enviar una lista de ids o un filtro con al menos un criterio.'
+        }), 400
+
+    if len(ids) > MAX_PACIENTES_LOTE:
+        return jsonify({
+            'success': False,
+            'error': f'No se pueden eliminar más de {MAX_PACIENTES_LOTE} pacientes por petición.'
+        }), 413
+
+    try:
+        resultados = pacientedao.deletePacientesLote(ids)
+        resumen = {}
+        for r in resultados:
+            resumen[r['resultado']] = resumen.get(r['resultado'], 0) + 1
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'total': len(resultados),
+                'resumen': resumen,
+                'resultados': resultados
+            },
+            'error': None
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error al eliminar pacientes por lotes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+
 # ============================================
 # ELIMINAR PACIENTE
 # ============================================
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+from flask import Blueprint, request, jsonify
+from app.dao.gestionar_turnos.disponibilidad.DisponibilidadDao import DisponibilidadDao
+
+disponibilidadapi = Blueprint('disponibilidadapi', __name__)
+
+# Días máximos por consulta
+MAX_DIAS_DISPONIBILIDAD = 31
+
+# Turnos libres por especialista en la respuesta
+LIBRES_POR_ESPECIALISTA = 10
+MAX_LIBRES_POR_ESPECIALISTA = 200
+
+
+# ============================================
+# PRÓXIMOS TURNOS LIBRES POR ESPECIALIDAD
+# ============================================
+@disponibilidadapi.route('/disponibilidad', methods=['GET'])
+def getDisponibilidad():
+    """
+    ?especialidad=<id> (obligatorio), ?desde= y ?hasta= (YYYY-MM-DD; por
+    defecto esta semana), ?por_especialista= turnos por especialista.
+    Devuelve el primer turno libre entre todos y los libres de cada
+    especialista activo con esa especialidad. Se reserva con POST /turnos.
+    """
+    disponibilidaddao = DisponibilidadDao()
+
+    id_especialidad = request.args.get('especialidad', type=int)
+    desde = request.args.get('desde', type=date.fromisoformat) or date.today()
+    hasta = request.args.get('hasta', type=date.fromisoformat) or desde + timedelta(days=6)
+    if not id_especialidad or hasta < desde or (hasta - desde).days >= MAX_DIAS_DISPONIBILIDAD:
+        return jsonify({
+            'success': False,
+            'error': f'Indique especialidad y un rango de hasta {MAX_DIAS_DISPONIBILIDAD} días.'
+        }), 400
+
+    por_especialista = min(max(request.args.get('por_especialista', LIBRES_POR_ESPECIALISTA, type=int), 1),
+                           MAX_LIBRES_POR_ESPECIALISTA)
+
+    disponibilidad = disponibilidaddao.getDisponibilidad(id_especialidad, desde, hasta, por_especialista)
+    if disponibilidad is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': disponibilidad,
+        'error': None
+    }), 200
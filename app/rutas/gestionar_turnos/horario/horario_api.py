@@ -0,0 +1,96 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from app.dao.gestionar_turnos.horario.HorarioDao import HorarioDao
+from app.dao.gestionar_turnos.disponibilidad.DisponibilidadDao import DisponibilidadDao
+
+horarioapi = Blueprint('horarioapi', __name__)
+
+
+def leerHorarios(horarios):
+    """
+    Valida [{dia_semana, inicio, fin, duracion_minutos}] (horas 'HH:MM').
+    Devuelve (lista de tuplas, None) o (None, mensaje de error).
+    """
+    if not isinstance(horarios, list):
+        return None, 'Debe enviar la lista de horarios.'
+
+    franjas = []
+    try:
+        for h in horarios:
+            dia = int(h['dia_semana'])
+            inicio = datetime.strptime(h['inicio'], '%H:%M').time()
+            fin = datetime.strptime(h['fin'], '%H:%M').time()
+            duracion = int(h['duracion_minutos'])
+            if not 1 <= dia <= 7 or not 5 <= duracion <= 480 or fin <= inicio:
+                return None, f'Horario no válido: {h}'
+            # El índice de disponibilidad usa una grilla de 5 minutos
+            unidad = DisponibilidadDao.UNIDAD_MINUTOS
+            if inicio.minute % unidad or fin.minute % unidad or duracion % unidad:
+                return None, f'Las horas y la duración deben ser múltiplos de {unidad} minutos: {h}'
+            franjas.append((dia, inicio, fin, duracion))
+    except (KeyError, TypeError, ValueError):
+        return None, 'Cada horario necesita dia_semana (1-7), inicio y fin (HH:MM) y duracion_minutos.'
+
+    # Dos franjas del mismo día no pueden superponerse
+    franjas.sort()
+    for anterior, siguiente in zip(franjas, franjas[1:]):
+        if anterior[0] == siguiente[0] and siguiente[1] < anterior[2]:
+            return None, f'Las franjas del día {siguiente[0]} se superponen.'
+
+    return franjas, None
+
+
+# ============================================
+# PLANTILLA SEMANAL DE UN ESPECIALISTA
+# ============================================
+@horarioapi.route('/especialistas/<int:id_especialista>/horarios', methods=['GET'])
+def getHorarios(id_especialista):
+    horariodao = HorarioDao()
+
+    horarios = horariodao.getHorarios(id_especialista)
+    if horarios is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': horarios,
+        'error': None
+    }), 200
+
+
+@horarioapi.route('/especialistas/<int:id_especialista>/horarios', methods=['PUT'])
+def updateHorarios(id_especialista):
+    """
+    Body: {"horarios": [{"dia_semana": 1, "inicio": "08:00", "fin": "12:00",
+    "duracion_minutos": 30}, ...]} (día ISO: 1 = lunes). Reemplaza la plantilla.
+    """
+    data = request.get_json(silent=True) or {}
+    horariodao = HorarioDao()
+
+    franjas, error = leerHorarios(data.get('horarios'))
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
+    resultado = horariodao.reemplazarHorarios(id_especialista, franjas)
+    if resultado is None:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el especialista con el ID proporcionado.'
+        }), 404
+    if not resultado:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': horariodao.getHorarios(id_especialista),
+        'error': None
+    }), 200
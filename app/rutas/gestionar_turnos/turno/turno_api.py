@@ -0,0 +1,180 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify, session
+from app.dao.gestionar_turnos.turno.TurnoDao import TurnoDao
+from app.seguridad.permisos import requiere_permiso
+
+turnoapi = Blueprint('turnoapi', __name__)
+
+# Días máximos por consulta de disponibilidad o agenda
+MAX_DIAS_CONSULTA = 31
+
+# Motivo de rechazo de TurnoDao -> (código HTTP, mensaje)
+RECHAZOS_TURNO = {
+    "fuera_de_horario": (400, 'El horario no corresponde a un turno de la agenda del especialista.'),
+    "ocupado": (409, 'El turno ya fue reservado.'),
+    "paciente_ocupado": (409, 'El paciente ya tiene un turno en ese horario.'),
+    "en_proceso": (409, 'El turno está siendo reservado por otro usuario. Intente nuevamente.'),
+    "paciente_invalido": (400, 'El paciente no existe.'),
+    "no_reservado": (409, 'El turno ya no está reservado.'),
+}
+
+
+def leerRangoFechas():
+    """desde/hasta (YYYY-MM-DD) del query string; por defecto una semana desde hoy"""
+    desde = request.args.get('desde', type=date.fromisoformat) or date.today()
+    hasta = request.args.get('hasta', type=date.fromisoformat) or desde + timedelta(days=6)
+    if hasta < desde or (hasta - desde).days >= MAX_DIAS_CONSULTA:
+        return None, None
+    return desde, hasta
+
+
+def leerInicio(data):
+    """Fecha y hora local del turno ('YYYY-MM-DDTHH:MM') o None"""
+    try:
+        inicio = datetime.fromisoformat(data.get('inicio'))
+    except (TypeError, ValueError):
+        return None
+    return None if inicio.tzinfo else inicio
+
+
+def respuestaTurno(resultado, codigo_ok=200):
+    if resultado is None:
+        return jsonify({
+            'success': False,
+            'error': 'No se encontró el turno con el ID proporcionado.'
+        }), 404
+    if isinstance(resultado, str):
+        codigo, mensaje = RECHAZOS_TURNO[resultado]
+        return jsonify({
+            'success': False,
+            'error': mensaje,
+            'motivo': resultado
+        }), codigo
+    if resultado is False:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': resultado,
+        'error': None
+    }), codigo_ok
+
+
+# ============================================
+# TURNOS DISPONIBLES
+# ============================================
+@turnoapi.route('/turnos/disponibles', methods=['GET'])
+def getTurnosDisponibles():
+    """?id_especialista= (obligatorio), ?desde= y ?hasta= (YYYY-MM-DD, hasta 31 días)"""
+    turnodao = TurnoDao()
+
+    id_especialista = request.args.get('id_especialista', type=int)
+    desde, hasta = leerRangoFechas()
+    if not id_especialista or desde is None:
+        return jsonify({
+            'success': False,
+            'error': f'Indique id_especialista y un rango de hasta {MAX_DIAS_CONSULTA} días.'
+        }), 400
+
+    disponibles = turnodao.getTurnosDisponibles(id_especialista, desde, hasta)
+    if disponibles is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': disponibles,
+        'error': None
+    }), 200
+
+
+# ============================================
+# AGENDA
+# ============================================
+@turnoapi.route('/turnos', methods=['GET'])
+def getTurnos():
+    """?id_especialista= y/o ?id_paciente=, ?desde=, ?hasta=, ?estado= (reservado por defecto)"""
+    turnodao = TurnoDao()
+
+    id_especialista = request.args.get('id_especialista', type=int)
+    id_paciente = request.args.get('id_paciente', type=int)
+    estado = request.args.get('estado', 'reservado')
+    desde, hasta = leerRangoFechas()
+    if not (id_especialista or id_paciente) or desde is None or estado not in TurnoDao.ESTADOS:
+        return jsonify({
+            'success': False,
+            'error': f'Indique id_especialista o id_paciente, un estado válido y un rango de hasta {MAX_DIAS_CONSULTA} días.'
+        }), 400
+
+    turnos = turnodao.getTurnos(id_especialista, id_paciente, desde, hasta, estado)
+    if turnos is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': turnos,
+        'error': None
+    }), 200
+
+
+# ============================================
+# RESERVAR / CANCELAR / REPROGRAMAR
+# ============================================
+@turnoapi.route('/turnos', methods=['POST'])
+def reservarTurno():
+    """Body: {"id_especialista", "id_paciente", "inicio": "YYYY-MM-DDTHH:MM", "observacion"}"""
+    data = request.get_json(silent=True) or {}
+    turnodao = TurnoDao()
+
+    inicio = leerInicio(data)
+    try:
+        id_especialista = int(data['id_especialista'])
+        id_paciente = int(data['id_paciente'])
+    except (KeyError, TypeError, ValueError):
+        id_especialista = id_paciente = None
+    if not id_especialista or not id_paciente or inicio is None:
+        return jsonify({
+            'success': False,
+            'error': 'Debe indicar id_especialista, id_paciente e inicio (YYYY-MM-DDTHH:MM, hora local).'
+        }), 400
+
+    resultado = turnodao.reservarTurno(id_especialista, id_paciente, inicio,
+                                       data.get('observacion'), session.get('id_usuario'))
+    return respuestaTurno(resultado, 201)
+
+
+@turnoapi.route('/turnos/<int:id_turno>/cancelar', methods=['POST'])
+@requiere_permiso('editar')
+def cancelarTurno(id_turno):
+    turnodao = TurnoDao()
+
+    resultado = turnodao.cancelarTurno(id_turno)
+    if resultado is True:
+        resultado = {'id_turno': id_turno, 'estado': 'cancelado'}
+    return respuestaTurno(resultado)
+
+
+@turnoapi.route('/turnos/<int:id_turno>/reprogramar', methods=['POST'])
+@requiere_permiso('editar')
+def reprogramarTurno(id_turno):
+    """Body: {"inicio": "YYYY-MM-DDTHH:MM"}. Devuelve el turno nuevo."""
+    data = request.get_json(silent=True) or {}
+    turnodao = TurnoDao()
+
+    inicio = leerInicio(data)
+    if inicio is None:
+        return jsonify({
+            'success': False,
+            'error': 'Debe indicar inicio (YYYY-MM-DDTHH:MM, hora local).'
+        }), 400
+
+    resultado = turnodao.reprogramarTurno(id_turno, inicio, session.get('id_usuario'))
+    return respuestaTurno(resultado)
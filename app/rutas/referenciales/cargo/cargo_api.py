@@ -1,8 +1,22 @@
 from flask import Blueprint, request, jsonify, current_app as app
 from app.dao.referenciales.cargo.CargoDao import CargoDao
+from app.dao.referenciales.cargo.cache_cargos import cache_cargos
 
 cargoapi = Blueprint('cargoapi', __name__)
 
+
+def leerAtributosCargo(data, por_defecto):
+    """
+    (requiere_especialista, requiere_matricula) del cuerpo; los que no vienen
+    toman `por_defecto`. Retorna None si piden matrícula sin especialista.
+    """
+    atributos = tuple(por_defecto if data.get(campo) is None else bool(data[campo])
+                      for campo in ('requiere_especialista', 'requiere_matricula'))
+    if atributos[1] and atributos[0] is False:
+        return None
+    return atributos
+
+
 # ===============================
 # Trae todos los cargos
 # ===============================
@@ -87,14 +101,23 @@ def addCargo():
                 'error': 'La descripción solo puede contener letras y acentos.'
             }), 400
 
-        cargo_id = cargodao.guardarCargo(descripcion, estado)
+        atributos = leerAtributosCargo(data, False)
+        if atributos is None:
+            return jsonify({
+                'success': False,
+                'error': 'Solo un cargo de especialista puede exigir matrícula.'
+            }), 400
+
+        cargo_id = cargodao.guardarCargo(descripcion, estado, *atributos)
         if cargo_id:
             return jsonify({
                 'success': True,
                 'data': {
                     'id': cargo_id,
                     'descripcion': descripcion,
-                    'estado': estado
+                    'estado': estado,
+                    'requiere_especialista': atributos[0],
+                    'requiere_matricula': atributos[1]
                 },
                 'error': None
             }), 201
@@ -142,13 +165,27 @@ def updateCargo(cargo_id):
                 'error': 'La descripción solo puede contener letras y acentos.'
             }), 400
 
-        if cargodao.updateCargo(cargo_id, descripcion, estado):
+        # Los atributos que no vienen en el cuerpo no se modifican
+        atributos = leerAtributosCargo(data, None)
+        if atributos is None:
+            return jsonify({
+                'success': False,
+                'error': 'Solo un cargo de especialista puede exigir matrícula.'
+            }), 400
+
+        if cargodao.updateCargo(cargo_id, descripcion, estado, *atributos):
+            # Valores vigentes (updateCargo ya recargó el caché)
+            cargo = cache_cargos.get(cargo_id)
+            if cargo:
+                atributos = (cargo.requiere_especialista, cargo.requiere_matricula)
             return jsonify({
                 'success': True,
                 'data': {
                     'id': cargo_id,
                     'descripcion': descripcion,
-                    'estado': estado
+                    'estado': estado,
+                    'requiere_especialista': atributos[0],
+                    'requiere_matricula': atributos[1]
                 },
                 'error': None
             }), 200
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, session, \
     request, redirect, url_for, flash, current_app as app
-from werkzeug.security import check_password_hash
 from app.dao.referenciales.usuario.login_dao import LoginDao
+from app.seguridad.claves import servicio_claves, ColaClavesLlena
+from app.seguridad.limite_ingresos import limite_ingresos
 
 logmod = Blueprint('login', __name__, template_folder='templates')
 
@@ -13,15 +14,40 @@ def login():
         usuario_nombre = request.form['usuario_nombre']
         usuario_clave = request.form['usuario_clave']
 
+        # Antes de cualquier hash: fichas por nick e IP
+        if not limite_ingresos.permitir(usuario_nombre, request.remote_addr):
+            flash('Demasiados intentos de ingreso. Espere unos minutos e intente de nuevo.', 'danger')
+            return render_template('login.html'), 429
+
         # buscar usuario en la BD
         login_dao = LoginDao()
         usuario_encontrado = login_dao.buscarUsuario(usuario_nombre)
 
         if usuario_encontrado and 'usu_nick' in usuario_encontrado:
+            if usuario_encontrado['bloqueado']:
+                flash('Usuario bloqueado temporalmente por intentos fallidos. '
+                      'Intente más tarde o consulte con el administrador.', 'danger')
+                return render_template('login.html'), 429
+
             password_hash_del_usuario = usuario_encontrado['usu_clave']
 
-            if check_password_hash(pwhash=password_hash_del_usuario,
-                                   password=usuario_clave):
+            try:
+                coincide, rehacer = servicio_claves.verificar(password_hash_del_usuario, usuario_clave)
+            except ColaClavesLlena:
+                flash('Hay demasiados ingresos en este momento, intente de nuevo en unos segundos', 'warning')
+                return render_template('login.html'), 503
+
+            if coincide:
+                if usuario_encontrado['usu_nro_intentos']:
+                    login_dao.registrarIngreso(usuario_encontrado['id_usuario'])
+                if rehacer:
+                    # El método de hash cambió: se guarda con el actual
+                    try:
+                        login_dao.actualizarClave(usuario_encontrado['id_usuario'], password_hash_del_usuario,
+                                                  servicio_claves.generar(usuario_clave))
+                    except ColaClavesLlena:
+                        pass  # se rehace en el próximo ingreso
+
                 # login correcto → crear sesión
                 session.clear()
                 session.permanent = True
@@ -29,10 +55,18 @@ def login():
                 session['usu_nick'] = usuario_encontrado['usu_nick']
                 session['nombre_persona'] = usuario_encontrado['nombre_persona']
                 session['grupo'] = usuario_encontrado['grupo']
+                session['id_grupo'] = usuario_encontrado['id_grupo']
 
                 return redirect(url_for('login.inicio'))
             else:
-                flash('Contraseña incorrecta', 'danger')
+                fallo = login_dao.registrarFallo(usuario_encontrado['id_usuario'],
+                                                 app.config.get('LOGIN_MAX_INTENTOS', 5),
+                                                 app.config.get('LOGIN_BLOQUEO_MINUTOS', 15))
+                if fallo and fallo[1]:
+                    flash('Contraseña incorrecta. El usuario quedó bloqueado temporalmente '
+                          'por intentos fallidos.', 'danger')
+                else:
+                    flash('Contraseña incorrecta', 'danger')
                 return redirect(url_for('login.login'))
         else:
             flash('Usuario no encontrado', 'warning')
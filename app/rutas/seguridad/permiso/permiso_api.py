@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from app.dao.seguridad.permiso.PermisoDao import PermisoDao
+from app.seguridad.permisos import motor_permisos, requiere_permiso
+
+permisoapi = Blueprint('permisoapi', __name__)
+
+# ===============================
+# Permisos de un grupo en cada página
+# ===============================
+@permisoapi.route('/grupos/<int:id_grupo>/permisos', methods=['GET'])
+@requiere_permiso('leer', pagina='permisos')
+def getPermisos(id_grupo):
+    permisodao = PermisoDao()
+    permisos = permisodao.getPermisos(id_grupo)
+
+    if permisos is None:
+        return jsonify({
+            'success': False,
+            'error': 'Ocurrió un error interno. Consulte con el administrador.'
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': permisos,
+        'error': None
+    }), 200
+
+# ===============================
+# Reemplaza los permisos de un grupo
+# ===============================
+@permisoapi.route('/grupos/<int:id_grupo>/permisos', methods=['PUT'])
+@requiere_permiso('editar', pagina='permisos')
+def updatePermisos(id_grupo):
+    data = request.get_json(silent=True) or {}
+    permisos = data.get('permisos')
+
+    if not isinstance(permisos, list) or \
+            not all(isinstance(p, dict) and isinstance(p.get('id_pagina'), int) for p in permisos):
+        return jsonify({
+            'success': False,
+            'error': 'Se espera "permisos": una lista de {id_pagina, leer, insertar, editar, borrar}.'
+        }), 400
+
+    filas = [(p['id_pagina'],) + tuple(bool(p.get(accion)) for accion in PermisoDao.ACCIONES)
+             for p in permisos]
+
+    permisodao = PermisoDao()
+    if not permisodao.guardarPermisos(id_grupo, filas):
+        return jsonify({
+            'success': False,
+            'error': 'No se pudieron guardar los permisos. Consulte con el administrador.'
+        }), 500
+
+    # Los demás workers se enteran por el aviso de la base
+    motor_permisos.invalidar()
+    return jsonify({
+        'success': True,
+        'data': permisodao.getPermisos(id_grupo),
+        'error': None
+    }), 200
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app as app
 from app.dao.seguridad.usuario.UsuarioDao import UsuarioDao
+from app.seguridad.claves import servicio_claves, ColaClavesLlena
+from app.seguridad.permisos import requiere_permiso
+from app.registro.auditoria import usuario_sesion
+from app.seguridad.sesiones import cache_sesiones
 
 usuarioapi = Blueprint('usuarioapi', __name__)
 
@@ -88,6 +92,7 @@ def getFuncionariosSinUsuario():
 # VALIDAR USERNAME DISPONIBLE
 # ============================================
 @usuarioapi.route('/usuarios/validar-username', methods=['POST'])
+@requiere_permiso('leer')
 def validarUsername():
     """Valida que un username esté disponible"""
     data = request.get_json()
@@ -159,7 +164,7 @@ def addUsuario():
             id_funcionario=data['id_funcionario'],
             id_grupo=data['id_grupo'],
             usu_estado=data.get('usu_estado', True),
-            creacion_usuario=data.get('creacion_usuario', 1)
+            creacion_usuario=usuario_sesion()
         )
         
         if usuario_id:
@@ -177,6 +182,11 @@ def addUsuario():
                 'error': 'No se pudo crear el usuario. Verifique que el username no exista o que el funcionario no tenga usuario asignado.'
             }), 500
     
+    except ColaClavesLlena:
+        return jsonify({
+            'success': False,
+            'error': 'Hay demasiadas contraseñas en proceso en este momento, intente de nuevo en unos segundos.'
+        }), 503
     except Exception as e:
         app.logger.error(f"Error al crear usuario: {str(e)}")
         return jsonify({
@@ -233,10 +243,12 @@ def updateUsuario(id_usuario):
             id_grupo=data['id_grupo'],
             usu_estado=data.get('usu_estado', True),
             password=password,
-            modificacion_usuario=data.get('modificacion_usuario', 1)
+            modificacion_usuario=usuario_sesion()
         )
         
         if resultado:
+            # Los demás workers se enteran por el aviso de la base
+            cache_sesiones.invalidar([id_usuario])
             return jsonify({
                 'success': True,
                 'data': {
@@ -251,6 +263,11 @@ def updateUsuario(id_usuario):
                 'error': 'No se pudo actualizar el usuario. Verifique que el username no esté en uso.'
             }), 500
     
+    except ColaClavesLlena:
+        return jsonify({
+            'success': False,
+            'error': 'Hay demasiadas contraseñas en proceso en este momento, intente de nuevo en unos segundos.'
+        }), 503
     except Exception as e:
         app.logger.error(f"Error al actualizar usuario: {str(e)}")
         return jsonify({
@@ -269,6 +286,7 @@ def desactivarUsuario(id_usuario):
     
     try:
         if usuariodao.desactivarUsuario(id_usuario):
+            cache_sesiones.invalidar([id_usuario])
             return jsonify({
                 'success': True,
                 'mensaje': f'Usuario {id_usuario} desactivado correctamente.',
@@ -314,4 +332,17 @@ def resetearIntentos(id_usuario):
         return jsonify({
             'success': False,
             'error': 'Ocurrió un error interno. Consulte con el administrador.'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+# ============================================
+# MÉTRICAS DEL HASH DE CONTRASEÑAS
+# ============================================
+@usuarioapi.route('/usuarios/claves/metricas', methods=['GET'])
+def getMetricasClaves():
+    """Cola y tiempos del pool de hash de contraseñas de este worker"""
+    return jsonify({
+        'success': True,
+        'data': dict(servicio_claves.metricas(), metodo=servicio_claves.metodo),
+        'error': None
+    }), 200
@@ -0,0 +1,110 @@
+"""
+Hash y verificación de contraseñas fuera del hilo de la solicitud.
+
+PBKDF2 (hashlib) libera el GIL mientras calcula, así que alcanza con un
+pool de hilos: CLAVE_HILOS limita cuántos hashes corren a la vez y
+CLAVE_MAX_COLA cuántos esperan. Con la cola llena se rechaza enseguida
+(ColaClavesLlena) en lugar de dejar que un pico de ingresos acapare la
+CPU del worker; el resto de las solicitudes sigue atendiéndose.
+
+Un hash guardado con otro método (algoritmo o iteraciones) que
+CLAVE_METODO sigue siendo válido; verificar() avisa para rehacerlo en el
+próximo ingreso correcto. Para elegir las iteraciones: flask calibrar-claves.
+
+Configuración (app.config):
+    CLAVE_METODO    método de werkzeug ('pbkdf2:sha256:<iteraciones>')
+    CLAVE_HILOS     hashes simultáneos (núcleos - 1 por defecto)
+    CLAVE_MAX_COLA  hashes en espera antes de rechazar (16 por defecto)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+METODO = 'pbkdf2:sha256:1000000'
+HILOS = max(1, (os.cpu_count() or 2) - 1)
+MAX_COLA = 16
+
+
+class ColaClavesLlena(Exception):
+    """Demasiados hashes pendientes: reintentar más tarde"""
+
+
+class ServicioClaves:
+
+    def __init__(self, metodo=METODO, hilos=HILOS, max_cola=MAX_COLA):
+        self.metodo = metodo
+        self.hilos = hilos
+        self.max_cola = max_cola
+        self.lock = threading.Lock()
+        self.pool = None
+        # Métricas: pendientes = en cola + calculando
+        self.pendientes = 0
+        self.max_pendientes = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.espera_total = 0.0
+        self.calculo_total = 0.0
+
+    def configurar(self, app):
+        self.metodo = app.config.get('CLAVE_METODO', METODO)
+        self.hilos = app.config.get('CLAVE_HILOS', HILOS)
+        self.max_cola = app.config.get('CLAVE_MAX_COLA', MAX_COLA)
+
+    def _ejecutar(self, funcion, *argumentos):
+        with self.lock:
+            if self.pendientes >= self.hilos + self.max_cola:
+                self.rechazados += 1
+                logger.warning("Cola de contraseñas llena (%s pendientes)", self.pendientes)
+                raise ColaClavesLlena()
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='claves')
+            self.pendientes += 1
+            self.max_pendientes = max(self.max_pendientes, self.pendientes)
+
+        encolado = time.perf_counter()
+
+        def medir():
+            inicio = time.perf_counter()
+            try:
+                return funcion(*argumentos)
+            finally:
+                fin = time.perf_counter()
+                with self.lock:
+                    self.pendientes -= 1
+                    self.completados += 1
+                    self.espera_total += inicio - encolado
+                    self.calculo_total += fin - inicio
+
+        return self.pool.submit(medir).result()
+
+    def generar(self, clave):
+        """Hash de `clave` con el método configurado"""
+        return self._ejecutar(generate_password_hash, clave, self.metodo)
+
+    def verificar(self, hash_guardado, clave):
+        """Retorna (coincide, rehacer): rehacer si el hash usa otro método que el configurado"""
+        coincide = self._ejecutar(check_password_hash, hash_guardado, clave)
+        return coincide, coincide and not hash_guardado.startswith(self.metodo + '$')
+
+    def metricas(self):
+        with self.lock:
+            completados = self.completados or 1
+            return {
+                'hilos': self.hilos,
+                'max_cola': self.max_cola,
+                'pendientes': self.pendientes,
+                'en_cola': max(0, self.pendientes - self.hilos),
+                'max_pendientes': self.max_pendientes,
+                'completados': self.completados,
+                'rechazados': self.rechazados,
+                'espera_media_ms': round(self.espera_total / completados * 1000, 1),
+                'calculo_medio_ms': round(self.calculo_total / completados * 1000, 1),
+            }
+
+
+servicio_claves = ServicioClaves()
@@ -0,0 +1,106 @@
+"""
+Límite de intentos de ingreso por nick y por IP.
+
+Cada intento toma una ficha de dos cubetas (una por nick y otra por IP)
+antes de buscar al usuario o calcular un hash; sin fichas se rechaza y
+no se gasta CPU. Hay dos niveles:
+
+  local       cubetas en memoria del worker: bajo un ataque los rechazos
+              no llegan ni a la base.
+  PostgreSQL  cubetas compartidas por todos los workers (fn_tomar_ficha,
+              ver codigos_sql/limite_ingresos.sql). Si la base no
+              responde queda solo el límite local.
+
+El bloqueo por usuario (usu_nro_intentos / usu_bloqueado_hasta) lo lleva
+login_routes con LoginDao.registrarFallo.
+
+La IP es request.remote_addr: detrás de un proxy inverso hay que indicar
+PROXIES_CONFIABLES (ver app/__init__.py) para que sea la del cliente y no
+la del proxy. El nick se guarda como hash: cualquier largo entra en
+ingresos_fichas.fic_clave.
+
+Configuración (app.config):
+    LOGIN_LIMITES           {'nick': (capacidad, segundos por ficha), 'ip': (...)}
+    LOGIN_MAX_INTENTOS      fallos seguidos que bloquean al usuario
+    LOGIN_BLOQUEO_MINUTOS   duración del bloqueo
+"""
+import hashlib
+import logging
+import threading
+import time
+from app.dao.referenciales.usuario.login_dao import LoginDao
+
+logger = logging.getLogger(__name__)
+
+# 5 intentos seguidos por nick y luego uno por minuto; 20 por IP y luego uno cada 15 s
+LIMITES = {'nick': (5, 60), 'ip': (20, 15)}
+
+# Cubetas locales antes de descartar las que ya se llenaron
+MAX_CUBETAS = 10000
+
+# Segundos entre limpiezas de las cubetas viejas en la base (por worker)
+INTERVALO_LIMPIEZA = 3600
+
+
+class LimiteIngresos:
+
+    def __init__(self, limites=None):
+        self.limites = limites or LIMITES
+        self.lock = threading.Lock()
+        # clave -> (fichas, última actualización, capacidad, segundos por ficha)
+        self.cubetas = {}
+        self.ultima_limpieza = time.monotonic()
+
+    def configurar(self, app):
+        self.limites = app.config.get('LOGIN_LIMITES', LIMITES)
+
+    def claves(self, nick, ip):
+        """[(clave, capacidad, segundos por ficha)] de un intento"""
+        nick = hashlib.sha256((nick or '').strip().lower().encode('utf-8')).hexdigest()
+        valores = {'nick': nick, 'ip': ip or 'desconocida'}
+        return [(f"{tipo}:{valores[tipo]}", capacidad, segundos)
+                for tipo, (capacidad, segundos) in self.limites.items()]
+
+    def _tomar_local(self, clave, capacidad, segundos, ahora):
+        fichas, actualizado = self.cubetas.get(clave, (capacidad, ahora))[:2]
+        fichas = max(min(capacidad, fichas + (ahora - actualizado) / segundos) - 1, -1)
+        self.cubetas[clave] = (fichas, ahora, capacidad, segundos)
+        return fichas >= 0
+
+    def _podar(self, ahora):
+        """Descarta las cubetas que ya se recargaron (equivalen a no tenerlas)"""
+        for clave, (fichas, actualizado, capacidad, segundos) in list(self.cubetas.items()):
+            if fichas + (ahora - actualizado) / segundos >= capacidad:
+                del self.cubetas[clave]
+        if len(self.cubetas) > MAX_CUBETAS:
+            self.cubetas.clear()
+
+    def permitir(self, nick, ip):
+        """True si el intento tiene ficha en todas sus cubetas (locales y compartidas)"""
+        claves = self.claves(nick, ip)
+        ahora = time.monotonic()
+
+        with self.lock:
+            if len(self.cubetas) > MAX_CUBETAS:
+                self._podar(ahora)
+            locales = [self._tomar_local(clave, capacidad, segundos, ahora)
+                       for clave, capacidad, segundos in claves]
+            limpiar = ahora - self.ultima_limpieza > INTERVALO_LIMPIEZA
+            if limpiar:
+                self.ultima_limpieza = ahora
+
+        if not all(locales):
+            logger.info("Ingreso rechazado por límite local: %s", [c for c, _, _ in claves])
+            return False
+
+        login_dao = LoginDao()
+        if limpiar:
+            login_dao.limpiarFichas()
+
+        compartidas = login_dao.tomarFichas(claves)
+        if compartidas is False:
+            logger.info("Ingreso rechazado por límite compartido: %s", [c for c, _, _ in claves])
+        return compartidas is not False
+
+
+limite_ingresos = LimiteIngresos()
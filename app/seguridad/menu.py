@@ -0,0 +1,85 @@
+"""
+Menú lateral por grupo.
+
+Las páginas y módulos salen de la matriz que ya compila
+app/seguridad/permisos.py, y lo que el grupo puede leer de su mapa de
+bits: armar el menú no consulta la base. El HTML de cada grupo se
+renderiza una vez y se guarda con la clave (id_grupo, versión de
+permisos); cuando cambian paginas, permisos o modulos la versión sube y
+los fragmentos anteriores se descartan en la siguiente renderización.
+
+Hasta que se encienda MENU_POR_PERMISOS (las páginas de todos los
+módulos y los permisos de cada grupo ya cargados) se muestra el menú fijo
+de menu_predeterminado.html; también si la tabla paginas está vacía.
+"""
+import logging
+import threading
+from flask import render_template, session
+from markupsafe import Markup
+from app.seguridad.permisos import motor_permisos, PermisosNoDisponibles
+
+logger = logging.getLogger(__name__)
+
+
+class MenuGrupos:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (id_grupo, versión) -> Markup; solo de la versión vigente
+        self.fragmentos = {}
+        self.predeterminado = None
+        self.por_permisos = False
+
+    def configurar(self, app):
+        """Deja menu_lateral() disponible en todas las plantillas"""
+        self.por_permisos = app.config.get('MENU_POR_PERMISOS', False)
+        app.context_processor(lambda: {'menu_lateral': self.fragmento})
+
+    def estructura(self, id_grupo, matriz):
+        """[{'id_modulo', 'descripcion', 'paginas': [{'nombre', 'direccion'}]}] que el grupo puede leer"""
+        modulos = []
+        for indice, pagina in enumerate(matriz.paginas):
+            if not pagina.en_menu or not pagina.modulo_activo or not motor_permisos.permitido(id_grupo, indice, 0, matriz):
+                continue
+            # Vienen ordenadas por módulo
+            if not modulos or modulos[-1]['id_modulo'] != pagina.id_modulo:
+                modulos.append({'id_modulo': pagina.id_modulo, 'descripcion': pagina.modulo, 'paginas': []})
+            modulos[-1]['paginas'].append({'nombre': pagina.nombre, 'direccion': pagina.direccion})
+        return modulos
+
+    def fragmento(self):
+        """HTML del menú del grupo de la sesión"""
+        if not self.por_permisos:
+            return self.fragmento_predeterminado()
+
+        id_grupo = session.get('id_grupo')
+        try:
+            matriz = motor_permisos.obtener_matriz()
+            if not matriz.paginas:
+                return self.fragmento_predeterminado()
+            if id_grupo is None:
+                return Markup('')
+
+            clave = (id_grupo, matriz.version)
+            html = self.fragmentos.get(clave)
+            if html is None:
+                html = Markup(render_template('menu.html', modulos=self.estructura(id_grupo, matriz)))
+                with self.lock:
+                    if motor_permisos.matriz is not matriz:
+                        return html  # cambió mientras se renderizaba: no se guarda
+                    if any(v != matriz.version for _, v in self.fragmentos):
+                        self.fragmentos = {}
+                    self.fragmentos[clave] = html
+            return html
+
+        except PermisosNoDisponibles:
+            # Sin permisos no se sabe qué mostrar: la página se ve igual, sin menú
+            return Markup('')
+
+    def fragmento_predeterminado(self):
+        if self.predeterminado is None:
+            self.predeterminado = Markup(render_template('menu_predeterminado.html'))
+        return self.predeterminado
+
+
+menu_grupos = MenuGrupos()
@@ -0,0 +1,251 @@
+"""
+Control de permisos por grupo (ver codigos_sql/permisos.sql).
+
+La matriz páginas x acciones se compila en memoria: cada página activa
+tiene un índice y cada grupo un entero que se usa como mapa de bits, con
+el bit (índice * 4 + acción) encendido si el grupo puede hacer esa acción
+en esa página. Los permisos de un grupo se leen de la base la primera vez
+que se consultan; después cada control es un par de búsquedas en
+diccionarios y un desplazamiento de bits, sin ir a la base.
+
+Cualquier cambio en paginas, permisos o modulos sube la versión en
+permisos_version y avisa por el canal permisos_cambios: cada worker
+descarta lo compilado y lo vuelve a leer en la próxima consulta.
+
+Qué se controla: las solicitudes a los blueprints que figuran en
+paginas.pag_blueprints. La acción sale del método HTTP (GET lee, POST
+inserta, PUT/PATCH edita, DELETE borra) salvo que la vista indique otra
+con @requiere_permiso.
+
+Si la base no responde se sigue usando la última matriz leída y no se
+vuelve a consultar durante ESPERA_REINTENTO segundos.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from flask import request, session, jsonify, redirect, url_for, flash, abort, current_app as app
+from app.conexion.avisos import avisos
+from app.dao.seguridad.permiso.PermisoDao import PermisoDao
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'permisos_cambios'
+
+ACCIONES = PermisoDao.ACCIONES
+
+ACCION_METODO = {
+    'GET': 0, 'HEAD': 0, 'OPTIONS': 0,
+    'POST': 1,
+    'PUT': 2, 'PATCH': 2,
+    'DELETE': 3,
+}
+
+Pagina = namedtuple('Pagina', ['id_pagina', 'nombre', 'blueprints', 'direccion',
+                               'id_modulo', 'modulo', 'modulo_activo', 'en_menu'])
+
+# version: ver_numero de permisos_version al compilar
+# paginas: tupla de Pagina; la posición es el índice de la página
+# indices: id_pagina -> índice; nombres: pag_nombre -> índice; blueprints: blueprint -> índice
+# grupos: id_grupo -> mapa de bits, calculado con los índices de esta misma matriz
+Matriz = namedtuple('Matriz', ['version', 'paginas', 'indices', 'nombres', 'blueprints', 'grupos'])
+
+# Segundos sin volver a consultar la base después de una lectura fallida
+ESPERA_REINTENTO = 5
+
+
+class PermisosNoDisponibles(Exception):
+    """No se pudo leer la matriz de permisos de la base"""
+
+
+def requiere_permiso(accion, pagina=None):
+    """
+    Indica qué permiso exige la vista cuando el método HTTP no alcanza, p.
+    ej. un POST que solo consulta. Sin `pagina` se usa la del blueprint.
+    Una página indicada que no existe o está inactiva, o un blueprint sin
+    página, deniega el acceso: la vista nunca queda abierta por omisión.
+    El control lo hace verificar_permiso antes de la vista.
+    """
+    if accion not in ACCIONES:
+        raise ValueError(f"Acción desconocida: {accion}")
+
+    def decorador(vista):
+        vista.permiso = (ACCIONES.index(accion), pagina)
+        return vista
+    return decorador
+
+
+class MotorPermisos:
+
+    def __init__(self):
+        self.dao = PermisoDao()
+        self.lock = threading.Lock()
+        # Última matriz compilada; None hasta la primera lectura que funcione
+        self.matriz = None
+        # False después de un aviso de cambio: la matriz se vuelve a leer,
+        # pero si la base no responde se sigue usando la anterior
+        self.vigente = False
+        # Sube con cada invalidación: una lectura que empezó antes no se guarda
+        self.generacion = 0
+        # time.monotonic() antes del cual no se reintenta una lectura fallida
+        self.reintentar_desde = 0
+
+    def configurar(self, app):
+        """Controla cada solicitud y se suscribe a los avisos de cambios"""
+        app.before_request(verificar_permiso)
+        avisos.suscribir(CANAL, self.invalidar)
+
+    def invalidar(self, payloads=None):
+        with self.lock:
+            self.generacion += 1
+            self.vigente = False
+            self.reintentar_desde = 0
+        logger.info("Permisos invalidados (versión %s)", payloads[-1] if payloads else '?')
+
+    def obtener_matriz(self):
+        """
+        Matriz vigente; la vuelve a leer si hubo un cambio. Si la base falla
+        devuelve la última que se leyó, y si nunca se leyó ninguna lanza
+        PermisosNoDisponibles. Después de un fallo espera ESPERA_REINTENTO
+        segundos antes de volver a consultar.
+        """
+        matriz = self.matriz
+        if matriz is not None and self.vigente:
+            return matriz
+
+        with self.lock:
+            if self.matriz is not None and self.vigente:
+                return self.matriz
+            if time.monotonic() < self.reintentar_desde:
+                if self.matriz is not None:
+                    return self.matriz
+                raise PermisosNoDisponibles()
+
+            try:
+                version, filas = self.dao.getPaginasActivas()
+            except Exception as e:
+                self.reintentar_desde = time.monotonic() + ESPERA_REINTENTO
+                if self.matriz is not None:
+                    logger.warning("Error al leer las páginas, se usa la versión %s: %s", self.matriz.version, e)
+                    return self.matriz
+                logger.error("Error al leer las páginas: %s", e)
+                raise PermisosNoDisponibles() from e
+
+            paginas = tuple(Pagina(*f) for f in filas)
+            blueprints = {}
+            for indice, pagina in enumerate(paginas):
+                for blueprint in pagina.blueprints or ():
+                    blueprints.setdefault(blueprint, indice)
+            self.matriz = Matriz(version, paginas,
+                                 {p.id_pagina: i for i, p in enumerate(paginas)},
+                                 {p.nombre: i for i, p in enumerate(paginas)},
+                                 blueprints, {})
+            self.vigente = True
+            logger.info("Matriz de permisos compilada: %s páginas, versión %s", len(paginas), version)
+            return self.matriz
+
+    def version(self):
+        return self.obtener_matriz().version
+
+    def bits_grupo(self, id_grupo, matriz):
+        """Mapa de bits del grupo con los índices de `matriz`"""
+        bits = matriz.grupos.get(id_grupo)
+        if bits is not None:
+            return bits
+
+        generacion = self.generacion
+        try:
+            filas = self.dao.getPermisosGrupo(id_grupo)
+        except Exception as e:
+            logger.error("Error al leer los permisos del grupo %s: %s", id_grupo, e)
+            raise PermisosNoDisponibles() from e
+
+        bits = 0
+        for id_pagina, *acciones in filas:
+            indice = matriz.indices.get(id_pagina)
+            if indice is None:
+                continue  # página inactiva
+            for accion, permitida in enumerate(acciones):
+                if permitida:
+                    bits |= 1 << (indice * 4 + accion)
+
+        # Solo se guarda si nada cambió mientras se leía
+        with self.lock:
+            if self.generacion == generacion and self.vigente and self.matriz is matriz:
+                matriz.grupos[id_grupo] = bits
+        return bits
+
+    def permitido(self, id_grupo, indice, accion, matriz):
+        """True si el grupo puede hacer la acción (0..3) en la página de índice `indice` de `matriz`"""
+        return bool(self.bits_grupo(id_grupo, matriz) >> (indice * 4 + accion) & 1)
+
+    def puede(self, id_grupo, pagina, accion):
+        """Lo mismo por nombre de página y de acción ('leer', ...), p. ej. para las plantillas"""
+        matriz = self.obtener_matriz()
+        indice = matriz.nombres.get(pagina)
+        if indice is None or id_grupo is None:
+            return False
+        return self.permitido(id_grupo, indice, ACCIONES.index(accion), matriz)
+
+
+motor_permisos = MotorPermisos()
+
+
+def denegar(codigo, mensaje):
+    if request.path.startswith('/api/'):
+        return jsonify({'success': False, 'data': None, 'error': mensaje}), codigo
+    if codigo == 401:
+        flash('Debes iniciar sesión primero', 'warning')
+        return redirect(url_for('login.login'))
+    abort(codigo)
+
+
+def verificar_permiso():
+    """
+    before_request: deniega si la página de la solicitud está protegida y
+    el grupo no tiene el permiso. El índice de la página y los bits del
+    grupo salen de la misma matriz. Sin ninguna matriz leída (base caída
+    al arrancar) solo se rechazan las vistas con requiere_permiso: no se
+    sabe qué blueprints están protegidos y el resto, como /login, sigue
+    funcionando. Una vista con requiere_permiso cuyo blueprint no tiene
+    página se deniega en lugar de quedar abierta.
+    """
+    if request.endpoint == 'static':
+        return None
+    vista = app.view_functions.get(request.endpoint)
+    if vista is None:
+        return None
+    accion, pagina = getattr(vista, 'permiso', (None, None))
+
+    try:
+        matriz = motor_permisos.obtener_matriz()
+    except PermisosNoDisponibles:
+        if accion is None:
+            return None
+        return denegar(503, 'No se pudieron verificar los permisos. Intente de nuevo en unos segundos.')
+
+    if pagina is None:
+        indice = matriz.blueprints.get(request.blueprint)
+        if indice is None:
+            if accion is None:
+                return None
+            return denegar(403, 'No tiene permiso para esta operación.')
+    else:
+        indice = matriz.nombres.get(pagina)
+        if indice is None:
+            return denegar(403, 'No tiene permiso para esta operación.')
+
+    if accion is None:
+        accion = ACCION_METODO.get(request.method, 3)
+
+    id_grupo = session.get('id_grupo')
+    if id_grupo is None:
+        return denegar(401, 'Debe iniciar sesión.')
+
+    try:
+        if not motor_permisos.permitido(id_grupo, indice, accion, matriz):
+            return denegar(403, 'No tiene permiso para esta operación.')
+    except PermisosNoDisponibles:
+        return denegar(503, 'No se pudieron verificar los permisos. Intente de nuevo en unos segundos.')
+
+    return None
@@ -0,0 +1,125 @@
+"""
+Validación de la sesión contra el usuario en la base.
+
+La cookie de sesión dice quién es el usuario, pero no si sigue activo ni
+en qué grupo está. Cada worker guarda (usu_estado, id_grupo) de los
+usuarios con sesión durante SESION_VALIDEZ_SEGUNDOS y lo vuelve a leer
+cuando vence, al recibir una solicitud. Desactivar, borrar o cambiar de
+grupo a un usuario avisa por el canal usuarios_cambios (ver
+codigos_sql/usuarios_avisos.sql) y su entrada se descarta en el momento;
+el vencimiento cubre los avisos perdidos.
+
+Un usuario inactivo o borrado pierde la sesión en su próxima solicitud.
+Si cambió de grupo, la sesión pasa al grupo nuevo y los permisos (ver
+app/seguridad/permisos.py) se controlan con ese.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from flask import request, session
+from app.conexion.avisos import avisos
+from app.dao.seguridad.usuario.UsuarioDao import UsuarioDao
+from app.seguridad.permisos import denegar
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'usuarios_cambios'
+
+# Segundos que vale lo leído de un usuario si no llega ningún aviso
+DURACION = 30
+
+# Usuarios guardados antes de descartar los vencidos
+MAX_USUARIOS = 10000
+
+UsuarioSesion = namedtuple('UsuarioSesion', ['id_usuario', 'activo', 'id_grupo', 'grupo'])
+
+
+class SesionNoVerificable(Exception):
+    """No se pudo leer el usuario y no había una lectura anterior"""
+
+
+class CacheSesiones:
+
+    def __init__(self):
+        self.dao = UsuarioDao()
+        self.duracion = DURACION
+        self.lock = threading.Lock()
+        # id_usuario -> (vence, UsuarioSesion)
+        self.usuarios = {}
+        # Sube con cada invalidación: una lectura que empezó antes no se guarda
+        self.generacion = 0
+
+    def configurar(self, app):
+        """Valida cada solicitud con sesión y se suscribe a los avisos de cambios"""
+        self.duracion = app.config.get('SESION_VALIDEZ_SEGUNDOS', DURACION)
+        app.before_request(verificar_sesion)
+        avisos.suscribir(CANAL, self.invalidar)
+
+    def invalidar(self, payloads=None):
+        """Descarta los usuarios de los payloads (ids); sin payloads, todos"""
+        with self.lock:
+            self.generacion += 1
+            if payloads is None:
+                self.usuarios = {}
+                return
+            for payload in payloads:
+                try:
+                    self.usuarios.pop(int(payload), None)
+                except (TypeError, ValueError):
+                    logger.warning("Aviso de usuario con id inválido: %r", payload)
+
+    def obtener(self, id_usuario):
+        """UsuarioSesion vigente; la lee de la base si no está o venció"""
+        ahora = time.monotonic()
+        entrada = self.usuarios.get(id_usuario)
+        if entrada is not None and entrada[0] > ahora:
+            return entrada[1]
+
+        generacion = self.generacion
+        try:
+            fila = self.dao.getUsuarioSesion(id_usuario)
+        except Exception as e:
+            logger.error("Error al leer el usuario %s de la sesión: %s", id_usuario, e)
+            # Un corte breve de la base no cierra las sesiones: vale la última lectura
+            if entrada is not None:
+                return entrada[1]
+            raise SesionNoVerificable() from e
+
+        if fila is None:
+            usuario = UsuarioSesion(id_usuario, False, None, None)
+        else:
+            usuario = UsuarioSesion(id_usuario, bool(fila[0]), fila[1], fila[2])
+
+        with self.lock:
+            if self.generacion == generacion:
+                if len(self.usuarios) >= MAX_USUARIOS:
+                    self.usuarios = {k: v for k, v in self.usuarios.items() if v[0] > ahora}
+                self.usuarios[id_usuario] = (ahora + self.duracion, usuario)
+        return usuario
+
+
+cache_sesiones = CacheSesiones()
+
+
+def verificar_sesion():
+    """before_request: cierra la sesión de un usuario inactivo y sigue sus cambios de grupo"""
+    id_usuario = session.get('id_usuario')
+    if id_usuario is None or request.endpoint == 'static':
+        return None
+
+    try:
+        usuario = cache_sesiones.obtener(id_usuario)
+    except SesionNoVerificable:
+        return denegar(503, 'No se pudo verificar la sesión. Intente de nuevo en unos segundos.')
+
+    if not usuario.activo:
+        logger.info("Sesión cerrada: el usuario %s está inactivo o no existe", id_usuario)
+        session.clear()
+        return denegar(401, 'La sesión ya no es válida. Inicie sesión de nuevo.')
+
+    if usuario.id_grupo != session.get('id_grupo'):
+        session['id_grupo'] = usuario.id_grupo
+        session['grupo'] = usuario.grupo
+
+    return None
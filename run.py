@@ -1,4 +1,6 @@
-from app import app
-
+# Los procesos de reportes (spawn) vuelven a importar este archivo: la
+# aplicación solo se crea al ejecutarlo. Con gunicorn: gunicorn app:app;
+# comandos: flask --app app <comando> (flask --app run no encuentra la aplicación)
 if __name__ == "__main__":
+    from app import app
     app.run(debug=True)
\ No newline at end of file